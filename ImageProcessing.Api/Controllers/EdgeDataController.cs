@@ -16,6 +16,7 @@ using Org.BouncyCastle.Ocsp;
 using System.ComponentModel.DataAnnotations;
 using System.Net;
 using System.Text.Json;
+using System.Text.Json.Nodes;
 using System.Text.Json.Serialization;
 
 namespace ImageProcessing.Api.Controllers.v1;
@@ -131,11 +132,205 @@ public sealed class EdgeDataController : ControllerBase
         [FromServices] IFileService fileService,
         [FromServices] IAppDbContext db,
         [FromServices] IOutputCacheStore cache,
+        [FromServices] EdgeMetaCodec metaCodec,
+        CancellationToken ct)
+    {
+        string? meta = request.Meta;
+        if (request.Meta_C is not null)
+        {
+            var (error, payload) = await ReadCompactAsync(request.Meta_C, metaCodec, ct);
+            if (error is not null)
+                return error;
+            meta = metaCodec.Expand(payload!["e"], out var missing);
+            if (missing is not null)
+                return UnknownContext(new[] { missing });
+        }
+        if (string.IsNullOrWhiteSpace(meta))
+            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "meta is required."));
+
+        var (status, errors) = await IngestOneAsync(meta, request.Frame_Raw, request.Frame_Annotated, fileService, ct);
+        if (status != HttpStatusCode.OK)
+            return StatusCode((int)status, ApiResponse.Fail(status, errors));
+
+        // Bust OutputCache for all EdgeEvents GETs
+        await cache.EvictByTagAsync("EdgeEvents", ct);
+        return Ok();
+        //return CreatedAtAction(nameof(GetById), new { version = "1.0", id = created.Id }, ApiResponse.Created(created));
+    }
+
+    // POST: api/v1/EdgeData/batch
+    // multipart/form-data:
+    //   items                  = [{ "id": "<client row id>", "meta": { ...same as Ingest meta... } }, ...]
+    //     or items_c           = compact edge format { "ctx": {...}, "items": [{ "id", "e" }] } (EdgeMetaCodec)
+    //   frame_raw_<id>         = jpg (required per item unless annotated-only or meta.gate.gated, same as Ingest)
+    //   frame_annotated_<id>   = jpg (optional)
+    // Returns one EdgeBatchItemResult per item so the edge only marks accepted rows as synced.
+    [HttpPost("batch")]
+    [Consumes("multipart/form-data")]
+    [RequestSizeLimit(MaxBatchBytes)]
+    [RequestFormLimits(MultipartBodyLengthLimit = MaxBatchBytes)]
+    [ProducesResponseType(typeof(ApiResponse), StatusCodes.Status200OK)]
+    [ProducesResponseType(typeof(ApiResponse), StatusCodes.Status400BadRequest)]
+    public async Task<ActionResult<ApiResponse>> IngestBatch(
+        [FromServices] IFileService fileService,
+        [FromServices] IOutputCacheStore cache,
+        [FromServices] EdgeMetaCodec metaCodec,
+        CancellationToken ct)
+    {
+        IFormCollection form = await Request.ReadFormAsync(ct);
+        IFormFile? compact = form.Files.GetFile("items_c");
+        if (compact is not null)
+            return await IngestCompactBatchAsync(form, compact, metaCodec, fileService, cache, ct);
+
+        string? itemsJson = form["items"];
+        if (string.IsNullOrWhiteSpace(itemsJson))
+            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "items is required."));
+
+        JsonDocument doc;
+        try
+        {
+            doc = JsonDocument.Parse(itemsJson);
+        }
+        catch (JsonException ex)
+        {
+            _logger.LogWarning(ex, "Failed to parse batch items JSON");
+            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "Failed to parse items JSON."));
+        }
+
+        using (doc)
+        {
+            if (doc.RootElement.ValueKind != JsonValueKind.Array)
+                return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "items must be an array."));
+            if (doc.RootElement.GetArrayLength() > MaxBatchItems)
+                return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, $"At most {MaxBatchItems} items per batch."));
+
+            var results = new List<EdgeBatchItemResult>();
+            foreach (JsonElement item in doc.RootElement.EnumerateArray())
+            {
+                string id = item.ValueKind == JsonValueKind.Object && item.TryGetProperty("id", out var idEl) ? idEl.ToString() : "";
+                if (string.IsNullOrWhiteSpace(id) || !item.TryGetProperty("meta", out var metaEl))
+                {
+                    results.Add(new EdgeBatchItemResult { Id = id, Success = false, Errors = new[] { "id and meta are required." } });
+                    continue;
+                }
+
+                // meta may be sent as an object or as an already-serialized string
+                string meta = metaEl.ValueKind == JsonValueKind.String ? metaEl.GetString() ?? "" : metaEl.GetRawText();
+                var (status, errors) = await IngestOneAsync(
+                    meta,
+                    form.Files.GetFile($"frame_raw_{id}"),
+                    form.Files.GetFile($"frame_annotated_{id}"),
+                    fileService,
+                    ct);
+
+                results.Add(new EdgeBatchItemResult { Id = id, Success = status == HttpStatusCode.OK, Errors = errors });
+            }
+
+            // Bust OutputCache once for the whole batch
+            if (results.Any(r => r.Success))
+                await cache.EvictByTagAsync("EdgeEvents", ct);
+
+            return Ok(ApiResponse.Ok(results));
+        }
+    }
+
+    private async Task<ActionResult<ApiResponse>> IngestCompactBatchAsync(
+        IFormCollection form,
+        IFormFile compact,
+        EdgeMetaCodec metaCodec,
+        IFileService fileService,
+        IOutputCacheStore cache,
+        CancellationToken ct)
+    {
+        var (error, payload) = await ReadCompactAsync(compact, metaCodec, ct);
+        if (error is not null)
+            return error;
+        if (payload!["items"] is not JsonArray items)
+            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "items must be an array."));
+        if (items.Count > MaxBatchItems)
+            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, $"At most {MaxBatchItems} items per batch."));
+
+        // expand everything first: a missing context must not leave half a batch ingested
+        var metas = new List<(string Id, string? Meta)>();
+        var missing = new HashSet<string>();
+        foreach (JsonNode? item in items)
+        {
+            string id = (item as JsonObject)?["id"]?.ToString() ?? "";
+            string? meta = metaCodec.Expand((item as JsonObject)?["e"], out var ctxId);
+            if (ctxId is not null)
+                missing.Add(ctxId);
+            metas.Add((id, meta));
+        }
+        if (missing.Count > 0)
+            return UnknownContext(missing.ToArray());
+
+        var results = new List<EdgeBatchItemResult>();
+        foreach (var (id, meta) in metas)
+        {
+            if (string.IsNullOrWhiteSpace(id) || meta is null)
+            {
+                results.Add(new EdgeBatchItemResult { Id = id, Success = false, Errors = new[] { "id and meta are required." } });
+                continue;
+            }
+            var (status, errors) = await IngestOneAsync(
+                meta,
+                form.Files.GetFile($"frame_raw_{id}"),
+                form.Files.GetFile($"frame_annotated_{id}"),
+                fileService,
+                ct);
+
+            results.Add(new EdgeBatchItemResult { Id = id, Success = status == HttpStatusCode.OK, Errors = errors });
+        }
+
+        if (results.Any(r => r.Success))
+            await cache.EvictByTagAsync("EdgeEvents", ct);
+
+        return Ok(ApiResponse.Ok(results));
+    }
+
+    // Compact meta part: 415 + Accept for types we can't read, 400 if it doesn't parse.
+    private async Task<(ObjectResult? Error, JsonObject? Payload)> ReadCompactAsync(
+        IFormFile part,
+        EdgeMetaCodec metaCodec,
+        CancellationToken ct)
+    {
+        if (!EdgeMetaCodec.IsSupported(part.ContentType, out var gzip))
+        {
+            Response.Headers.Append("Accept", string.Join(", ", EdgeMetaCodec.Supported));
+            return (StatusCode(StatusCodes.Status415UnsupportedMediaType,
+                ApiResponse.Fail(HttpStatusCode.UnsupportedMediaType, $"Unsupported meta type {part.ContentType}.")), null);
+        }
+
+        try
+        {
+            var payload = await metaCodec.ReadAsync(part, gzip, ct);
+            if (payload is null)
+                return (BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "Invalid compact meta.")), null);
+            return (null, payload);
+        }
+        catch (Exception ex) when (ex is JsonException or InvalidDataException)
+        {
+            _logger.LogWarning(ex, "Failed to parse compact meta");
+            return (BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "Failed to parse compact meta.")), null);
+        }
+    }
+
+    // The edge resends its contexts when it gets this (e.g. after an API restart).
+    private ObjectResult UnknownContext(string[] contextIds) =>
+        Conflict(ApiResponse.Fail(HttpStatusCode.Conflict, contextIds.Select(id => $"unknown meta context {id}").ToArray()));
+
+    private const int MaxBatchItems = 500;
+    private const long MaxBatchBytes = 100_000_000;
+
+    // Shared by Ingest and IngestBatch: parse meta, save frames, create the EdgeEvent.
+    // Returns OK with no errors on success, otherwise the status/errors Ingest used to return.
+    private async Task<(HttpStatusCode Status, string[] Errors)> IngestOneAsync(
+        string meta,
+        IFormFile? frame_raw,
+        IFormFile? frame_annotated,
+        IFileService fileService,
         CancellationToken ct)
     {
-        string meta = request.Meta;
-        IFormFile? frame_raw = request.Frame_Raw;
-        IFormFile? frame_annotated = request.Frame_Annotated;
         EdgeMeta? parsed;
         try
         {
@@ -146,19 +341,19 @@ public sealed class EdgeDataController : ControllerBase
             });
 
             if (parsed is null)
-                return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "Invalid meta JSON."));
+                return (HttpStatusCode.BadRequest, new[] { "Invalid meta JSON." });
         }
         catch (Exception ex)
         {
             _logger.LogWarning(ex, "Failed to parse meta JSON");
-            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "Failed to parse meta JSON."));
+            return (HttpStatusCode.BadRequest, new[] { "Failed to parse meta JSON." });
         }
 
         // Basic validation
         if (string.IsNullOrWhiteSpace(parsed.CameraId))
-            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "EdgeEvent_id is required."));
+            return (HttpStatusCode.BadRequest, new[] { "EdgeEvent_id is required." });
         if (string.IsNullOrWhiteSpace(parsed.TimestampUtc))
-            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "timestamp_utc is required."));
+            return (HttpStatusCode.BadRequest, new[] { "timestamp_utc is required." });
 
 
         string? rawRel = null, annRel = null;
@@ -166,10 +361,11 @@ public sealed class EdgeDataController : ControllerBase
             rawRel = await fileService.SaveAsync(frame_raw, "edge-frames/raw", ct);
         if (frame_annotated is not null)
             annRel = await fileService.SaveAsync(frame_annotated, "edge-frames/annotated", ct);
-        if (parsed == null)
-            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "meta_data is required."));
-        if (rawRel == null)
-            return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, "frame_raw is required."));
+        // gated frames (unchanged scene on the edge) carry no raw frame, and an
+        // edge in annotated-only mode sends just the annotated one
+        var gated = parsed.Gate?.Gated == true;
+        if (rawRel == null && annRel == null && !gated)
+            return (HttpStatusCode.BadRequest, new[] { "frame_raw is required." });
 
         try
         {
@@ -181,27 +377,20 @@ public sealed class EdgeDataController : ControllerBase
                 parsed.Image.Width,
                 parsed.Image.Height,
                 parsed.Detections != null ? parsed.Detections.ToArray().ToString() : "",
-                $"{Request.Scheme}://{Request.Host}/uploads/{rawRel}",
+                rawRel != null ? $"{Request.Scheme}://{Request.Host}/uploads/{rawRel}" : "",
                annRel != null ? $"{Request.Scheme}://{Request.Host}/uploads/{annRel}" : "");
 
             var validation = await _createValidator.ValidateAsync(req, ct);
             if (!validation.IsValid)
-                return BadRequest(ApiResponse.Fail(HttpStatusCode.BadRequest, validation.Errors.Select(e => e.ErrorMessage).ToArray()));
-
-            var created = await _EdgeEvents.CreateAsync(req, ct);
-
-            // Bust OutputCache for all EdgeEvents GETs
-            await cache.EvictByTagAsync("EdgeEvents", ct);
-            return Ok();
-            //return CreatedAtAction(nameof(GetById), new { version = "1.0", id = created.Id }, ApiResponse.Created(created));
+                return (HttpStatusCode.BadRequest, validation.Errors.Select(e => e.ErrorMessage).ToArray());
 
+            await _EdgeEvents.CreateAsync(req, ct);
+            return (HttpStatusCode.OK, Array.Empty<string>());
         }
         catch (Exception ex)
         {
             _logger.LogError(ex, "Create EdgeEvent failed");
-            return StatusCode(StatusCodes.Status500InternalServerError,
-                ApiResponse.Fail(HttpStatusCode.InternalServerError, ex.Message));
+            return (HttpStatusCode.InternalServerError, new[] { ex.Message });
         }
     }
 }
-
@@ -0,0 +1,15 @@
+﻿
+using System.Text.Json.Serialization;
+
+// One entry per item of a batch ingest, in request order.
+public sealed class EdgeBatchItemResult
+{
+    [JsonPropertyName("id")]
+    public string Id { get; set; } = default!;
+
+    [JsonPropertyName("success")]
+    public bool Success { get; set; }
+
+    [JsonPropertyName("errors")]
+    public string[] Errors { get; set; } = Array.Empty<string>();
+}
@@ -0,0 +1,16 @@
+﻿
+using System.Text.Json.Serialization;
+
+// Set by the edge motion gate: the scene did not change, detections were
+// reused from an earlier frame and no raw frame is uploaded.
+public sealed class EdgeGate
+{
+    [JsonPropertyName("gated")]
+    public bool Gated { get; set; }
+
+    [JsonPropertyName("score")]
+    public double Score { get; set; }
+
+    [JsonPropertyName("reused_from")]
+    public string? ReusedFrom { get; set; }
+}
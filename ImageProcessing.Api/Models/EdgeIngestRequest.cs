@@ -2,8 +2,9 @@
 
 public sealed class EdgeIngestRequest
 {
-    [Required]
-    public string Meta { get; set; } = default!;
+    // plain meta JSON, or Meta_C in the compact edge format (EdgeMetaCodec)
+    public string? Meta { get; set; }
+    public IFormFile? Meta_C { get; set; }
 
     public IFormFile? Frame_Raw { get; set; }
     public IFormFile? Frame_Annotated { get; set; }
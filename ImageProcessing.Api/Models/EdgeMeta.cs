@@ -20,4 +20,7 @@ public sealed class EdgeMeta
 
     [JsonPropertyName("detections")]
     public List<EdgeDetection> Detections { get; set; } = new();
+
+    [JsonPropertyName("gate")]
+    public EdgeGate? Gate { get; set; }
 }
@@ -83,6 +83,7 @@ builder.Services.AddScoped<IEdgeEventsService, EdgeEventsService>();
 builder.Services.AddScoped<ICamerasService, CamerasService>();
 builder.Services.AddScoped<IDetectTargetsService, DetectTargetsService>();
 builder.Services.AddScoped<ITimelapseFromEdgeEventsService, TimelapseFromEdgeEventsService>();
+builder.Services.AddSingleton<EdgeMetaCodec>(); // keeps compact-meta contexts across requests
 
 
 
@@ -287,6 +288,9 @@ builder.Services.Configure<InputSanitizationOptions>(o =>
     // o.PathExclusions.Add("/metrics");
 });
 
+// edge agents may gzip their upload bodies (Content-Encoding: gzip)
+builder.Services.AddRequestDecompression();
+
 builder.Services.AddCors(options =>
 {
     options.AddPolicy("FrontendDev", p =>
@@ -412,6 +416,7 @@ app.UseAuthorization();
 
 app.UseWhen(ctx => ctx.Request.Path.StartsWithSegments("/api"), apiApp =>
 {
+    apiApp.UseRequestDecompression();
     apiApp.UseMiddleware<InputSanitizationMiddleware>();
 
     apiApp.UseGlobalExceptionHandler();
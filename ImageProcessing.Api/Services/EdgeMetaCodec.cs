@@ -0,0 +1,131 @@
+﻿using System.Collections.Concurrent;
+using System.IO.Compression;
+using System.Text.Json;
+using System.Text.Json.Nodes;
+
+// Decodes the edge agent's compact meta (Python/meta_codec.py) back into the
+// regular meta JSON that IngestOneAsync parses. Per-camera constants (model,
+// targets, image size, class names) arrive as content-addressed contexts once
+// per edge session and are kept here; an event pointing at a context this
+// instance has not seen is answered with 409 so the edge resends it.
+public sealed class EdgeMetaCodec
+{
+    public const string MediaType = "application/vnd.edge-meta.v1";
+
+    // what we read, most preferred first (sent back in Accept with a 415)
+    public static readonly string[] Supported =
+    {
+        MediaType + "+json; enc=gzip",
+        MediaType + "+json",
+    };
+
+    private const int MaxContexts = 10_000;
+    private readonly ConcurrentDictionary<string, JsonObject> _contexts = new();
+
+    public static bool IsSupported(string? contentType, out bool gzip)
+    {
+        gzip = false;
+        if (string.IsNullOrWhiteSpace(contentType))
+            return false;
+
+        var parts = contentType.Split(';', StringSplitOptions.TrimEntries | StringSplitOptions.RemoveEmptyEntries);
+        if (!string.Equals(parts[0], MediaType + "+json", StringComparison.OrdinalIgnoreCase))
+            return false;
+
+        foreach (var p in parts.Skip(1))
+        {
+            var kv = p.Split('=', 2, StringSplitOptions.TrimEntries);
+            if (kv.Length == 2 && kv[0].Equals("enc", StringComparison.OrdinalIgnoreCase))
+            {
+                if (kv[1].Equals("gzip", StringComparison.OrdinalIgnoreCase))
+                    gzip = true;
+                else if (!kv[1].Equals("none", StringComparison.OrdinalIgnoreCase))
+                    return false;
+            }
+        }
+        return true;
+    }
+
+    public async Task<JsonObject?> ReadAsync(IFormFile part, bool gzip, CancellationToken ct)
+    {
+        await using var stream = part.OpenReadStream();
+        await using var body = gzip ? new GZipStream(stream, CompressionMode.Decompress) : stream;
+        var payload = await JsonNode.ParseAsync(body, cancellationToken: ct) as JsonObject;
+
+        if (payload?["ctx"] is JsonObject ctxs)
+        {
+            if (_contexts.Count + ctxs.Count > MaxContexts)
+                _contexts.Clear(); // edges resend on 409
+            foreach (var (id, ctx) in ctxs)
+                if (ctx is JsonObject obj)
+                    _contexts[id] = (JsonObject)obj.DeepClone();
+        }
+        return payload;
+    }
+
+    // Compact event -> meta JSON. Null for a malformed event, or with
+    // missingContext set when we don't have the context it points at.
+    public string? Expand(JsonNode? ev, out string? missingContext)
+    {
+        missingContext = null;
+        if (ev is not JsonObject || ev["x"]?.GetValue<string>() is not string ctxId)
+            return null;
+        if (!_contexts.TryGetValue(ctxId, out var ctx))
+        {
+            missingContext = ctxId;
+            return null;
+        }
+
+        var names = ctx["names"] as JsonObject;
+        var dets = new JsonArray();
+        int people = 0;
+        double confSum = 0;
+        foreach (var node in ev["d"] as JsonArray ?? new JsonArray())
+        {
+            var d = node!.AsArray();
+            int classId = d[0]!.GetValue<int>();
+            string name = names?[classId.ToString()]?.GetValue<string>() ?? classId.ToString();
+            double conf = d[1]!.GetValue<double>() / 1000.0;
+            dets.Add(new JsonObject
+            {
+                ["class_id"] = classId,
+                ["class_name"] = name,
+                ["confidence"] = conf,
+                ["bbox_xyxy"] = new JsonArray(
+                    d[2]!.GetValue<double>(), d[3]!.GetValue<double>(),
+                    d[4]!.GetValue<double>(), d[5]!.GetValue<double>()),
+                ["track_id"] = d[6]?.DeepClone(),
+            });
+            confSum += conf;
+            if (name == "person")
+                people++;
+        }
+
+        var meta = new JsonObject
+        {
+            ["timestamp_utc"] = DateTimeOffset.FromUnixTimeMilliseconds(ev["t"]!.GetValue<long>())
+                .UtcDateTime.ToString("yyyy-MM-dd'T'HH:mm:ss.fff'Z'"),
+            ["camera_id"] = ev["c"]?.DeepClone(),
+            ["image"] = ctx["image"]?.DeepClone(),
+            ["compute"] = new JsonObject
+            {
+                ["inference_ms"] = ev["ms"]?.DeepClone() ?? 0.0,
+                ["model"] = ctx["model"]?.DeepClone(),
+            },
+            ["targets"] = ctx["targets"]?.DeepClone(),
+            ["detections"] = dets,
+            ["people"] = new JsonObject
+            {
+                ["count"] = people,
+                ["confidence_avg"] = dets.Count > 0 ? Math.Round(confSum / dets.Count, 3) : 0.0,
+            },
+        };
+        if (ev["g"] is JsonNode gate)
+            meta["gate"] = gate.DeepClone();
+        if (ev["o"] is JsonObject other)
+            foreach (var (k, v) in other)
+                meta[k] = v?.DeepClone();
+
+        return meta.ToJsonString();
+    }
+}
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Per-camera, per-class hourly counts over ~1M detections:
+columnar detections table (db.count_buckets) vs parsing meta_json per row.
+
+- Fills two throw-away DBs with the same `--events` events x `--dets`
+  detections over `--cameras` cameras and `--days` days:
+    "columnar": store_many() with meta dicts (detections table)
+    "json":     store_many() with meta_json strings (old layout)
+- Times the aggregation on each and checks that the totals agree.
+
+Example (from the Python/ folder):
+  python bench/bench_aggregate.py --events 200000 --dets 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db  # noqa: E402
+
+_NAMES = {0: "person", 1: "bicycle", 2: "car", 7: "truck"}
+
+
+def _meta(rng: random.Random, cam: str, n: int) -> dict:
+    dets = []
+    for _ in range(n):
+        cid = rng.choice(list(_NAMES))
+        x, y = rng.uniform(0, 1200), rng.uniform(0, 650)
+        dets.append({"class_id": cid, "class_name": _NAMES[cid], "confidence": round(rng.random(), 4),
+                     "bbox_xyxy": [x, y, x + 60.0, y + 120.0], "track_id": rng.randint(1, 500)})
+    return {"timestamp_utc": "2025-01-01T00:00:00.000Z", "camera_id": cam,
+            "image": {"width": 1280, "height": 720}, "compute": {"inference_ms": 10.0, "model": "yolo11m.pt"},
+            "targets": ["person", "car"], "detections": dets,
+            "people": {"count": sum(d["class_id"] == 0 for d in dets), "confidence_avg": 0.5}}
+
+
+def _fill(path: str, args, as_json: bool) -> None:
+    db.close_db()
+    db.DB_NAME = path
+    db.init_db()
+    rng = random.Random(1)
+    start = args.base - args.days * 86400
+    step = args.days * 86400 / args.events
+    batch = []
+    for i in range(args.events):
+        cam = f"CAM{i % args.cameras}"
+        meta = _meta(rng, cam, args.dets)
+        batch.append((cam, args.dets, json.dumps(meta) if as_json else meta, None, None))
+        if len(batch) == 2000 or i == args.events - 1:
+            first = db._writer().execute("SELECT COALESCE(MAX(id), 0) FROM people_count").fetchone()[0]
+            db.store_many(batch)
+            # spread events over --days (store_many stamps "now")
+            with db._writer() as con:
+                con.execute("UPDATE people_count SET created_ts = CAST(? + (id - 1) * ? AS INTEGER) WHERE id > ?",
+                            (start, step, first))
+            batch = []
+
+
+def _json_buckets(start_ts: int, end_ts: int, bucket: int) -> Counter:
+    out: Counter = Counter()
+    cur = db._reader().execute(
+        "SELECT camera_id, created_ts, meta_json FROM people_count WHERE created_ts >= ? AND created_ts < ?",
+        (start_ts, end_ts))
+    for cam, ts, meta_json in cur:
+        for d in json.loads(meta_json).get("detections", []):
+            out[(cam, ts // bucket * bucket, d["class_id"])] += 1
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Columnar vs JSON detection aggregation")
+    ap.add_argument("--events", type=int, default=200_000)
+    ap.add_argument("--dets", type=int, default=5)
+    ap.add_argument("--cameras", type=int, default=20)
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--bucket", type=int, default=3600)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_agg_")
+    total = args.events * args.dets
+    args.base = int(time.time())  # same timestamps in both DBs
+    end = args.base + 1
+    start = end - args.days * 86400 - 1
+    print(f"{args.events} events x {args.dets} = {total} detections, bucket {args.bucket}s")
+    print(f"{'layout':>9} {'fill s':>8} {'query s':>8} {'DB MB':>7} {'groups':>7} {'dets':>9}")
+
+    for layout in ("columnar", "json"):
+        path = os.path.join(tmp, f"{layout}.db")
+        t0 = time.perf_counter()
+        _fill(path, args, as_json=layout == "json")
+        fill = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        if layout == "columnar":
+            rows = db.count_buckets(start, end, args.bucket)
+            groups, dets = len(rows), sum(r[3] for r in rows)
+        else:
+            res = _json_buckets(start, end, args.bucket)
+            groups, dets = len(res), sum(res.values())
+        query = time.perf_counter() - t0
+
+        db.close_db()
+        size = os.path.getsize(path) / (1024 * 1024)
+        print(f"{layout:>9} {fill:>8.1f} {query:>8.2f} {size:>7.1f} {groups:>7} {dets:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Latency and memory per inference backend (torch / onnx / openvino).
+
+- Each backend runs in its own child process so RSS is not shared.
+- The child loads the backend through detect._get_model() (so the export
+  cache is used/created), warms up, then times `--runs` single-frame predicts.
+- Prints p50/p95 latency (ms) and peak RSS (MB) per backend.
+
+Example (from the Python/ folder):
+  python bench/bench_backends.py --image test.jpg --backends torch,onnx,openvino
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def _child(backend: str, image: str, runs: int, threads: int) -> None:
+    import cv2
+    import numpy as np
+
+    import detect
+    detect.INFER_BACKEND = backend
+    detect.INFER_THREADS = threads
+
+    img = cv2.imread(image)
+    if img is None:
+        raise SystemExit(f"Failed to read image: {image}")
+
+    model = detect._get_model()
+    loaded = type(model).__name__ != "YOLO" or backend == "torch"
+    model.predict(source=img, conf=0.20, verbose=False)  # warm-up
+
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        model.predict(source=img, conf=0.20, verbose=False)
+        times.append((time.perf_counter() - t0) * 1000.0)
+
+    print(json.dumps({
+        "backend": backend,
+        "loaded": loaded,  # False -> fell back to torch
+        "p50_ms": float(np.percentile(times, 50)),
+        "p95_ms": float(np.percentile(times, 95)),
+        # ru_maxrss is KiB on Linux
+        "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inference backend latency / RSS benchmark")
+    ap.add_argument("--image", default="test.jpg", help="Input image")
+    ap.add_argument("--backends", default="torch,onnx,openvino",
+                    help="Comma-separated backends to compare")
+    ap.add_argument("--runs", type=int, default=20, help="Timed predicts per backend")
+    ap.add_argument("--threads", type=int, default=0,
+                    help="Runtime CPU threads (0 = runtime default)")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.child, args.image, args.runs, args.threads)
+        return
+
+    print(f"{'backend':>9} {'p50 ms':>9} {'p95 ms':>9} {'RSS MB':>9}")
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", backend,
+             "--image", args.image, "--runs", str(args.runs), "--threads", str(args.threads)],
+            capture_output=True, text=True)
+        lines = [ln for ln in proc.stdout.splitlines() if ln.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"{backend:>9} failed: {proc.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = json.loads(lines[-1])
+        note = "" if r["loaded"] else "  (fell back to torch)"
+        print(f"{backend:>9} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['rss_mb']:>9.1f}{note}")
+
+
+if __name__ == "__main__":
+    main()
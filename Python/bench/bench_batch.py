@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Throughput of detect.detect_batch() vs batch size.
+
+- Loads one image (default test.jpg) and pretends it came from N cameras.
+- Pins the target cache so no HTTP call is made.
+- For each batch size, runs a warm-up pass and then times `--rounds` passes.
+- Prints frames/sec per batch size.
+
+Example (from the Python/ folder):
+  python bench/bench_batch.py --image test.jpg --sizes 1,4,8,16
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cv2  # noqa: E402
+
+import detect  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Batched YOLO throughput benchmark")
+    ap.add_argument("--image", default="test.jpg", help="Input image")
+    ap.add_argument("--sizes", default="1,4,8,16",
+                    help="Comma-separated batch sizes")
+    ap.add_argument("--rounds", type=int, default=5,
+                    help="Timed passes per batch size")
+    ap.add_argument("--targets", default="person",
+                    help="Comma-separated classes for every fake camera")
+    args = ap.parse_args()
+
+    img = cv2.imread(args.image)
+    if img is None:
+        raise SystemExit(f"Failed to read image: {args.image}")
+
+    sizes = [int(x) for x in args.sizes.split(",") if x.strip()]
+    targets = [t.strip().lower() for t in args.targets.split(",") if t.strip()]
+
+    # no remote lookups during the benchmark
+    detect._targets_cache["default"] = targets
+    detect._targets_cache["expires_at"] = float("inf")
+    detect._get_model()
+
+    print(f"{'batch':>6} {'frames':>8} {'sec':>8} {'fps':>8}")
+    for bs in sizes:
+        detect.DETECT_BATCH_SIZE = bs
+        items = [({"key": f"BENCH{i}", "id": f"BENCH{i}"}, img.copy())
+                 for i in range(bs)]
+        detect.detect_batch(items)  # warm-up
+
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            detect.detect_batch(items)
+        dt = time.perf_counter() - t0
+        frames = bs * args.rounds
+        print(f"{bs:>6} {frames:>8} {dt:>8.2f} {frames / dt:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Decode cost per capture mode (decoder.open_stream backends).
+
+- Modes are "<backend>[-hw][-key][-<width>]": backend opencv | pyav | ffmpeg,
+  -hw = CAPTURE_HWACCEL "auto", -key = keyframes only, -<width> = decode width.
+- Each mode runs in its own child process; the child decodes the whole
+  `--source` file (or `--seconds` of a live URL) and reports process CPU
+  (incl. the ffmpeg child) and frames out. A mode whose backend is missing
+  shows the backend it fell back to.
+- Prints CPU % of one core at real time, CPU ms per decoded frame, and CPU per
+  grabbed frame for a pool reader polled every `--every-sec` (the reader decodes
+  continuously, a grab takes the newest frame).
+- Also times the black-frame check: full-array mean/var vs decoder.is_usable.
+
+Without --source a 1080p mp4 clip is generated (cv2.VideoWriter, mp4v).
+
+Example (from the Python/ folder):
+  python bench/bench_decode.py --source rtsp://cam/sub --seconds 20
+  python bench/bench_decode.py --modes opencv,pyav-key,ffmpeg-key-640
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+DEFAULT_MODES = "opencv,opencv-hw,pyav,pyav-key,pyav-key-640,ffmpeg,ffmpeg-key,ffmpeg-key-640"
+
+
+def _parse_mode(mode: str):
+    parts = mode.split("-")
+    backend, width = parts[0], 0
+    for p in parts[1:]:
+        if p.isdigit():
+            width = int(p)
+    return backend, "key" in parts[1:], "auto" if "hw" in parts[1:] else "none", width
+
+
+def _child(mode: str, source: str, seconds: float) -> None:
+    from decoder import is_usable, open_stream
+
+    backend, keyframes, hwaccel, width = _parse_mode(mode)
+    t0 = os.times()
+    wall0 = time.perf_counter()
+    stream = open_stream(source, width, backend=backend, keyframes=keyframes, hwaccel=hwaccel)
+    frames, usable, shape = 0, 0, None
+    while stream.isOpened():
+        ret, frame = stream.read()
+        if not ret:
+            break
+        frames += 1
+        usable += bool(is_usable(frame))
+        shape = frame.shape
+        if seconds and time.perf_counter() - wall0 >= seconds:
+            break
+    used = stream.backend
+    stream.release()  # waits for an ffmpeg child, so its CPU is in children_*
+    t1 = os.times()
+    cpu = (t1.user - t0.user) + (t1.system - t0.system) \
+        + (t1.children_user - t0.children_user) + (t1.children_system - t0.children_system)
+    print(json.dumps({"backend": used, "frames": frames, "usable": usable, "cpu_s": cpu,
+                      "wall_s": time.perf_counter() - wall0,
+                      "shape": list(shape) if shape else None}))
+
+
+def _make_clip(path: str, seconds: int, fps: int) -> None:
+    import cv2
+    import numpy as np
+
+    w, h = 1920, 1080
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    rng = np.random.default_rng(0)
+    bg = cv2.GaussianBlur(rng.integers(0, 255, (h, w, 3), dtype=np.uint8), (0, 0), 8)
+    for i in range(seconds * fps):
+        frame = bg.copy()
+        x = int((i * 12) % (w - 200))
+        cv2.rectangle(frame, (x, 400), (x + 120, 700), (40, 40, 220), -1)
+        out.write(frame)
+    out.release()
+
+
+def _media_seconds(source: str) -> float:
+    import cv2
+    cap = cv2.VideoCapture(source)
+    n, fps = cap.get(cv2.CAP_PROP_FRAME_COUNT), cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return n / fps if n > 0 and fps > 0 else 0.0
+
+
+def _black_check(runs: int) -> None:
+    import numpy as np
+    from decoder import is_usable
+
+    frame = np.random.default_rng(0).integers(0, 255, (2160, 3840, 3), dtype=np.uint8)
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        _ = frame.mean() > 1.0 or frame.var() > 1.0
+    full = (time.perf_counter() - t0) / runs
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        is_usable(frame)
+    thumb = (time.perf_counter() - t0) / runs
+    print(f"black-frame check on 4K: full mean/var {full * 1000:.2f} ms, thumbnail {thumb * 1000:.3f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="CPU per decoded / grabbed frame per capture mode")
+    ap.add_argument("--source", default=None, help="Video file or stream URL (default: generated clip)")
+    ap.add_argument("--seconds", type=float, default=0.0, help="Stop after N s (live streams)")
+    ap.add_argument("--modes", default=DEFAULT_MODES)
+    ap.add_argument("--every-sec", type=float, default=5.0, help="Grab interval for the per-grab column")
+    ap.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        _child(args.child, args.source, args.seconds)
+        return
+
+    source = args.source
+    if source is None:
+        source = os.path.join(tempfile.mkdtemp(prefix="bench_decode_"), "clip.mp4")
+        _make_clip(source, seconds=10, fps=25)
+    media = args.seconds if args.seconds else _media_seconds(source)
+
+    print(f"source={source} media={media:.1f}s grab every {args.every_sec:g}s")
+    print(f"{'mode':>16} {'backend':>16} {'frames':>7} {'cpu_s':>7} {'cpu%rt':>7} {'ms/frame':>9} {'ms/grab':>8}")
+    for mode in args.modes.split(","):
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", mode, "--source", source,
+               "--seconds", str(args.seconds)]
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        try:
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            print(f"{mode:>16} failed: {out.stderr.strip()[-200:]}")
+            continue
+        per_sec = r["cpu_s"] / media if media else 0.0
+        print(f"{mode:>16} {r['backend']:>16} {r['frames']:>7} {r['cpu_s']:>7.2f} {per_sec * 100:>6.1f}% "
+              f"{r['cpu_s'] / max(1, r['frames']) * 1000:>9.2f} {per_sec * args.every_sec * 1000:>8.1f}")
+
+    _black_check(20)
+
+
+if __name__ == "__main__":
+    main()
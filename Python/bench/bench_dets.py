@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Per-frame detection handling: per-box dicts vs the Detections record batch.
+
+- Builds an ultralytics Results with N tracked boxes over 80 classes (no
+  model needed) and a class filter of `--allowed` classes.
+- Times each step the agent runs per inferred frame, old (the previous
+  dict-per-box code, copied here) against new (detect / db on Detections):
+    extract  result boxes -> detections, filtered to the target classes
+    meta     _to_meta (people count, confidence average)
+    db       detections-table params + rollup params (db.store_many)
+    draw     annotated frame (_draw_anno, 1080p)
+    dicts    materialising dicts (only done where meta is serialised)
+- Checks that both paths give the same dicts before timing.
+
+Example (from the Python/ folder):
+  python bench/bench_dets.py --boxes 10,100,1000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+
+# ------------------ previous implementation ------------------
+
+def _old_extract(result, names, allowed_ids):
+    dets = []
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy()
+    conf = boxes.conf.cpu().numpy()
+    cls = boxes.cls.cpu().numpy()
+    ids = boxes.id.cpu().numpy() if boxes.id is not None else None
+    for i in range(len(xyxy)):
+        class_id = int(cls[i])
+        if allowed_ids is not None and class_id not in allowed_ids:
+            continue
+        dets.append({
+            "class_id": class_id,
+            "class_name": names.get(class_id, str(class_id)),
+            "confidence": float(conf[i]),
+            "bbox_xyxy": [float(x) for x in xyxy[i].tolist()],
+            "track_id": int(ids[i]) if ids is not None and i < len(ids) and ids[i] is not None else None
+        })
+    return dets
+
+
+def _old_meta(dets, targets):
+    conf_avg = round(sum(d["confidence"]
+                     for d in dets) / len(dets), 3) if dets else 0.0
+    return {
+        "timestamp_utc": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+        "camera_id": "c",
+        "image": {"width": 1920, "height": 1080},
+        "compute": {"inference_ms": 1.0, "model": "bench"},
+        "targets": targets,
+        "detections": dets,
+        "people": {"count": len([d for d in dets if d.get("class_name") == "person"]),
+                   "confidence_avg": conf_avg}
+    }
+
+
+def _old_db(meta):
+    from db import ALL_CLASSES, ROLLUP_BUCKETS_SEC
+
+    dets = list(meta.get("detections") or [])
+    header = {k: v for k, v in meta.items() if k not in ("detections", "people")}
+    header["_classes"] = {str(d["class_id"]): d.get("class_name") for d in dets}
+    json.dumps(header, ensure_ascii=False, separators=(",", ":"))
+    params = []
+    for i, d in enumerate(dets):
+        x1, y1, x2, y2 = d["bbox_xyxy"]
+        params.append((1, i, int(d["class_id"]), float(d["confidence"]), x1, y1, x2, y2, d.get("track_id")))
+
+    counts = {str(t): 0 for t in (meta.get("targets") or [])}
+    confs = {k: 0.0 for k in counts}
+    total_conf = 0.0
+    for d in dets:
+        name = str(d.get("class_name"))
+        conf = float(d.get("confidence") or 0.0)
+        counts[name] = counts.get(name, 0) + 1
+        confs[name] = confs.get(name, 0.0) + conf
+        total_conf += conf
+    counts[ALL_CLASSES] = len(dets)
+    confs[ALL_CLASSES] = total_conf
+    rollups = []
+    for bucket in ROLLUP_BUCKETS_SEC:
+        bts = 0 // bucket * bucket
+        for name, n in counts.items():
+            rollups.append(("bench", name, bucket, bts, n, n, n, confs[name]))
+    return params, rollups
+
+
+def _old_draw(img, dets, scale=1.0):
+    out = img.copy()
+    for d in dets:
+        x1, y1, x2, y2 = (int(v * scale) for v in d["bbox_xyxy"])
+        color = (0, 220, 255)
+        cv2.rectangle(out, (x1, y1), (x2, y2), color, 2)
+        label = f'id{d["track_id"]} {d["class_name"]} {d["confidence"]:.2f}'
+        (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
+        top = max(0, y1 - th - 6)
+        cv2.rectangle(out, (x1, top), (x1 + tw + 2, y1), color, -1)
+        cv2.putText(out, label, (x1, y1 - 4), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 2)
+    return out
+
+
+# ------------------ new implementation ------------------
+
+def _new_db(meta):
+    import db
+
+    _, dets = db._split_meta(meta)
+    return [(1, i, *r) for i, r in enumerate(dets.rows())], db._rollup_params("bench", 0, meta)
+
+
+# ------------------ bench ------------------
+
+def _result(n, img, rng):
+    import torch
+    from ultralytics.engine.results import Results
+
+    names = {i: f"class{i}" for i in range(80)}
+    names[0] = "person"
+    h, w = img.shape[:2]
+    x1 = rng.uniform(0, w - 100, n)
+    y1 = rng.uniform(0, h - 100, n)
+    data = np.stack([x1, y1, x1 + rng.uniform(20, 100, n), y1 + rng.uniform(20, 100, n),
+                     np.arange(1, n + 1), rng.uniform(0.2, 1.0, n), rng.integers(0, 80, n)], axis=1)
+    return Results(img, path="", names=names, boxes=torch.as_tensor(data, dtype=torch.float32)), names
+
+
+def _time(fn, runs):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - t0) / runs * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-box dicts vs Detections record batch")
+    ap.add_argument("--boxes", default="10,100,1000")
+    ap.add_argument("--allowed", type=int, default=10, help="Target classes (0 = no filter)")
+    ap.add_argument("--runs", type=int, default=200)
+    args = ap.parse_args()
+
+    import detect
+
+    rng = np.random.default_rng(0)
+    img = np.full((1080, 1920, 3), 60, dtype=np.uint8)
+    allowed = set(range(args.allowed)) if args.allowed else None
+    targets = ["person", "class1"]
+
+    print(f"allowed classes {args.allowed or 'all'} of 80, {args.runs} runs, us per frame")
+    print(f"{'boxes':>6} {'kept':>5} {'step':>8} {'old us':>10} {'new us':>10} {'speedup':>8}")
+    for n in (int(v) for v in args.boxes.split(",")):
+        res, names = _result(n, img, rng)
+        old = _old_extract(res, names, allowed)
+        new = detect._extract_dets(res, names, allowed)
+        old_meta, new_meta = _old_meta(old, targets), detect._to_meta("c", 1920, 1080, new, 1.0, targets)
+        assert new.to_dicts() == old, "Detections dicts differ from the old dicts"
+        assert new_meta["people"] == old_meta["people"]
+        old_db, new_db = _old_db(old_meta), _new_db(new_meta)
+        assert new_db[0] == old_db[0] and sorted(new_db[1]) == sorted(old_db[1])
+        runs = max(5, args.runs * 10 // max(10, n))
+
+        steps = [
+            ("extract", lambda: _old_extract(res, names, allowed),
+             lambda: detect._extract_dets(res, names, allowed)),
+            ("meta", lambda: _old_meta(old, targets), lambda: detect._to_meta("c", 1920, 1080, new, 1.0, targets)),
+            ("db", lambda: _old_db(old_meta), lambda: _new_db(new_meta)),
+            ("draw", lambda: _old_draw(img, old), lambda: detect._draw_anno(img, new)),
+            ("dicts", lambda: old, lambda: new.to_dicts()),
+        ]
+        total_old = total_new = 0.0
+        for name, f_old, f_new in steps:
+            t_old, t_new = _time(f_old, runs), _time(f_new, runs)
+            if name != "dicts":
+                total_old += t_old
+                total_new += t_new
+            print(f"{n:>6} {len(new):>5} {name:>8} {t_old:>10.1f} {t_new:>10.1f} {t_old / max(t_new, 1e-9):>7.1f}x")
+        print(f"{n:>6} {len(new):>5} {'total':>8} {total_old:>10.1f} {total_new:>10.1f} "
+              f"{total_old / max(total_new, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
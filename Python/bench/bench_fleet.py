@@ -0,0 +1,565 @@
+#!/usr/bin/env python3
+"""
+End-to-end agent benchmark: main.main() against a synthetic camera fleet.
+
+- Starts one local HTTP stub that plays the cloud API (REMOTE_CAMERAS_URL,
+  REMOTE_TARGETS_URL, API_URL, API_URL/batch, API_URL/rollups) and the
+  cameras: with --source mjpeg (default) every camera is an MJPEG stream
+  (/cam/<i>.mjpg) at --stream-fps, a slow pan over --image so the motion gate
+  and the tracker see a changing scene. --source image sends cameras without
+  a stream, so detect falls back to TEST_FRAME_PATH (a static scene);
+  --rtsp "rtsp://127.0.0.1:8554/cam{i}" points them at a real RTSP server.
+- Patches config before anything else imports it (paths go to a throw-away
+  work dir, metrics endpoint off, logging at WARNING), then runs main.main()
+  for --warmup + --duration seconds and stops it like SIGTERM would.
+- Times the stages by wrapping the pipeline's calls: grab, infer (one batch),
+  encode (one jpg), store (one SQLite transaction), sync (one POST), and
+  e2e (grab start -> row committed). Only the --duration window counts.
+- Writes a JSON results file (fps, p50/p95/p99 per stage, RSS, disk bytes);
+  --compare OLD.json prints the deltas and exits 1 on a regression beyond
+  --tolerance, so two releases can be diffed on the same box.
+
+Example (from the Python/ folder):
+  python bench/bench_fleet.py --cameras 16 --every-sec 1 --duration 60 --out fleet.json
+  python bench/bench_fleet.py --cameras 16 --every-sec 1 --duration 60 --compare fleet.json
+  # raw throughput, without the cadence inference budget:
+  python bench/bench_fleet.py --cameras 16 --set CADENCE_MAX_INFER_PER_SEC=0
+"""
+import argparse
+import ast
+import json
+import math
+import os
+import platform
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+import config  # noqa: E402  (patched before the agent modules import it)
+
+STAGES = ("grab", "infer", "encode", "store", "sync", "e2e")
+
+
+# ------------------ synthetic fleet ------------------
+
+def _pan_frames(image: Optional[str], width: int, count: int, quality: int) -> List[bytes]:
+    """`count` jpgs panning slowly across the image (a loop the streams replay)."""
+    img = cv2.imread(image) if image else None
+    if img is None:
+        rng = np.random.default_rng(0)
+        img = cv2.GaussianBlur(rng.integers(0, 255, (1200, 2000, 3), dtype=np.uint8), (31, 31), 0)
+    height = int(round(img.shape[0] * width / img.shape[1]))
+    big = cv2.resize(img, (int(width * 1.1), int(height * 1.1)), interpolation=cv2.INTER_AREA)
+    span_x, span_y = big.shape[1] - width, big.shape[0] - height
+    out = []
+    for i in range(count):
+        p = abs(2.0 * i / count - 1.0)  # there and back, so the loop has no jump
+        x, y = int(p * span_x), int(p * span_y * 0.5)
+        ok, buf = cv2.imencode(".jpg", big[y:y + height, x:x + width], [cv2.IMWRITE_JPEG_QUALITY, quality])
+        out.append(buf.tobytes())
+    return out
+
+
+class _Fleet:
+    """What the stub serves: the camera list, targets, and the MJPEG loops."""
+
+    def __init__(self, args, frames: List[bytes]) -> None:
+        self.cameras = args.cameras
+        self.every_sec = args.every_sec
+        self.source = args.source
+        self.rtsp = args.rtsp
+        self.targets = [t.strip() for t in args.targets.split(",") if t.strip()]
+        self.fps = args.stream_fps
+        self.frames = frames
+        self.latency = args.latency_ms / 1000.0
+        self.base = ""
+        self.counts = {"batch_posts": 0, "single_posts": 0, "rollup_posts": 0, "rows_accepted": 0}
+        self.lock = threading.Lock()
+
+    def camera_rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for i in range(self.cameras):
+            if self.rtsp:
+                url = self.rtsp.format(i=i)
+            elif self.source == "mjpeg":
+                url = f"{self.base}/cam/{i}.mjpg"
+            else:
+                url = None
+            rows.append({"id": f"BENCH{i:03d}", "key": f"bench{i:03d}", "location": "bench",
+                         "rtsp": url, "every_sec": self.every_sec, "isActive": True})
+        return rows
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self.lock:
+            self.counts[name] += n
+
+
+def _stub(fleet: _Fleet) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def _json(self, doc: Any, status: int = 200) -> None:
+            out = json.dumps(doc).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path.endswith("/cameras/all"):
+                self._json({"isSuccess": True, "result": fleet.camera_rows()})
+            elif path.endswith("/DetectTargets/all"):
+                self._json({"isSuccess": True, "result": [
+                    {"cameraKey": c["key"], "targets": fleet.targets} for c in fleet.camera_rows()]})
+            elif path.startswith("/cam/") and path.endswith(".mjpg"):
+                self._mjpeg(int(path[5:-5]))
+            else:
+                self.send_error(404)
+
+        def _mjpeg(self, idx: int) -> None:
+            # multipart/x-mixed-replace, paced at the stream fps like a real camera
+            self.send_response(200)
+            self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            n = len(fleet.frames)
+            i = (idx * 7) % n  # cameras start at different points of the pan
+            step = 1.0 / max(0.1, fleet.fps)
+            nxt = time.monotonic()
+            try:
+                while True:
+                    data = fleet.frames[i % n]
+                    self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n"
+                                     + f"Content-Length: {len(data)}\r\n\r\n".encode() + data + b"\r\n")
+                    i += 1
+                    nxt += step
+                    time.sleep(max(0.0, nxt - time.monotonic()))
+            except (BrokenPipeError, ConnectionResetError, OSError):
+                return
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(fleet.latency)
+            path = self.path.split("?", 1)[0]
+            if path.endswith("/batch"):
+                marker = b'name="items"'
+                if marker not in body:
+                    self._json({"isSuccess": False}, 415)  # compact meta: make sync fall back to json
+                    return
+                items = body.split(marker, 1)[1].split(b"\r\n\r\n", 1)[1].split(b"\r\n--", 1)[0]
+                res = [{"id": i["id"], "success": True, "errors": []} for i in json.loads(items)]
+                fleet.count("batch_posts")
+                fleet.count("rows_accepted", len(res))
+                self._json({"isSuccess": True, "statusCode": 200, "result": res})
+            elif path.endswith("/rollups"):
+                fleet.count("rollup_posts")
+                self._json({"isSuccess": True, "statusCode": 200, "result": []})
+            else:
+                fleet.count("single_posts")
+                fleet.count("rows_accepted")
+                self._json({"isSuccess": True, "statusCode": 200})
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="bench-stub", daemon=True).start()
+    return srv
+
+
+# ------------------ measurements ------------------
+
+def _percentile(sorted_vals: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    k = max(0, min(len(sorted_vals) - 1, math.ceil(q / 100.0 * len(sorted_vals)) - 1))
+    return sorted_vals[k]
+
+
+class _Recorder:
+    """Per-stage samples (seconds) and counters; nothing is kept before measure()."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.measuring = False
+        self.samples: Dict[str, List[float]] = {s: [] for s in STAGES}
+        self.counts = {"frames": 0, "gated": 0, "rows_synced": 0, "batches": 0, "batch_frames": 0}
+        self._grabbed: Dict[int, Any] = {}    # id(raw)  -> (raw, t0)
+        self._inferred: Dict[int, Any] = {}   # id(meta) -> (meta, t0)
+
+    def add(self, stage: str, sec: float) -> None:
+        if self.measuring:
+            with self.lock:
+                self.samples[stage].append(sec)
+
+    def bump(self, name: str, n: int = 1) -> None:
+        if self.measuring:
+            with self.lock:
+                self.counts[name] += n
+
+    def grabbed(self, raw: Any, t0: float) -> None:
+        with self.lock:
+            self._grabbed[id(raw)] = (raw, t0)
+
+    def inferred(self, raw: Any, meta: Any) -> None:
+        with self.lock:
+            hit = self._grabbed.pop(id(raw), None)
+            if hit is not None:
+                self._inferred[id(meta)] = (meta, hit[1])
+
+    def stored(self, meta: Any, now: float) -> None:
+        with self.lock:
+            hit = self._inferred.pop(id(meta), None)
+        if hit is not None:
+            self.add("e2e", now - hit[1])
+
+    def summary(self) -> Dict[str, Any]:
+        out = {}
+        with self.lock:
+            for stage, vals in self.samples.items():
+                if not vals:
+                    out[stage] = {"n": 0}
+                    continue
+                s = sorted(vals)
+                out[stage] = {
+                    "n": len(s),
+                    "mean_ms": round(sum(s) / len(s) * 1000.0, 3),
+                    "p50_ms": round(_percentile(s, 50) * 1000.0, 3),
+                    "p95_ms": round(_percentile(s, 95) * 1000.0, 3),
+                    "p99_ms": round(_percentile(s, 99) * 1000.0, 3),
+                    "max_ms": round(s[-1] * 1000.0, 3),
+                }
+        return out
+
+
+def _instrument(rec: _Recorder) -> None:
+    """Wrap the names the pipeline / sync call, so the agent code runs unchanged."""
+    import detect
+    import pipeline
+    import sync
+    from motion import is_gated
+
+    grab_frame, detect_batch, store_many = pipeline.grab_frame, pipeline.detect_batch, pipeline.store_many
+    encode_jpg, timed_post, mark_synced_many = detect.encode_jpg, sync._timed_post, sync.mark_synced_many
+
+    def _grab(cam):
+        t0 = time.perf_counter()
+        raw = grab_frame(cam)
+        rec.add("grab", time.perf_counter() - t0)
+        rec.grabbed(raw, t0)
+        return raw
+
+    def _infer(items):
+        t0 = time.perf_counter()
+        outputs = detect_batch(items)
+        rec.add("infer", time.perf_counter() - t0)
+        rec.bump("batches")
+        rec.bump("batch_frames", len(items))
+        for (_, raw), (_, meta) in zip(items, outputs):
+            rec.inferred(raw, meta)
+        return outputs
+
+    def _encode(img, *a, **k):
+        t0 = time.perf_counter()
+        data = encode_jpg(img, *a, **k)
+        rec.add("encode", time.perf_counter() - t0)
+        return data
+
+    def _store(rows):
+        t0 = time.perf_counter()
+        result = store_many(rows)
+        now = time.perf_counter()
+        rec.add("store", now - t0)
+        for row in rows:
+            meta = row[2]
+            rec.bump("frames")
+            if isinstance(meta, dict):
+                if is_gated(meta):
+                    rec.bump("gated")
+                rec.stored(meta, now)
+        return result
+
+    def _post(endpoint, fn, *a, **k):
+        t0 = time.perf_counter()
+        try:
+            return timed_post(endpoint, fn, *a, **k)
+        finally:
+            rec.add("sync", time.perf_counter() - t0)
+
+    def _synced(row_ids, **kwargs):
+        row_ids = list(row_ids)
+        mark_synced_many(row_ids, **kwargs)
+        rec.bump("rows_synced", len(row_ids))
+
+    pipeline.grab_frame, pipeline.detect_batch, pipeline.store_many = _grab, _infer, _store
+    detect.encode_jpg, sync._timed_post, sync.mark_synced_many = _encode, _post, _synced
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        import psutil  # optional
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _io_write_bytes() -> Optional[int]:
+    """Bytes this process caused to be written to storage (Linux /proc/self/io)."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("write_bytes:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class _RssSampler(threading.Thread):
+    def __init__(self, every: float = 0.5) -> None:
+        super().__init__(name="bench-rss", daemon=True)
+        self.every = every
+        self.peak = 0
+        self.last = 0
+        self.halt = threading.Event()
+
+    def run(self) -> None:
+        while not self.halt.wait(self.every):
+            v = _rss_bytes()
+            if v is not None:
+                self.last = v
+                self.peak = max(self.peak, v)
+
+
+def _dir_bytes(root: str) -> int:
+    total = 0
+    for d, _, fs in os.walk(root):
+        for f in fs:
+            try:
+                total += os.path.getsize(os.path.join(d, f))
+            except OSError:  # removed by retention / sqlite meanwhile
+                pass
+    return total
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ------------------ config ------------------
+
+def _patch_config(args, base: str, work: str, image: str) -> Dict[str, Any]:
+    api = base + "/api/v1/EdgeData"
+    patch: Dict[str, Any] = {
+        "API_URL": api,
+        "SYNC_BATCH_URL": api + "/batch",
+        "SYNC_ROLLUP_URL": api + "/rollups",
+        "REMOTE_CAMERAS_URL": base + "/api/v1/cameras/all",
+        "REMOTE_TARGETS_URL": base + "/api/v1/DetectTargets/all",
+        "REQUESTS_VERIFY_TLS": False,
+        "TEST_FRAME_PATH": image,
+        "DB_NAME": os.path.join(work, "edge_data.db"),
+        "FRAME_ROOT": os.path.join(work, "frames"),
+        "TRACKER_STATE_PATH": os.path.join(work, "tracker_state.pkl"),
+        "METRICS_ENABLED": False,
+        "LOG_LEVEL": "INFO" if args.verbose else "WARNING",
+        "LOG_FORMAT": "text",
+        "SYNC_EVERY_SEC": 1,
+        "DELETE_RAW_AFTER_SUCCESS_SYNC": False,
+    }
+    for kv in args.set:
+        key, _, val = kv.partition("=")
+        try:
+            patch[key.strip()] = ast.literal_eval(val)
+        except (ValueError, SyntaxError):
+            patch[key.strip()] = val
+    for key, val in patch.items():
+        if not hasattr(config, key):
+            raise SystemExit(f"unknown config key: {key}")
+        setattr(config, key, val)
+    return patch
+
+
+# ------------------ compare ------------------
+
+def _compare(old: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> int:
+    """Print old -> new for the headline numbers; returns how many regressed."""
+    checks = [("fps", old["results"]["fps"], new["results"]["fps"], True)]
+    for stage in STAGES:
+        for q in ("p50_ms", "p95_ms", "p99_ms"):
+            a = old["results"]["stages"].get(stage, {}).get(q)
+            b = new["results"]["stages"].get(stage, {}).get(q)
+            checks.append((f"{stage}.{q}", a, b, False))
+    for key in ("rss_peak_mb", "disk_bytes_per_frame"):
+        checks.append((key, old["results"].get(key), new["results"].get(key), False))
+
+    if old.get("args") != new.get("args") or old.get("host") != new.get("host"):
+        print("note: runs differ in arguments or host; the comparison may not mean much")
+    regressed = 0
+    print(f"{'metric':>18} {'old':>10} {'new':>10} {'change':>8}")
+    for name, a, b, higher_is_better in checks:
+        if a is None or b is None:
+            continue
+        change = (b - a) / a if a else 0.0
+        worse = change < -tolerance if higher_is_better else change > tolerance
+        regressed += worse
+        print(f"{name:>18} {a:>10.2f} {b:>10.2f} {change * 100:>+7.1f}%{'  REGRESSION' if worse else ''}")
+    return regressed
+
+
+# ------------------ main ------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="main.main() against a synthetic camera fleet")
+    ap.add_argument("--cameras", type=int, default=8)
+    ap.add_argument("--every-sec", type=int, default=1, help="Per-camera detect interval (every_sec)")
+    ap.add_argument("--duration", type=float, default=60.0, help="Measured seconds")
+    ap.add_argument("--warmup", type=float, default=15.0, help="Unmeasured seconds first (model load)")
+    ap.add_argument("--source", choices=("mjpeg", "image"), default="mjpeg")
+    ap.add_argument("--rtsp", default=None, help='Use real streams instead, e.g. "rtsp://127.0.0.1:8554/cam{i}"')
+    ap.add_argument("--image", default="test.jpg", help="Scene for the streams / TEST_FRAME_PATH")
+    ap.add_argument("--width", type=int, default=1280, help="Stream frame width")
+    ap.add_argument("--stream-fps", type=float, default=5.0)
+    ap.add_argument("--targets", default="person,car")
+    ap.add_argument("--latency-ms", type=int, default=20, help="Simulated API round-trip")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="Override a config value (python literal), repeatable")
+    ap.add_argument("--out", default="bench_fleet.json", help="Results file (JSON)")
+    ap.add_argument("--compare", default=None, help="Earlier results file to diff against")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative change")
+    ap.add_argument("--keep", action="store_true", help="Keep the work dir")
+    ap.add_argument("--verbose", action="store_true", help="Agent logs at INFO")
+    args = ap.parse_args()
+
+    image = args.image if os.path.isfile(args.image) else None
+    frames = _pan_frames(image, args.width, max(2, int(args.stream_fps * 10)), 85)
+    work = tempfile.mkdtemp(prefix="bench_fleet_")
+    # TEST_FRAME_PATH (--source image) gets the scene at the same --width as the streams
+    scene = os.path.join(work, "scene.jpg")
+    with open(scene, "wb") as f:
+        f.write(frames[0])
+
+    fleet = _Fleet(args, frames)
+    srv = _stub(fleet)
+    fleet.base = f"http://127.0.0.1:{srv.server_port}"
+    patch = _patch_config(args, fleet.base, work, scene)
+
+    import main as agent  # noqa: E402  (imports the agent with the patched config)
+
+    rec = _Recorder()
+    _instrument(rec)
+    rss = _RssSampler()
+    rss.start()
+    marks: Dict[str, Any] = {}
+
+    def _start_window():
+        marks["t0"], marks["io0"], marks["rss0"] = time.perf_counter(), _io_write_bytes(), _rss_bytes()
+        marks["disk0"] = _dir_bytes(work)
+        rec.measuring = True
+
+    def _end_window():
+        rec.measuring = False
+        marks["t1"], marks["io1"] = time.perf_counter(), _io_write_bytes()
+        agent._handle(signal.SIGTERM, None)  # same path as Ctrl+C / SIGTERM
+
+    threading.Timer(args.warmup, _start_window).start()
+    threading.Timer(args.warmup + args.duration, _end_window).start()
+
+    agent.main()
+    rss.halt.set()
+
+    window = marks["t1"] - marks["t0"]
+    frames_n = rec.counts["frames"]
+    disk_end = _dir_bytes(work)
+    io_bytes = marks["io1"] - marks["io0"] if marks["io0"] is not None and marks["io1"] is not None else None
+    results = {
+        "window_sec": round(window, 2),
+        "frames": frames_n,
+        "fps": round(frames_n / window, 3) if window > 0 else 0.0,
+        "gated": rec.counts["gated"],
+        "mean_batch": round(rec.counts["batch_frames"] / rec.counts["batches"], 2) if rec.counts["batches"] else 0,
+        "rows_synced": rec.counts["rows_synced"],
+        "stages": rec.summary(),
+        "rss_start_mb": round((marks["rss0"] or 0) / 2**20, 1),
+        "rss_peak_mb": round(rss.peak / 2**20, 1),
+        "rss_end_mb": round(rss.last / 2**20, 1),
+        "disk_io_write_bytes": io_bytes,
+        "disk_growth_bytes": disk_end - marks["disk0"],
+        "disk_bytes_per_frame": round((io_bytes if io_bytes is not None else disk_end - marks["disk0"])
+                                      / frames_n, 1) if frames_n else None,
+        "work_dir_bytes": disk_end,
+        "stub": dict(fleet.counts),
+    }
+    doc = {
+        "schema": 1,
+        "created_utc": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_rev(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(),
+                 "cpus": os.cpu_count(), "opencv": cv2.__version__},
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare", "keep", "verbose")},
+        "config": {k: v for k, v in patch.items() if k not in ("API_URL", "SYNC_BATCH_URL", "SYNC_ROLLUP_URL",
+                                                             "REMOTE_CAMERAS_URL", "REMOTE_TARGETS_URL",
+                                                             "DB_NAME", "FRAME_ROOT", "TRACKER_STATE_PATH",
+                                                             "TEST_FRAME_PATH")},
+        "results": results,
+    }
+    for key in ("MODEL_NAME", "INFER_BACKEND", "DETECT_BATCH_SIZE", "MOTION_GATE_ENABLED", "CADENCE_ADAPTIVE",
+                "CADENCE_MAX_INFER_PER_SEC", "SYNC_BATCH_MODE", "META_WIRE_FORMAT", "FRAME_MAX_WIDTH"):
+        doc["config"].setdefault(key, getattr(config, key))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, default=str)
+
+    print(f"cameras={args.cameras} every={args.every_sec}s source={args.rtsp or args.source} "
+          f"window={results['window_sec']}s")
+    print(f"frames={frames_n} fps={results['fps']} gated={results['gated']} "
+          f"mean_batch={results['mean_batch']} synced={results['rows_synced']}")
+    print(f"{'stage':>7} {'n':>6} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} {'max_ms':>9}")
+    for stage, s in results["stages"].items():
+        if s["n"]:
+            print(f"{stage:>7} {s['n']:>6} {s['p50_ms']:>9.2f} {s['p95_ms']:>9.2f} "
+                  f"{s['p99_ms']:>9.2f} {s['max_ms']:>9.2f}")
+    print(f"rss start/peak/end MB: {results['rss_start_mb']}/{results['rss_peak_mb']}/{results['rss_end_mb']}  "
+          f"disk written: {io_bytes} B (work dir +{results['disk_growth_bytes']} B)")
+    print(f"results -> {args.out}")
+
+    srv.shutdown()
+    if not args.keep:
+        shutil.rmtree(work, ignore_errors=True)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if _compare(old, doc, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Frame output cost: old synchronous cv2.imwrite path vs encode-once + background write.
+
+- "imwrite":  raw + annotated cv2.imwrite at default quality, then re-read both
+              files for upload (what save_frames/_send used to do).
+- "output":   detect.save_frames() -> frame_output (imencode at
+              FRAME_JPEG_QUALITY, optional FRAME_MAX_WIDTH), upload bytes read
+              from memory, pack-segment appends in the background.
+- Prints per-frame latency on the store path, disk bytes and upload bytes.
+
+Example (from the Python/ folder):
+  python bench/bench_frames.py --image test.jpg --frames 50 --max-width 1280
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db  # noqa: E402
+import detect  # noqa: E402
+import frame_output  # noqa: E402
+import frame_store  # noqa: E402
+
+
+def _dir_bytes(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(root) for f in fs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="imwrite vs encode-once frame output")
+    ap.add_argument("--image", default="test.jpg")
+    ap.add_argument("--frames", type=int, default=50)
+    ap.add_argument("--quality", type=int, default=85)
+    ap.add_argument("--max-width", type=int, default=0)
+    args = ap.parse_args()
+
+    img = cv2.imread(args.image)
+    if img is None:
+        img = np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+        img = cv2.GaussianBlur(img, (21, 21), 0)
+    dets = [{"class_id": 0, "class_name": "person", "confidence": 0.9, "track_id": i,
+             "bbox_xyxy": [100 + 50 * i, 100, 180 + 50 * i, 300]} for i in range(5)]
+    cam = {"id": "BENCH", "key": "bench"}
+
+    # old path
+    tmp = tempfile.mkdtemp(prefix="bench_frames_")
+    up = 0
+    t0 = time.perf_counter()
+    for i in range(args.frames):
+        raw_p = os.path.join(tmp, f"{i}_raw.jpg")
+        ann_p = os.path.join(tmp, f"{i}_ann.jpg")
+        cv2.imwrite(raw_p, img)
+        cv2.imwrite(ann_p, detect._draw_anno(img, dets))
+        for p in (raw_p, ann_p):
+            with open(p, "rb") as f:
+                up += len(f.read())
+    old_ms = (time.perf_counter() - t0) * 1000.0 / args.frames
+    old_disk = _dir_bytes(tmp)
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    # new path
+    tmp = tempfile.mkdtemp(prefix="bench_frames_")
+    db.DB_NAME = os.path.join(tempfile.mkdtemp(prefix="bench_frames_db_"), "bench.db")
+    db.init_db()
+    detect.FRAME_MAX_WIDTH = args.max_width
+    frame_output.FRAME_JPEG_QUALITY = args.quality
+    out = frame_output.FrameOutput(store=frame_store.FrameStore(root=tmp))
+    detect.get_output = lambda: out
+    new_up = 0
+    t0 = time.perf_counter()
+    for i in range(args.frames):
+        img[:16, :16] = i % 256  # distinct bytes, so nothing is deduplicated
+        raw_p, ann_p = detect.save_frames(cam, img, dets)
+        new_up += len(out.read(raw_p) or b"") + len(out.read(ann_p) or b"")
+    new_ms = (time.perf_counter() - t0) * 1000.0 / args.frames
+    out.close()
+    new_disk = _dir_bytes(tmp)
+    new_files = sum(len(fs) for _, _, fs in os.walk(tmp))
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'path':>8} {'ms/frame':>9} {'disk KB':>9} {'upload KB':>10} {'files':>6}")
+    print(f"{'imwrite':>8} {old_ms:>9.2f} {old_disk / 1024:>9.0f} {up / 1024:>10.0f} {2 * args.frames:>6}")
+    print(f"{'output':>8} {new_ms:>9.2f} {new_disk / 1024:>9.0f} {new_up / 1024:>10.0f} {new_files:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Meta bytes per event and encode CPU on the uplink: plain JSON vs the compact
+wire format (meta_codec.py) in every codec / compression installed here.
+
+- Builds `--events` realistic metas (float bboxes, a few classes, tracks)
+  over `--cameras` cameras with `--dets` detections each.
+- "single": one event per request (Ingest), contexts already known to the API.
+- "batch":  `--batch` events per request (IngestBatch), contexts sent inline.
+- Prints bytes/event and µs/event (encode incl. compression) per format.
+
+Example (from the Python/ folder):
+  python bench/bench_meta.py --dets 0,5,20
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import meta_codec  # noqa: E402
+
+_NAMES = {0: "person", 1: "bicycle", 2: "car", 7: "truck"}
+
+
+def _meta(rng: random.Random, cam: str, i: int, n: int) -> dict:
+    dets = []
+    for _ in range(n):
+        cid = rng.choice(list(_NAMES))
+        x, y = rng.uniform(0, 1200), rng.uniform(0, 650)
+        dets.append({"class_id": cid, "class_name": _NAMES[cid], "confidence": rng.random(),
+                     "bbox_xyxy": [x, y, x + rng.uniform(20, 80), y + rng.uniform(40, 160)],
+                     "track_id": rng.randint(1, 500)})
+    conf_avg = round(sum(d["confidence"] for d in dets) / len(dets), 3) if dets else 0.0
+    return {"timestamp_utc": f"2025-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.123Z", "camera_id": cam,
+            "image": {"width": 1280, "height": 720},
+            "compute": {"inference_ms": rng.uniform(8, 40), "model": "yolo11n.pt"},
+            "targets": ["person", "car", "truck"], "detections": dets,
+            "people": {"count": len([d for d in dets if d["class_name"] == "person"]),
+                       "confidence_avg": conf_avg},
+            "gate": {"gated": False, "score": rng.random() / 10}}
+
+
+def _json_single(metas, gz):
+    out = []
+    for m in metas:
+        data = json.dumps(m, ensure_ascii=False).encode("utf-8")
+        out.append(gzip.compress(data, compresslevel=5) if gz else data)
+    return out
+
+
+def _json_batch(metas, size, gz):
+    out = []
+    for s in range(0, len(metas), size):
+        items = [{"id": str(s + i), "meta": m} for i, m in enumerate(metas[s:s + size])]
+        data = json.dumps(items, ensure_ascii=False).encode("utf-8")
+        out.append(gzip.compress(data, compresslevel=5) if gz else data)
+    return out
+
+
+def _compact_single(metas, ct):
+    wire = meta_codec.WireFormat()
+    events, ctxs = wire.encode(metas[:1])
+    wire.accepted(ctxs)  # steady state: the API already has the contexts
+    out = []
+    for m in metas:
+        events, ctxs = wire.encode([m])
+        out.append(meta_codec.dumps({"ctx": ctxs, "e": events[0]}, ct))
+    return out
+
+
+def _compact_batch(metas, size, ct):
+    out = []
+    for s in range(0, len(metas), size):
+        wire = meta_codec.WireFormat()  # worst case: every batch carries its contexts
+        chunk = metas[s:s + size]
+        events, ctxs = wire.encode(chunk)
+        items = [{"id": str(s + i), "e": e} for i, e in enumerate(events)]
+        out.append(meta_codec.dumps({"ctx": ctxs, "items": items}, ct))
+    return out
+
+
+def _run(label, fn, n):
+    t0 = time.perf_counter()
+    bodies = fn()
+    dt = time.perf_counter() - t0
+    size = sum(len(b) for b in bodies)
+    print(f"  {label:<52} {size / n:>9.1f} {dt * 1e6 / n:>9.1f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Meta bytes/event and encode cost per wire format")
+    ap.add_argument("--events", type=int, default=2000)
+    ap.add_argument("--cameras", type=int, default=8)
+    ap.add_argument("--dets", default="0,5,20", help="Detections per event (comma list)")
+    ap.add_argument("--batch", type=int, default=200)
+    args = ap.parse_args()
+
+    codecs = ["json"] + [c for c, mod in (("msgpack", meta_codec.msgpack), ("cbor", meta_codec.cbor2)) if mod]
+    encs = ["none", "gzip"] + (["zstd"] if meta_codec.zstandard else [])
+    compact_types = [meta_codec.content_type(c, enc) for c in codecs for enc in encs]
+
+    for n in [int(x) for x in args.dets.split(",") if x.strip()]:
+        rng = random.Random(n)
+        metas = [_meta(rng, f"CAM{i % args.cameras}", i, n) for i in range(args.events)]
+        print(f"\n{n} detections/event, {args.events} events")
+        print(f"  {'format':<52} {'B/event':>9} {'us/event':>9}")
+        for gz in (False, True):
+            _run(f"single  json{' + gzip' if gz else ''}", lambda: _json_single(metas, gz), len(metas))
+        for ct in compact_types:
+            _run(f"single  {ct}", lambda: _compact_single(metas, ct), len(metas))
+        for gz in (False, True):
+            _run(f"batch   json{' + gzip' if gz else ''}", lambda: _json_batch(metas, args.batch, gz), len(metas))
+        for ct in compact_types:
+            _run(f"batch   {ct}", lambda: _compact_batch(metas, args.batch, ct), len(metas))
+
+
+if __name__ == "__main__":
+    main()
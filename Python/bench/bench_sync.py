@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Sync throughput (rows/sec) against a local stub of the ingest API.
+
+- Starts a threaded HTTP stub for API_URL and API_URL/batch that waits
+  `--latency-ms` per request (simulated WAN round-trip) and accepts everything.
+- Fills a throw-away SQLite DB with `--rows` rows over `--cameras` cameras,
+  each with a small fake jpg.
+- Drains it with sync.sync_unsent_once() for every concurrency level, in
+  single-row mode and in batch mode.
+- Then checks a deduplicated raw blob shared by two rows: sync the first
+  (its raw reference is released), run retention on it, drop dead segments;
+  the second, unsynced row must still read its frame. Exits 1 if it does not.
+
+Example (from the Python/ folder):
+  python bench/bench_sync.py --rows 400 --concurrency 1,4,16
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import db  # noqa: E402
+import frame_output  # noqa: E402
+import frame_store  # noqa: E402
+import sync  # noqa: E402
+
+
+def _stub(latency_ms: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            time.sleep(latency_ms / 1000.0)
+            if self.path.endswith("/batch"):
+                # ids appear as "frame_raw_<id>" / in the items json; accept all
+                items = body.split(b'name="items"', 1)[1].split(b"\r\n\r\n", 1)[1].split(b"\r\n--", 1)[0]
+                res = [{"id": i["id"], "success": True, "errors": []} for i in json.loads(items)]
+                out = json.dumps({"isSuccess": True, "statusCode": 200, "result": res}).encode()
+            else:
+                out = b""
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def _fill(rows: int, cameras: int, jpg: str) -> None:
+    meta = json.dumps({"timestamp_utc": "2025-01-01T00:00:00Z", "camera_id": "CAM",
+                       "people": {"count": 1}, "detections": []})
+    db.store_many([(f"CAM{i % cameras}", 1, meta, jpg, None) for i in range(rows)])
+
+
+def _check_shared_blob(tmp: str) -> bool:
+    """Row A and row B share one raw blob (refcount 2); syncing + retaining A must keep B's frame."""
+    db.close_db()
+    db.DB_NAME = os.path.join(tmp, "shared.db")
+    db.init_db()
+    root = os.path.join(tmp, "frames")
+    out = frame_output.FrameOutput(store=frame_store.FrameStore(root=root))
+    data = os.urandom(4096)
+    ref = frame_store.blob_ref("2025-01-01", data)
+    out.put(ref, data)
+    out.put(ref, data)  # identical bytes: stored once, refcount 2
+    meta = json.dumps({"timestamp_utc": "2025-01-01T00:00:00Z", "camera_id": "CAM",
+                       "people": {"count": 1}, "detections": []})
+    db.store_many([("CAM_A", 1, meta, ref, None), ("CAM_B", 1, meta, ref, None)])
+
+    sync.get_output = lambda: out
+    sync.SYNC_BATCH_SIZE = 1
+    sync.SYNC_CONCURRENCY = 1
+    sync.DELETE_RAW_AFTER_SUCCESS_SYNC = True
+    sync._executor = None
+    sync.sync_unsent_once()  # row A only
+    out.close()  # the unref runs on the writer thread
+
+    db.cleanup_old_synced(retention_days=-1, pause_sec=0)  # every synced row
+    store = frame_store.FrameStore(root=root)
+    store.drop_dead_segments()
+    left = db.get_unsynced_rows(10)
+    ok = len(left) == 1 and left[0][5] == ref and store.read(ref) == data
+    store.close()
+    print(f"shared raw blob after sync + retention of one row: {'kept' if ok else 'LOST'}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Sync rows/sec vs upload concurrency")
+    ap.add_argument("--rows", type=int, default=400)
+    ap.add_argument("--cameras", type=int, default=32)
+    ap.add_argument("--concurrency", default="1,4,16")
+    ap.add_argument("--latency-ms", type=int, default=30)
+    ap.add_argument("--jpg-kb", type=int, default=100, help="Fake frame size")
+    args = ap.parse_args()
+
+    srv = _stub(args.latency_ms)
+    base = f"http://127.0.0.1:{srv.server_port}/api/v1/EdgeData"
+    tmp = tempfile.mkdtemp(prefix="bench_sync_")
+    jpg = os.path.join(tmp, "frame.jpg")
+    with open(jpg, "wb") as f:
+        f.write(os.urandom(args.jpg_kb * 1024))
+
+    db.DB_NAME = os.path.join(tmp, "bench.db")
+    db.init_db()
+    sync.API_URL = base
+    sync.SYNC_BATCH_URL = base + "/batch"
+    sync.SYNC_BATCH_SIZE = args.rows
+    sync.DELETE_RAW_AFTER_SUCCESS_SYNC = False
+
+    print(f"{'mode':>7} {'conc':>5} {'rows':>6} {'sec':>7} {'rows/s':>8}")
+    for mode in ("single", "batch"):
+        for conc in [int(x) for x in args.concurrency.split(",") if x.strip()]:
+            _fill(args.rows, args.cameras, jpg)
+            sync.SYNC_BATCH_MODE = mode == "batch"
+            sync.SYNC_CONCURRENCY = conc
+            sync._executor = None
+
+            t0 = time.perf_counter()
+            while db.get_unsynced_rows(1):
+                sync.sync_unsent_once()
+            dt = time.perf_counter() - t0
+            print(f"{mode:>7} {conc:>5} {args.rows:>6} {dt:>7.2f} {args.rows / dt:>8.1f}")
+
+    ok = _check_shared_blob(tmp)
+    srv.shutdown()
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
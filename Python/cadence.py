@@ -0,0 +1,155 @@
+"""
+Adaptive per-camera detect cadence.
+
+The time-of-day schedule (main._detect_interval_seconds) is each camera's
+baseline. While a camera sees targets, or its detections change, it runs every
+CADENCE_ACTIVE_SEC; once the scene is empty and stable the interval grows by
+CADENCE_DECAY per tick until it is back at the baseline. Gated frames (motion
+gate: nothing moved) count as empty and stable, so a parked car does not keep
+a camera fast.
+
+All cameras share CADENCE_MAX_INFER_PER_SEC: when the planned intervals add
+up to more inferences/sec than that, every interval is stretched by the same
+factor, so load stays bounded as cameras are added.
+
+- interval(cam_id, baseline) -> seconds until the next tick (records the decision)
+- observe(cam_id, dets, meta) after inference; True when the camera just went active
+- decision(cam_id)            cadence block for the meta ("cadence")
+- stats()                     modes, planned inferences/sec, budget factor
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional
+
+from config import (
+    CADENCE_ADAPTIVE, CADENCE_ACTIVE_SEC, CADENCE_DECAY, CADENCE_MAX_INFER_PER_SEC
+)
+from detections import Detections
+from motion import is_gated
+
+
+class _CamState:
+    __slots__ = ("interval", "baseline", "planned", "mode", "sig",
+                 "speedups", "last_active_at", "decision")
+
+    def __init__(self) -> None:
+        self.interval: Optional[float] = None   # adaptive interval; None = baseline
+        self.baseline: Optional[float] = None
+        self.planned: Optional[float] = None    # last interval before the budget factor
+        self.mode = "baseline"
+        self.sig: Any = None
+        self.speedups = 0
+        self.last_active_at = 0.0
+        self.decision: Dict[str, Any] = {}
+
+
+def _signature(dets: Detections) -> Any:
+    dets = Detections.coerce(dets)
+    return tuple(sorted(dets.counts().items())), dets.track_ids()
+
+
+class CadenceController:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cams: Dict[str, _CamState] = {}
+        self._factor = 1.0
+        # set by main: called (outside the lock) when a camera goes active,
+        # so its next tick can be moved up instead of waiting out the baseline
+        self.on_active: Optional[Callable[[str], None]] = None
+
+    def _state(self, cam_id: str) -> _CamState:
+        st = self._cams.get(cam_id)
+        if st is None:
+            st = self._cams[cam_id] = _CamState()
+        return st
+
+    def interval(self, cam_id: str, baseline: float) -> float:
+        """Seconds until this camera's next tick: adaptive, capped at baseline, within the budget."""
+        with self._lock:
+            st = self._state(cam_id)
+            st.baseline = float(baseline)
+            want = st.baseline
+            if CADENCE_ADAPTIVE and st.interval is not None:
+                if st.interval >= st.baseline:
+                    st.interval, st.mode = None, "baseline"
+                else:
+                    want = st.interval
+            st.planned = want
+
+            rate = sum(1.0 / s.planned for s in self._cams.values() if s.planned)
+            budget = float(CADENCE_MAX_INFER_PER_SEC)
+            self._factor = rate / budget if budget > 0 and rate > budget else 1.0
+            sec = want * self._factor
+            st.decision = {
+                "mode": st.mode,
+                "interval_sec": round(sec, 1),
+                "baseline_sec": round(st.baseline, 1),
+                "budget_factor": round(self._factor, 2),
+            }
+            return sec
+
+    def observe(self, cam_id: str, dets: Detections, meta: Optional[Dict[str, Any]]) -> bool:
+        """Feed one inference result; returns True if the camera just switched to active."""
+        if not CADENCE_ADAPTIVE:
+            return False
+        with self._lock:
+            st = self._state(cam_id)
+            active = False
+            if not is_gated(meta):
+                sig = _signature(dets)
+                active = bool(dets) or (st.sig is not None and sig != st.sig)
+                st.sig = sig
+            if active:
+                went_active = st.mode != "active"
+                st.interval, st.mode = float(CADENCE_ACTIVE_SEC), "active"
+                st.last_active_at = time.time()
+                if went_active:
+                    st.speedups += 1
+            else:
+                went_active = False
+                if st.interval is not None:
+                    st.interval *= max(1.0, float(CADENCE_DECAY))
+                    st.mode = "decay"
+        if went_active and self.on_active is not None:
+            self.on_active(cam_id)
+        return went_active
+
+    def decision(self, cam_id: str) -> Dict[str, Any]:
+        with self._lock:
+            st = self._cams.get(cam_id)
+            return dict(st.decision) if st is not None else {}
+
+    def sync(self, cameras: List[Dict[str, Any]]) -> None:
+        """Drop state for cameras no longer active (keeps the budget sum honest)."""
+        active = {c.get("id") for c in cameras}
+        with self._lock:
+            for k in [k for k in self._cams if k not in active]:
+                self._cams.pop(k, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            modes = Counter(st.mode for st in self._cams.values())
+            return {
+                "cameras": len(self._cams),
+                "modes": dict(modes),
+                "planned_infer_per_sec": round(
+                    sum(1.0 / st.planned for st in self._cams.values() if st.planned) / self._factor, 3),
+                "budget_factor": round(self._factor, 2),
+                "speedups": sum(st.speedups for st in self._cams.values()),
+                "per_camera": {k: dict(st.decision) for k, st in self._cams.items()},
+            }
+
+
+# ------------------ shared controller (lazy) ------------------
+_CADENCE: Optional[CadenceController] = None
+_CADENCE_LOCK = threading.Lock()
+
+
+def get_cadence() -> CadenceController:
+    global _CADENCE
+    with _CADENCE_LOCK:
+        if _CADENCE is None:
+            _CADENCE = CadenceController()
+        return _CADENCE
@@ -0,0 +1,232 @@
+"""
+Persistent RTSP capture pool.
+
+- One long-lived decoder per camera (decoder.open_stream: cv2.VideoCapture,
+  PyAV or an ffmpeg pipe), owned by a reader thread.
+- The reader keeps decoding and stores only the newest usable frame (1-slot).
+- Broken/closed streams reconnect with exponential backoff + jitter.
+- Readers are stopped when a camera leaves the active list (sync) or has not
+  been asked for a frame in CAPTURE_IDLE_EVICT_SEC.
+- A camera with a detection substream ("rtsp_sub") is read on that stream;
+  its main "rtsp" stream gets a second reader ("<key>#main") only while
+  evidence frames are being asked for (SUBSTREAM_MAIN_IDLE_SEC).
+
+detect._grab_raw_frame() asks the pool for the latest frame, so a grab costs
+a lock + copy instead of an RTSP handshake and a keyframe wait.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from config import (
+    CAPTURE_FIRST_FRAME_WAIT_SEC, CAPTURE_MAX_FRAME_AGE_SEC,
+    CAPTURE_RECONNECT_MIN_SEC, CAPTURE_RECONNECT_MAX_SEC, CAPTURE_IDLE_EVICT_SEC,
+    SUBSTREAM_MAIN_IDLE_SEC, CAPTURE_DECODE_WIDTH
+)
+from decoder import is_usable, open_stream
+from log import get_logger
+
+_log = get_logger("capture")
+
+
+def detect_url(camera: Dict[str, Any]) -> Optional[str]:
+    """The stream detection runs on: the substream if the camera has one."""
+    return camera.get("rtsp_sub") or camera.get("rtsp")
+
+
+def evidence_url(camera: Dict[str, Any]) -> Optional[str]:
+    """The main stream, when it differs from the detection stream (else None)."""
+    main = camera.get("rtsp")
+    return main if main and main != detect_url(camera) else None
+
+
+class CameraReader:
+    """Background reader for one RTSP url; keeps the newest frame only."""
+
+    def __init__(self, key: str, rtsp: str, idle_sec: float = CAPTURE_IDLE_EVICT_SEC,
+                 decode_width: int = 0) -> None:
+        self.key = key
+        self.rtsp = rtsp
+        self.idle_sec = idle_sec
+        self.decode_width = decode_width
+        self.backend = None                # what open_stream() ended up using
+        self.state = "connecting"          # connecting | streaming | backoff | stopped
+        self.last_access = time.time()
+        self.reconnects = 0
+        self.failures = 0
+
+        self._frame: Optional[np.ndarray] = None
+        self._frame_ts = 0.0
+        self._lock = threading.Lock()
+        self._first = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"cap-{key}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        self._thread.join(timeout)
+        self.state = "stopped"
+
+    def latest(self, max_age: float) -> Optional[np.ndarray]:
+        """Copy of the newest frame, or None if there is none younger than max_age."""
+        self.last_access = time.time()
+        with self._lock:
+            if self._frame is None or time.time() - self._frame_ts > max_age:
+                return None
+            return self._frame.copy()
+
+    def wait_first(self, timeout: float) -> bool:
+        return self._first.wait(timeout)
+
+    def _run(self) -> None:
+        delay = CAPTURE_RECONNECT_MIN_SEC
+        while not self._stop.is_set():
+            self.state = "connecting"
+            cap = open_stream(self.rtsp, self.decode_width)
+            self.backend = cap.backend
+            try:
+                if cap.isOpened():
+                    try:
+                        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+                    except Exception:
+                        pass
+                    if self._read_loop(cap):
+                        delay = CAPTURE_RECONNECT_MIN_SEC  # had a healthy session
+            finally:
+                cap.release()
+
+            if self._stop.is_set():
+                break
+
+            # reconnect with exponential backoff + jitter (±25%)
+            self.failures += 1
+            self.reconnects += 1
+            self.state = "backoff"
+            sleep_for = delay * random.uniform(0.75, 1.25)
+            _log.warn(f"[CAPTURE] camera={self.key} stream lost; reconnect in {sleep_for:.1f}s",
+                      category="capture.reconnect", camera_id=self.key)
+            self._stop.wait(sleep_for)
+            delay = min(delay * 2, CAPTURE_RECONNECT_MAX_SEC)
+
+    def _read_loop(self, cap) -> bool:
+        """Read until the stream breaks or we are stopped. Returns True if any frame was usable."""
+        got_any = False
+        misses = 0
+        while not self._stop.is_set():
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                misses += 1
+                if misses > 50:       # ~1s of nothing -> reconnect
+                    return got_any
+                time.sleep(0.02)
+                continue
+            misses = 0
+            if not is_usable(frame):  # all black (decoder / pipeline)
+                continue
+            with self._lock:
+                self._frame = frame
+                self._frame_ts = time.time()
+            if not got_any:
+                got_any = True
+                self.state = "streaming"
+                self._first.set()
+        return got_any
+
+
+class CapturePool:
+    """Registry of CameraReader keyed by camera `key`."""
+
+    def __init__(self) -> None:
+        self._readers: Dict[str, CameraReader] = {}
+        self._lock = threading.Lock()
+
+    def _reader_for(self, camera: Dict[str, Any], main: bool = False) -> Optional[CameraReader]:
+        key = camera.get("key") or camera.get("id")
+        rtsp = evidence_url(camera) if main else detect_url(camera)
+        if not key or not rtsp:
+            return None
+        if main:
+            key = f"{key}#main"
+        old = None
+        with self._lock:
+            reader = self._readers.get(key)
+            if reader is not None and reader.rtsp != rtsp:
+                old = self._readers.pop(key)   # url changed -> new connection
+                reader = None
+            if reader is None:
+                # evidence (main) frames are never scaled down at decode
+                reader = (CameraReader(key, rtsp, SUBSTREAM_MAIN_IDLE_SEC) if main else
+                          CameraReader(key, rtsp, CAPTURE_IDLE_EVICT_SEC, CAPTURE_DECODE_WIDTH))
+                self._readers[key] = reader
+                reader.start()
+        if old is not None:
+            old.stop()
+        return reader
+
+    def get_frame(self, camera: Dict[str, Any], main: bool = False) -> Optional[np.ndarray]:
+        """
+        Newest frame for this camera, or None if the stream has nothing fresh.
+        main=False: the detection stream (substream if set); main=True: the
+        main stream of a camera that has a substream (None otherwise).
+        Only a reader that is still making its first connection is waited on
+        (≤ CAPTURE_FIRST_FRAME_WAIT_SEC); a camera in backoff returns at once.
+        """
+        reader = self._reader_for(camera, main)
+        if reader is None:
+            return None
+        frame = reader.latest(CAPTURE_MAX_FRAME_AGE_SEC)
+        if frame is None and reader.state == "connecting" and reader.reconnects == 0:
+            reader.wait_first(CAPTURE_FIRST_FRAME_WAIT_SEC)
+            frame = reader.latest(CAPTURE_MAX_FRAME_AGE_SEC)
+        return frame
+
+    def sync(self, cameras: List[Dict[str, Any]]) -> None:
+        """Stop readers for cameras that are no longer active, and idle ones."""
+        active = {c.get("key") or c.get("id") for c in cameras}
+        now = time.time()
+        with self._lock:
+            gone = [k for k, r in self._readers.items()
+                    if k.split("#", 1)[0] not in active or now - r.last_access > r.idle_sec]
+            evicted = [self._readers.pop(k) for k in gone]
+        for r in evicted:
+            r.stop()
+        if evicted:
+            _log.info(f"[CAPTURE] evicted {len(evicted)} reader(s): {', '.join(r.key for r in evicted)}")
+
+    def close(self) -> None:
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers.clear()
+        for r in readers:
+            r.stop()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return {
+                k: {"state": r.state, "reconnects": r.reconnects, "backend": r.backend,
+                    "frame_age_sec": round(now - r._frame_ts, 2) if r._frame_ts else None}
+                for k, r in self._readers.items()
+            }
+
+
+# ------------------ shared pool (lazy) ------------------
+_POOL: CapturePool | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> CapturePool:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = CapturePool()
+        return _POOL
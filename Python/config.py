@@ -23,13 +23,85 @@ REMOTE_CAMERAS_REQUIRED: bool = False
 
 # Local SQLite DB filename
 DB_NAME: str = "edge_data.db"
+DB_SYNCHRONOUS: str = "NORMAL"    # WAL + NORMAL: no fsync per commit, still crash-safe
+DB_CACHE_KB: int = 8192           # page cache per connection
+DB_BUSY_TIMEOUT_MS: int = 5000
 
 # JSON file that lists cameras (unlimited)
 CAMERAS_JSON_PATH: str = "cameras.json"
 
-# Detection cadence (seconds): one record per camera every X sec
+# Detection cadence (seconds): one record per camera every X sec.
+# Used when no DETECT_SCHEDULE window matches the local time.
 DETECT_EVERY_SEC: int = 60
 
+# Day/night cadence as data: first window containing the local time wins.
+# Windows are [start, end) in DETECT_SCHEDULE_TZ and may wrap midnight.
+# A camera can override this with its own "schedule" (same format) or "every_sec".
+DETECT_SCHEDULE_TZ: str = "America/Toronto"
+DETECT_SCHEDULE: list = [
+    {"start": "06:00", "end": "18:00", "every_sec": 5 * 60},   # daytime
+    {"start": "18:00", "end": "06:00", "every_sec": 60 * 60},  # night
+]
+
+# Adaptive cadence (cadence.py): the schedule above is each camera's baseline.
+# With targets in view (or changing detections) a camera speeds up to
+# CADENCE_ACTIVE_SEC, then the interval grows by CADENCE_DECAY per empty tick.
+CADENCE_ADAPTIVE: bool = True
+CADENCE_ACTIVE_SEC: int = 15
+CADENCE_DECAY: float = 2.0
+CADENCE_MAX_INFER_PER_SEC: float = 2.0   # whole box, all cameras (0 = unlimited)
+
+# Detection pipeline (pipeline.py): grab -> infer -> store
+PIPELINE_GRAB_WORKERS: int = 8    # parallel RTSP grabs (I/O bound)
+PIPELINE_STORE_WORKERS: int = 2   # jpg writes + SQLite inserts
+PIPELINE_QUEUE_SIZE: int = 64     # max items waiting between two stages
+PIPELINE_STATS_EVERY_SEC: int = 60  # print queue depths / counters / schedule lag
+PIPELINE_BATCH_WAIT_MS: int = 50  # how long infer waits to fill a batch
+
+# Max frames per YOLO forward pass (detect.detect_batch); 1 = no batching
+DETECT_BATCH_SIZE: int = 8
+
+# Persistent RTSP capture (capture.py): one reader thread per camera
+CAPTURE_POOL_ENABLED: bool = True     # False -> open/warm-up/release per grab
+CAPTURE_FIRST_FRAME_WAIT_SEC: float = 3.0   # wait for a brand-new connection
+CAPTURE_MAX_FRAME_AGE_SEC: float = 10.0     # older frames count as "no frame"
+CAPTURE_RECONNECT_MIN_SEC: float = 1.0      # reconnect backoff (jittered ±25%)
+CAPTURE_RECONNECT_MAX_SEC: float = 60.0
+CAPTURE_IDLE_EVICT_SEC: int = 900           # stop readers nobody asked for
+
+# Detection substream: a camera with "rtsp_sub" is grabbed and inferred on
+# that low-res stream; its main "rtsp" stream is only read for the evidence
+# frames of positive detections, with the boxes rescaled to it.
+# "reader":  a main-stream reader runs while detections keep coming (the frame
+#            matches the boxes; the main stream is decoded meanwhile)
+# "oneshot": open, grab one frame, close per evidence frame (least CPU, but the
+#            frame is a connect + keyframe wait later than the boxes)
+SUBSTREAM_EVIDENCE_MODE: str = "reader"
+SUBSTREAM_MAIN_IDLE_SEC: int = 120          # stop an unused main-stream reader
+
+# Stream decoding (decoder.py). "opencv" = cv2.VideoCapture; "pyav" (pip
+# install av) and "ffmpeg" (binary on PATH) can decode keyframes only and
+# scale inside the decoder. Anything that cannot open falls back to opencv.
+CAPTURE_BACKEND: str = "opencv"             # "opencv" | "pyav" | "ffmpeg"
+CAPTURE_KEYFRAMES_ONLY: bool = False        # pyav/ffmpeg: one decode per GOP (~1-2 s old at most)
+CAPTURE_DECODE_WIDTH: int = 0               # detection stream width after decode (0 = native)
+CAPTURE_HWACCEL: str = "none"               # "none" | "auto" | "vaapi" | "qsv" | "cuda" | "d3d11va"
+CAPTURE_HWACCEL_DEVICE: str = ""            # e.g. "/dev/dri/renderD128" (vaapi)
+
+# Per-camera ByteTrack state (tracking.py)
+TRACKER_STATE_PATH: str | None = "tracker_state.pkl"  # None = don't persist
+TRACKER_SAVE_EVERY_SEC: int = 300
+TRACKER_IDLE_EVICT_SEC: int = 3 * 3600   # > night cadence, so ids survive the night
+
+# Motion / scene-change gate (motion.py): skip YOLO + the raw jpg when a
+# downscaled grayscale frame barely differs from the camera's background model.
+MOTION_GATE_ENABLED: bool = True
+MOTION_GATE_WIDTH: int = 160          # compare at this width (aspect kept)
+MOTION_GATE_PIXEL_DIFF: int = 25      # 0..255 grey-level change that counts as "changed"
+MOTION_GATE_THRESHOLD: float = 0.01   # gate when < 1% of pixels changed
+MOTION_GATE_BG_ALPHA: float = 0.5     # running-average weight of the new frame (1.0 = frame diff)
+MOTION_GATE_MAX_SKIP_SEC: int = 1800  # force a real inference at least this often
+
 # How often to run "sync unsent rows" scheduler (seconds)
 # (Backoff inside sync controls real retry timing)
 SYNC_EVERY_SEC: int = 5
@@ -38,13 +110,79 @@ SYNC_EVERY_SEC: int = 5
 CLEANUP_EVERY_SEC: int = 3600     # run cleanup hourly
 RETENTION_DAYS: int = 30          # delete *synced* rows older than X days
 DELETE_OLD_FRAMES: bool = True    # also delete frame image files for those rows
+RETENTION_CHUNK_ROWS: int = 500   # rows deleted per transaction (rowid range)
+RETENTION_CHUNK_PAUSE_SEC: float = 0.05  # yield the write lock between chunks
+FRAME_DISK_BUDGET_GB: float = 0.0  # >0: delete oldest synced rows/frames while FRAME_ROOT is larger
 
 # Max rows to push per sync pass
 SYNC_BATCH_SIZE: int = 200
 
-# Exponential backoff for failed syncs
+# Batch sync: many rows per POST to EdgeDataController.IngestBatch.
+# Falls back to one POST per row if the server answers 404/405.
+SYNC_BATCH_MODE: bool = True
+SYNC_BATCH_URL: str = API_URL + "/batch"
+SYNC_BATCH_MAX_BYTES: int = 20_000_000   # meta + frames per request (server cap 100MB)
+# Rows the server rejects per item are retried after SYNC_REJECT_RETRY_SEC
+# (doubling per reject), so they don't hold the head of every pass; after
+# SYNC_MAX_REJECTS rejects a row is dead-lettered (synced=2, never re-sent,
+# removed by retention like synced rows).
+SYNC_REJECT_RETRY_SEC: int = 60
+SYNC_MAX_REJECTS: int = 5
+
+# Parallel upload lanes (rows of one camera always share a lane, in order)
+SYNC_CONCURRENCY: int = 4
+
+# Meta wire format (meta_codec.py): "json" = meta as plain JSON (any API);
+# "compact" = quantised bboxes, class dictionary and per-camera constants sent
+# once per session, negotiated by content type (falls back to JSON).
+META_WIRE_FORMAT: str = "json"
+META_WIRE_CODECS: tuple = ("msgpack", "cbor", "json")  # preference; uninstalled ones skipped
+META_WIRE_COMPRESS: str = "gzip"    # gzip | zstd | none (zstd needs `zstandard` and an API that takes it)
+META_BBOX_QUANT: float = 1.0        # bbox precision on the wire, in pixels
+
+# Local rollups (db.py): per camera / class / bucket counts, updated in the
+# same transaction as each event. "*" is the all-classes row.
+ROLLUP_ENABLED: bool = True
+ROLLUP_BUCKETS_SEC: tuple = (300, 3600, 86400)          # 5 min, hourly, daily (UTC)
+ROLLUP_RETENTION_DAYS: dict = {300: 7, 3600: 90, 86400: 730}
+
+# Rollup sync: push only buckets that changed since the last push.
+# SYNC_EVENTS=False stops uploading per-capture events (rows are just marked
+# synced once rolled up), for sites where the cloud only needs counts.
+SYNC_ROLLUPS: bool = False
+SYNC_ROLLUP_URL: str = API_URL + "/rollups"
+SYNC_ROLLUP_BATCH: int = 1000
+SYNC_EVENTS: bool = True
+
+# Local metrics endpoint (metrics.py): Prometheus text format on
+# http://METRICS_ADDR:METRICS_PORT/metrics (keep it on localhost / a mgmt VLAN)
+METRICS_ENABLED: bool = True
+METRICS_ADDR: str = "127.0.0.1"
+METRICS_PORT: int = 9108
+
+# Logging (log.py): records are queued and written by one background thread.
+# LOG_FORMAT "auto" = coloured text on a TTY, one JSON object per line otherwise.
+# Every category is capped at LOG_RATE_PER_SEC (burst LOG_RATE_BURST);
+# LOG_SAMPLE_EVERY keeps 1 in N lines of the chatty ones. Errors always pass.
+LOG_LEVEL: str = "INFO"
+LOG_FORMAT: str = "auto"          # "auto" | "json" | "text"
+LOG_RATE_PER_SEC: float = 20.0
+LOG_RATE_BURST: int = 100
+LOG_SAMPLE_EVERY: dict = {
+    "sync.ok": 50,        # per-row / per-batch upload success
+    "sync.status": 50,
+    "pipe.stored": 20,    # one line per stored capture
+}
+
+# Shared HTTP client (http_client.py)
+HTTP_POOL_SIZE: int = 16          # keep-alive connections per host
+HTTP_GZIP_REQUESTS: bool = False  # gzip upload bodies (API must UseRequestDecompression)
+
+# Exponential backoff for failed syncs (deadline based, sync never sleeps)
 BACKOFF_START: int = 10           # 10 seconds
-BACKOFF_MAX: int = 600            # 10 minutes (reset when reached)
+BACKOFF_MAX: int = 600            # 10 minutes (held there until a success)
+BACKOFF_JITTER: float = 0.2       # ±20% so many boxes don't retry in lockstep
+CIRCUIT_OPEN_AFTER: int = 5       # consecutive failures before the circuit opens
 
 # Where to save captured frames (today: fake frame image; later: real snapshot)
 # images will be in frames/YYYY-MM-DD/<camera_id>_timestamp.jpg
@@ -52,6 +190,20 @@ FRAME_ROOT: str = "frames"
 FRAME_WIDTH: int = 1280           # for generated/annotated frames
 FRAME_HEIGHT: int = 720
 
+# Frame output (frame_output.py): jpgs are encoded once in memory, uploaded
+# from memory and written to disk in the background.
+FRAME_JPEG_QUALITY: int = 85      # cv2 default is 95
+FRAME_MAX_WIDTH: int = 0          # downscale saved/uploaded frames to this width (0 = keep)
+FRAME_ANNOTATED_ONLY: bool = False  # with detections, keep only the annotated jpg
+FRAME_CACHE_MB: int = 128         # in-memory jpgs kept for sync (pending writes never evicted)
+
+# Frame store (frame_store.py): jpgs are content-addressed blobs appended to
+# per-day pack segments (FRAME_ROOT/YYYY-MM-DD/seg-NNNN.pack) instead of one
+# file each. Identical frames are stored once; retention drops whole segments.
+FRAME_SEGMENT_MB: int = 64        # roll to a new segment after this size
+FRAME_PHASH_FOLD: bool = False    # also fold near-duplicates (perceptual hash) per camera
+FRAME_PHASH_MAX_DIST: int = 4     # max differing bits of the 64-bit dHash to fold
+
 # For now we’re generating fake detections; later you’ll plug in YOLO here.
 MODEL_NAME: str = "yolo11m.pt"
 
@@ -67,6 +219,24 @@ SEND_IMAGES_ONLY_IF_COUNT_POSITIVE: bool = True
 DELETE_RAW_AFTER_SUCCESS_SYNC: bool = True
 
 MODEL_NAME: str = "yolo11n.pt"   # or yolo11s.pt / m / l as you like
+# Inference runtime (detect._get_model): "torch" | "onnx" | "openvino"
+# onnx/openvino export MODEL_NAME once to <weights dir>/exports/ and fall back
+# to torch if that fails. MODEL_NAME may also be a .onnx / *_openvino_model path.
+INFER_BACKEND: str = "torch"
+INFER_IMGSZ: int = 640           # export / letterbox size for onnx & openvino
+INFER_THREADS: int = 0           # CPU threads for the runtime (0 = default)
+
+# ROI / tiled inference (tiling.py). Per camera: "roi" = regions as fractions
+# of the frame (only those are inferred) and "tiles" = true | <tile px> |
+# {"size", "overlap", "full_frame"}. Tiles are TILE_SIZE source pixels, so a
+# distant person reaches the model near native resolution; crops of all
+# cameras share the predict() batches and are merged back with class-aware NMS.
+TILE_ENABLED: bool = False        # tile cameras that do not set "tiles" themselves
+TILE_SIZE: int = 640              # tile edge in source pixels
+TILE_OVERLAP: float = 0.2         # fraction shared by neighbouring tiles
+TILE_FULL_FRAME: bool = True      # also infer the whole region (objects larger than a tile)
+TILE_MAX_CROPS: int = 12          # per frame; the tile size grows to stay under it
+TILE_MERGE_IOS: float = 0.5       # merge same-class boxes overlapping > this (of the smaller box)
 # if set, we’ll use this image instead of RTSP
 TEST_FRAME_PATH: str | None = "test.jpg"
 FRAME_ROOT: str = "frames"
@@ -1,80 +1,419 @@
+import json
 import os
 import sqlite3
-from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Optional, Union
 
-from config import DB_NAME, RETENTION_DAYS, DELETE_OLD_FRAMES
+from config import (
+    DB_NAME, RETENTION_DAYS, DELETE_OLD_FRAMES,
+    DB_SYNCHRONOUS, DB_CACHE_KB, DB_BUSY_TIMEOUT_MS,
+    RETENTION_CHUNK_ROWS, RETENTION_CHUNK_PAUSE_SEC,
+    ROLLUP_ENABLED, ROLLUP_BUCKETS_SEC, ROLLUP_RETENTION_DAYS
+)
+from detections import Detections
+from metrics import counter, histogram
+
+_DB_SECONDS = histogram("edge_db_seconds", "SQLite write incl. write-lock wait; op=store|mark_synced|cleanup",
+                        ["op"])
+_DB_ROWS = counter("edge_db_rows_total", "Rows written / deleted; op=store|mark_synced|mark_rejected|cleanup",
+                   ["op"])
+
+# One writer connection shared by all threads (guarded by _write_lock) and
+# one read connection per thread. In WAL mode readers see a snapshot and never
+# block the writer, so the sync path can scan while the detect path inserts.
+_write_con: Optional[sqlite3.Connection] = None
+_write_lock = threading.Lock()
+_local = threading.local()
+_all_readers: List[sqlite3.Connection] = []
+_generation = 0  # bumped by close_db() so threads reopen their reader
+
+_SQL_INSERT = (
+    "INSERT INTO people_count (created_at, created_ts, camera_id, count, meta_json, meta_v, "
+    "frame_raw_path, frame_annotated_path, synced) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)"
+)
+_SQL_INSERT_DET = (
+    "INSERT INTO detections (row_id, idx, class_id, conf, x1, y1, x2, y2, track_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_UNSYNCED = (
+    "SELECT id, created_at, camera_id, count, meta_json, frame_raw_path, frame_annotated_path, meta_v "
+    "FROM people_count WHERE synced=0 AND (sync_after IS NULL OR sync_after <= ?) "
+    "ORDER BY id ASC LIMIT ?"
+)
+
+# counts per event go into every bucket size; "version" lets a push clear
+# only buckets that did not change while it was in flight
+_SQL_ROLLUP = (
+    "INSERT INTO rollups (camera_id, class_name, bucket_sec, bucket_ts, events, min_count, max_count, "
+    "sum_count, sum_conf, version, dirty) VALUES (?, ?, ?, ?, 1, ?, ?, ?, ?, 1, 1) "
+    "ON CONFLICT (camera_id, class_name, bucket_sec, bucket_ts) DO UPDATE SET "
+    "events=events+1, min_count=MIN(min_count, excluded.min_count), "
+    "max_count=MAX(max_count, excluded.max_count), sum_count=sum_count+excluded.sum_count, "
+    "sum_conf=sum_conf+excluded.sum_conf, version=version+1, dirty=1"
+)
+ALL_CLASSES = "*"
+
+# meta_v: 1 = meta_json is the full meta (older rows, callers passing a string)
+#         2 = meta_json is the meta without detections/people; detections live
+#             in the detections table and the full meta is rebuilt at sync time
+META_FULL = 1
+META_SPLIT = 2
+_META_DERIVED = ("detections", "people")
+_SQL_MARK = "UPDATE people_count SET synced=1 WHERE id=?"
+# the raw frame's reference is released right after sync (DELETE_RAW_AFTER_SUCCESS_SYNC):
+# clear it from the row so retention does not drop the same reference again
+_SQL_MARK_DROP_RAW = "UPDATE people_count SET synced=1, frame_raw_path=NULL WHERE id=?"
+
+# synced: 0 = pending, 1 = accepted by the server, 2 = dead letter (rejected
+# SYNC_MAX_REJECTS times; kept for inspection until retention, never re-sent)
+SYNC_DEAD = 2
+# per-item reject: count it, hold the row back (retry_sec doubling per reject),
+# dead-letter it at max_rejects; SET expressions all see the old values
+_SQL_REJECT = (
+    "UPDATE people_count SET sync_rejects=sync_rejects+1, "
+    f"synced=CASE WHEN sync_rejects+1 >= ? THEN {SYNC_DEAD} ELSE 0 END, "
+    "sync_after=? + ? * (1 << MIN(sync_rejects, 10)) WHERE id=? AND synced=0"
+)
+
+# frame columns hold either a legacy jpg path or a frame_store blob ref
+BLOB_REF_PREFIX = "blob:"
+_SQL_UNREF = "UPDATE frame_blobs SET refcount=refcount-1 WHERE ref=?"
+
+
+def _connect() -> sqlite3.Connection:
+    con = sqlite3.connect(DB_NAME, timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+                          check_same_thread=False, cached_statements=64)
+    con.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT_MS)};")
+    con.execute(f"PRAGMA synchronous={DB_SYNCHRONOUS};")
+    con.execute(f"PRAGMA cache_size=-{int(DB_CACHE_KB)};")  # negative = KiB
+    con.execute("PRAGMA temp_store=MEMORY;")
+    return con
+
+
+def _writer() -> sqlite3.Connection:
+    global _write_con
+    if _write_con is None:
+        _write_con = _connect()
+        _write_con.execute("PRAGMA journal_mode=WAL;")
+    return _write_con
+
+
+def _reader() -> sqlite3.Connection:
+    con = getattr(_local, "con", None)
+    if con is None or getattr(_local, "gen", None) != _generation:
+        con = _connect()
+        con.execute("PRAGMA query_only=1;")
+        _local.con = con
+        _local.gen = _generation
+        with _write_lock:
+            _all_readers.append(con)
+    return con
+
+
+def close_db() -> None:
+    """Checkpoint and close every connection (call on shutdown)."""
+    global _write_con, _generation
+    with _write_lock:
+        _generation += 1
+        for con in _all_readers:
+            try:
+                con.close()
+            except Exception:
+                pass
+        _all_readers.clear()
+        if _write_con is not None:
+            try:
+                _write_con.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            except Exception:
+                pass
+            _write_con.close()
+            _write_con = None
 
 
 def init_db() -> None:
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS people_count (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT NOT NULL,
-        camera_id TEXT NOT NULL,
-        count INTEGER NOT NULL,
-        meta_json TEXT,
-        frame_raw_path TEXT,
-        frame_annotated_path TEXT,
-        synced INTEGER NOT NULL DEFAULT 0
-    );
-    """)
-    cur.execute(
-        "CREATE INDEX IF NOT EXISTS idx_pc_synced ON people_count(synced);")
-    cur.execute(
-        "CREATE INDEX IF NOT EXISTS idx_pc_created ON people_count(created_at);")
-
-    # gentle column adds for older DBs
-    for col in ("meta_json", "frame_raw_path", "frame_annotated_path"):
+    with _write_lock:
+        con = _writer()
+        cur = con.cursor()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS people_count (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            camera_id TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            meta_json TEXT,
+            frame_raw_path TEXT,
+            frame_annotated_path TEXT,
+            synced INTEGER NOT NULL DEFAULT 0
+        );
+        """)
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pc_synced ON people_count(synced);")
+
+        # content-addressed frames (frame_store.py): ref = "<day>/<sha1>"
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS frame_blobs (
+            ref TEXT PRIMARY KEY,
+            segment TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 1
+        );
+        """)
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_fb_segment ON frame_blobs(segment, refcount);")
+
+        # gentle column adds for older DBs
+        for col in ("meta_json", "frame_raw_path", "frame_annotated_path"):
+            try:
+                cur.execute(f"ALTER TABLE people_count ADD COLUMN {col} TEXT;")
+            except Exception:
+                pass
+
+        # one row per detection, clustered by event row (WITHOUT ROWID)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS detections (
+            row_id INTEGER NOT NULL,
+            idx INTEGER NOT NULL,
+            class_id INTEGER NOT NULL,
+            conf REAL NOT NULL,
+            x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+            track_id INTEGER,
+            PRIMARY KEY (row_id, idx)
+        ) WITHOUT ROWID;
+        """)
+        # incremental rollups (one row per camera / class / bucket)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS rollups (
+            camera_id TEXT NOT NULL,
+            class_name TEXT NOT NULL,
+            bucket_sec INTEGER NOT NULL,
+            bucket_ts INTEGER NOT NULL,
+            events INTEGER NOT NULL,
+            min_count INTEGER NOT NULL,
+            max_count INTEGER NOT NULL,
+            sum_count INTEGER NOT NULL,
+            sum_conf REAL NOT NULL,
+            version INTEGER NOT NULL,
+            dirty INTEGER NOT NULL,
+            PRIMARY KEY (camera_id, class_name, bucket_sec, bucket_ts)
+        ) WITHOUT ROWID;
+        """)
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rollups_dirty ON rollups(dirty) WHERE dirty=1;")
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rollups_bucket ON rollups(bucket_sec, bucket_ts);")
         try:
-            cur.execute(f"ALTER TABLE people_count ADD COLUMN {col} TEXT;")
+            cur.execute(f"ALTER TABLE people_count ADD COLUMN meta_v INTEGER NOT NULL DEFAULT {META_FULL};")
         except Exception:
             pass
 
-    con.commit()
-    con.close()
+        # integer epoch seconds for retention (created_at stays for the API);
+        # (synced, created_ts) covers the retention bound queries
+        try:
+            cur.execute("ALTER TABLE people_count ADD COLUMN created_ts INTEGER;")
+        except Exception:
+            pass
+        cur.execute(
+            "UPDATE people_count SET created_ts=CAST(strftime('%s', substr(created_at, 1, 19)) AS INTEGER) "
+            "WHERE created_ts IS NULL;")
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pc_synced_ts ON people_count(synced, created_ts);")
+        # per-item rejects from the batch endpoint (sync.py): count + retry-after
+        for ddl in ("sync_rejects INTEGER NOT NULL DEFAULT 0", "sync_after INTEGER"):
+            try:
+                cur.execute(f"ALTER TABLE people_count ADD COLUMN {ddl};")
+            except Exception:
+                pass
+        # time-bucketed counts per camera (count_buckets)
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_pc_cam_ts ON people_count(camera_id, created_ts);")
+        cur.execute("DROP INDEX IF EXISTS idx_pc_created;")
+
+        con.commit()
+
+
+def _split_meta(meta: Dict[str, Any]) -> Tuple[str, Detections]:
+    """meta -> (header json without detections/people, detections)."""
+    dets = Detections.coerce(meta.get("detections"))
+    header = {k: v for k, v in meta.items() if k not in _META_DERIVED}
+    # class names of this row, so the meta can be rebuilt without the model
+    header["_classes"] = dets.class_map()
+    return json.dumps(header, ensure_ascii=False, separators=(",", ":")), dets
+
+
+def _rollup_params(cam: str, ts: int, meta: Union[str, Dict[str, Any], None]) -> List[tuple]:
+    """Upsert params for one event: every concrete target / detected class plus "*", per bucket size.
+
+    Zero rows are kept for named targets (watched but not seen); the "all"
+    wildcard is not a class and gets no row of its own - "*" covers it.
+    """
+    if isinstance(meta, str):
+        try:
+            meta = json.loads(meta)
+        except ValueError:
+            meta = None
+    if not isinstance(meta, dict):
+        return []
+    counts: Dict[str, int] = {str(t): 0 for t in (meta.get("targets") or [])
+                              if str(t).lower() not in ("all", ALL_CLASSES)}
+    confs: Dict[str, float] = {k: 0.0 for k in counts}
+    dets = Detections.coerce(meta.get("detections"))
+    for name, (n, conf) in dets.per_class().items():
+        counts[str(name)] = n
+        confs[str(name)] = conf
+    counts[ALL_CLASSES] = len(dets)
+    confs[ALL_CLASSES] = float(dets.data["confidence"].sum())
+
+    out = []
+    for bucket in ROLLUP_BUCKETS_SEC:
+        bts = ts // bucket * bucket
+        for name, n in counts.items():
+            out.append((cam, name, bucket, bts, n, n, n, confs[name]))
+    return out
+
+
+def store_many(
+    rows: Iterable[Tuple[str, int, Union[str, Dict[str, Any]], Optional[str], Optional[str]]]
+) -> int:
+    """
+    Insert a whole detection tick in one transaction.
+    rows: (camera_id, count, meta, frame_raw_path, frame_annotated_path)
+    meta is either the meta dict (detections go to the detections table) or
+    an already serialised meta_json string (stored as is).
+    """
+    now = datetime.utcnow()
+    created_at = now.isoformat(timespec="seconds") + "Z"
+    created_ts = int(time.time())
+
+    events = []
+    rollup_params = []
+    for cam, cnt, meta, raw, ann in rows:
+        if isinstance(meta, dict):
+            header, dets = _split_meta(meta)
+            events.append(((created_at, created_ts, cam, cnt, header, META_SPLIT, raw, ann), dets))
+        else:
+            events.append(((created_at, created_ts, cam, cnt, meta, META_FULL, raw, ann), Detections()))
+        if ROLLUP_ENABLED:
+            rollup_params.extend(_rollup_params(cam, created_ts, meta))
+    if not events:
+        return 0
+
+    t0 = time.perf_counter()
+    with _write_lock:
+        con = _writer()
+        with con:  # commit (one fsync) or rollback
+            det_params = []
+            for params, dets in events:
+                row_id = con.execute(_SQL_INSERT, params).lastrowid
+                det_params.extend((row_id, i, *r) for i, r in enumerate(dets.rows()))
+            con.executemany(_SQL_INSERT_DET, det_params)
+            con.executemany(_SQL_ROLLUP, rollup_params)
+    _DB_SECONDS.labels("store").observe(time.perf_counter() - t0)
+    _DB_ROWS.labels("store").inc(len(events))
+    return len(events)
 
 
 def store_local(
     camera_id: str,
     count: int,
-    meta_json: str,
+    meta_json: Union[str, Dict[str, Any]],
     frame_raw_path: Optional[str],
     frame_annotated_path: Optional[str]
 ) -> None:
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-    cur.execute(
-        "INSERT INTO people_count (created_at, camera_id, count, meta_json, frame_raw_path, frame_annotated_path, synced) "
-        "VALUES (?, ?, ?, ?, ?, ?, 0)",
-        (datetime.utcnow().isoformat(timespec="seconds") + "Z", camera_id,
-         count, meta_json, frame_raw_path, frame_annotated_path)
-    )
-    con.commit()
-    con.close()
+    store_many([(camera_id, count, meta_json,
+               frame_raw_path, frame_annotated_path)])
+
+
+def _detections_for(con: sqlite3.Connection, row_ids: List[int]) -> Dict[int, List[tuple]]:
+    out: Dict[int, List[tuple]] = {i: [] for i in row_ids}
+    for start in range(0, len(row_ids), 500):  # stay under SQLITE_MAX_VARIABLE_NUMBER
+        chunk = row_ids[start:start + 500]
+        marks = ",".join("?" * len(chunk))
+        for r in con.execute(
+                "SELECT row_id, class_id, conf, x1, y1, x2, y2, track_id FROM detections "
+                f"WHERE row_id IN ({marks}) ORDER BY row_id, idx", chunk):
+            out[r[0]].append(r[1:])
+    return out
+
+
+def _build_meta(header_json: str, dets: List[tuple]) -> str:
+    """Rebuild the full _to_meta() dict from a split row (same keys and order)."""
+    header = json.loads(header_json)
+    names = header.pop("_classes", {}) or {}
+    detections = [{
+        "class_id": cid,
+        "class_name": names.get(str(cid), str(cid)),
+        "confidence": conf,
+        "bbox_xyxy": [x1, y1, x2, y2],
+        "track_id": tid,
+    } for cid, conf, x1, y1, x2, y2, tid in dets]
+    conf_avg = round(sum(d["confidence"] for d in detections) / len(detections), 3) if detections else 0.0
+    meta: Dict[str, Any] = {}
+    for k, v in header.items():
+        if k == "gate":  # derived keys go before gate, as in detect.py
+            break
+        meta[k] = v
+    meta["detections"] = detections
+    meta["people"] = {"count": len([d for d in detections if d["class_name"] == "person"]),
+                      "confidence_avg": conf_avg}
+    meta.update(header)
+    return json.dumps(meta, ensure_ascii=False)
 
 
 def get_unsynced_rows(limit: int) -> List[Tuple[int, str, str, int, Optional[str], Optional[str], Optional[str]]]:
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-    cur.execute(
-        "SELECT id, created_at, camera_id, count, meta_json, frame_raw_path, frame_annotated_path "
-        "FROM people_count WHERE synced=0 ORDER BY id ASC LIMIT ?",
-        (limit,)
-    )
-    rows = cur.fetchall()
-    con.close()
-    return rows
+    """Oldest unsynced rows not held back by a reject; meta_json is generated here for split rows."""
+    con = _reader()
+    rows = con.execute(_SQL_UNSYNCED, (int(time.time()), limit)).fetchall()
+    split = [r[0] for r in rows if r[7] == META_SPLIT]
+    dets = _detections_for(con, split) if split else {}
+    return [(r[0], r[1], r[2], r[3],
+             _build_meta(r[4], dets.get(r[0], [])) if r[7] == META_SPLIT else r[4],
+             r[5], r[6]) for r in rows]
+
+
+def unsynced_backlog() -> Tuple[int, Optional[int]]:
+    """(unsynced rows, created_ts of the oldest one) - served by idx_pc_synced_ts."""
+    n, oldest = _reader().execute(
+        "SELECT COUNT(*), MIN(created_ts) FROM people_count WHERE synced=0").fetchone()
+    return int(n), oldest
+
+
+def mark_synced_many(row_ids: Iterable[int], drop_raw: bool = False) -> None:
+    """Mark rows synced in one transaction; drop_raw also clears frame_raw_path (caller releases it)."""
+    params = [(int(i),) for i in row_ids]
+    if not params:
+        return
+    t0 = time.perf_counter()
+    with _write_lock:
+        con = _writer()
+        with con:
+            con.executemany(_SQL_MARK_DROP_RAW if drop_raw else _SQL_MARK, params)
+    _DB_SECONDS.labels("mark_synced").observe(time.perf_counter() - t0)
+    _DB_ROWS.labels("mark_synced").inc(len(params))
 
 
 def mark_synced(row_id: int) -> None:
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
-    cur.execute("UPDATE people_count SET synced=1 WHERE id=?", (row_id,))
-    con.commit()
-    con.close()
+    mark_synced_many([row_id])
+
+
+def mark_rejected_many(row_ids: Iterable[int], max_rejects: int, retry_sec: float) -> List[int]:
+    """Record a per-item reject for each row; returns the ids that became dead letters."""
+    ids = [int(i) for i in row_ids]
+    if not ids:
+        return []
+    now = int(time.time())
+    with _write_lock:
+        con = _writer()
+        with con:
+            con.executemany(_SQL_REJECT, [(int(max_rejects), now, int(retry_sec), i) for i in ids])
+            dead = [r[0] for r in con.execute(
+                f"SELECT id FROM people_count WHERE synced={SYNC_DEAD} AND id IN "
+                f"({','.join('?' * len(ids))})", ids)]
+    _DB_ROWS.labels("mark_rejected").inc(len(ids))
+    return dead
 
 
 def _safe_del(path: Optional[str]) -> None:
@@ -87,22 +426,242 @@ def _safe_del(path: Optional[str]) -> None:
         pass
 
 
-def cleanup_old_synced(retention_days: int = RETENTION_DAYS) -> int:
-    cutoff = (datetime.utcnow() - timedelta(days=retention_days)
-              ).isoformat(timespec="seconds") + "Z"
-    con = sqlite3.connect(DB_NAME)
-    cur = con.cursor()
+def synced_id_bounds(before_ts: Optional[int] = None) -> Tuple[Optional[int], Optional[int]]:
+    """(min id, max id) of synced (or dead-lettered) rows, optionally only those created before before_ts."""
+    if before_ts is None:
+        sql, args = "SELECT MIN(id), MAX(id) FROM people_count WHERE synced>0", ()
+    else:
+        sql, args = ("SELECT MIN(id), MAX(id) FROM people_count WHERE synced>0 AND created_ts < ?",
+                     (int(before_ts),))
+    return _reader().execute(sql, args).fetchone()
 
-    if DELETE_OLD_FRAMES:
-        cur.execute(
-            "SELECT frame_raw_path, frame_annotated_path FROM people_count WHERE synced=1 AND created_at < ?", (cutoff,))
-        for raw, ann in cur.fetchall():
-            _safe_del(raw)
-            _safe_del(ann)
-
-    cur.execute(
-        "DELETE FROM people_count WHERE synced=1 AND created_at < ?", (cutoff,))
-    deleted = cur.rowcount
-    con.commit()
-    con.close()
+
+def delete_synced_range(lo: int, hi: int, before_ts: Optional[int] = None,
+                        drop_frames: bool = DELETE_OLD_FRAMES) -> Tuple[int, List[str]]:
+    """
+    Delete synced rows with lo < id <= hi (and created_ts < before_ts) in one
+    short transaction. Blob refs lose a reference in the same transaction.
+    Returns (rows deleted, legacy frame file paths to unlink).
+    """
+    where = "id > ? AND id <= ? AND synced>0"
+    args: Tuple = (int(lo), int(hi))
+    if before_ts is not None:
+        where += " AND created_ts < ?"
+        args += (int(before_ts),)
+
+    refs: List[Tuple[str]] = []
+    files: List[str] = []
+    with _write_lock:
+        con = _writer()
+        with con:
+            if drop_frames:
+                for raw, ann in con.execute(
+                        f"SELECT frame_raw_path, frame_annotated_path FROM people_count WHERE {where}", args):
+                    for path in (raw, ann):
+                        if not path:
+                            continue
+                        if path.startswith(BLOB_REF_PREFIX):
+                            refs.append((path[len(BLOB_REF_PREFIX):],))
+                        else:
+                            files.append(path)
+            con.execute(
+                f"DELETE FROM detections WHERE row_id IN (SELECT id FROM people_count WHERE {where})", args)
+            deleted = con.execute(f"DELETE FROM people_count WHERE {where}", args).rowcount
+            con.executemany(_SQL_UNREF, refs)
+    return deleted, files
+
+
+def cleanup_old_synced(
+    retention_days: int = RETENTION_DAYS,
+    chunk_rows: int = RETENTION_CHUNK_ROWS,
+    pause_sec: float = RETENTION_CHUNK_PAUSE_SEC,
+    on_files: Optional[Callable[[List[str]], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> int:
+    """
+    Delete synced rows older than retention_days in rowid-range chunks of
+    chunk_rows, releasing the write lock (and sleeping pause_sec) between
+    chunks so inserts are never blocked for long.
+    Legacy jpg paths go to on_files (default: unlinked inline); blob refs only
+    lose a reference and frame_store drops segments nothing references.
+    """
+    before_ts = int(time.time()) - int(retention_days) * 86400
+    lo, hi = synced_id_bounds(before_ts)
+    if lo is None:
+        return 0
+
+    total = 0
+    start = lo - 1
+    while start < hi:
+        if should_stop is not None and should_stop():
+            break
+        end = min(start + max(1, chunk_rows), hi)
+        t0 = time.perf_counter()
+        deleted, files = delete_synced_range(start, end, before_ts)
+        # per chunk: this is how long inserts may wait on the write lock
+        _DB_SECONDS.labels("cleanup").observe(time.perf_counter() - t0)
+        _DB_ROWS.labels("cleanup").inc(deleted)
+        total += deleted
+        if files:
+            if on_files is not None:
+                on_files(files)
+            else:
+                for path in files:
+                    _safe_del(path)
+        start = end
+        if pause_sec > 0 and start < hi:
+            time.sleep(pause_sec)
+    return total
+
+
+# ------------------ local analytics ------------------
+
+def count_buckets(
+    start_ts: int,
+    end_ts: int,
+    bucket_sec: int = 3600,
+    camera_id: Optional[str] = None,
+    class_ids: Optional[Iterable[int]] = None,
+) -> List[Tuple[str, int, int, int, int]]:
+    """
+    Detections per camera, per class, per time bucket in [start_ts, end_ts).
+    Returns [(camera_id, bucket_start_ts, class_id, detections, distinct_tracks)].
+    Uses idx_pc_cam_ts for the time range and the detections primary key for the join.
+    Only rows whose detections are in the detections table are counted.
+    """
+    b = max(1, int(bucket_sec))
+    where = ["p.created_ts >= ?", "p.created_ts < ?"]
+    args: List[Any] = [int(start_ts), int(end_ts)]
+    if camera_id is not None:
+        where.append("p.camera_id = ?")
+        args.append(camera_id)
+    if class_ids is not None:
+        ids = [int(c) for c in class_ids]
+        where.append(f"d.class_id IN ({','.join('?' * len(ids))})")
+        args.extend(ids)
+    sql = (
+        f"SELECT p.camera_id, (p.created_ts / {b}) * {b} AS bucket, d.class_id, "
+        "COUNT(*), COUNT(DISTINCT d.track_id) "
+        "FROM people_count p JOIN detections d ON d.row_id = p.id "
+        f"WHERE {' AND '.join(where)} "
+        "GROUP BY p.camera_id, bucket, d.class_id ORDER BY p.camera_id, bucket, d.class_id"
+    )
+    return _reader().execute(sql, args).fetchall()
+
+
+def rollup_query(
+    bucket_sec: int,
+    start_ts: int,
+    end_ts: int,
+    camera_id: Optional[str] = None,
+    class_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Rollup buckets in [start_ts, end_ts) for one bucket size (see ROLLUP_BUCKETS_SEC)."""
+    where = ["bucket_sec = ?", "bucket_ts >= ?", "bucket_ts < ?"]
+    args: List[Any] = [int(bucket_sec), int(start_ts), int(end_ts)]
+    if camera_id is not None:
+        where.append("camera_id = ?")
+        args.append(camera_id)
+    if class_name is not None:
+        where.append("class_name = ?")
+        args.append(class_name)
+    cur = _reader().execute(
+        "SELECT camera_id, class_name, bucket_ts, events, min_count, max_count, sum_count, sum_conf "
+        f"FROM rollups WHERE {' AND '.join(where)} ORDER BY camera_id, class_name, bucket_ts", args)
+    return [_rollup_dict(r, bucket_sec) for r in cur.fetchall()]
+
+
+def _rollup_dict(r: tuple, bucket_sec: int) -> Dict[str, Any]:
+    cam, cls, bts, events, mn, mx, total, conf = r
+    return {
+        "camera_id": cam, "class_name": cls, "bucket_sec": int(bucket_sec), "bucket_ts": bts,
+        "events": events, "min": mn, "max": mx,
+        "avg": round(total / events, 3) if events else 0.0,
+        "confidence_avg": round(conf / total, 3) if total else 0.0,
+    }
+
+
+def get_dirty_rollups(limit: int) -> List[Tuple[Dict[str, Any], int]]:
+    """Changed buckets not pushed yet: [(bucket dict, version)]."""
+    cur = _reader().execute(
+        "SELECT camera_id, class_name, bucket_ts, events, min_count, max_count, sum_count, sum_conf, "
+        "bucket_sec, version FROM rollups WHERE dirty=1 LIMIT ?", (int(limit),))
+    return [(_rollup_dict(r[:8], r[8]), r[9]) for r in cur.fetchall()]
+
+
+def mark_rollups_clean(pushed: Iterable[Tuple[Dict[str, Any], int]]) -> None:
+    """Clear dirty for pushed buckets, unless they changed again meanwhile."""
+    params = [(b["camera_id"], b["class_name"], b["bucket_sec"], b["bucket_ts"], v) for b, v in pushed]
+    if not params:
+        return
+    with _write_lock:
+        con = _writer()
+        with con:
+            con.executemany(
+                "UPDATE rollups SET dirty=0 WHERE camera_id=? AND class_name=? AND bucket_sec=? "
+                "AND bucket_ts=? AND version=?", params)
+
+
+def cleanup_rollups(now_ts: Optional[int] = None) -> int:
+    """Drop pushed (or never to be pushed) buckets older than ROLLUP_RETENTION_DAYS per size."""
+    now_ts = int(time.time()) if now_ts is None else int(now_ts)
+    deleted = 0
+    with _write_lock:
+        con = _writer()
+        with con:
+            for bucket, days in ROLLUP_RETENTION_DAYS.items():
+                deleted += con.execute(
+                    "DELETE FROM rollups WHERE bucket_sec=? AND bucket_ts < ? AND dirty=0",
+                    (int(bucket), now_ts - int(days) * 86400)).rowcount
     return deleted
+
+
+# ------------------ frame blobs (frame_store.py) ------------------
+
+def blob_lookup(ref: str) -> Optional[Tuple[str, int, int]]:
+    """ref -> (segment, offset, length) or None."""
+    return _reader().execute(
+        "SELECT segment, offset, length FROM frame_blobs WHERE ref=?", (ref,)).fetchone()
+
+
+def blob_insert(ref: str, segment: str, offset: int, length: int) -> None:
+    with _write_lock:
+        con = _writer()
+        with con:
+            con.execute(
+                "INSERT INTO frame_blobs (ref, segment, offset, length, refcount) VALUES (?, ?, ?, ?, 1)",
+                (ref, segment, offset, length))
+
+
+def blob_incref(ref: str) -> bool:
+    """Add a reference; False if the blob is unknown."""
+    with _write_lock:
+        con = _writer()
+        with con:
+            cur = con.execute(
+                "UPDATE frame_blobs SET refcount=refcount+1 WHERE ref=?", (ref,))
+            return cur.rowcount > 0
+
+
+def blob_unref_many(refs: Iterable[str]) -> None:
+    params = [(r,) for r in refs if r]
+    if not params:
+        return
+    with _write_lock:
+        con = _writer()
+        with con:
+            con.executemany(_SQL_UNREF, params)
+
+
+def blob_dead_segments() -> List[str]:
+    """Segments whose blobs are all unreferenced."""
+    cur = _reader().execute(
+        "SELECT segment FROM frame_blobs GROUP BY segment HAVING MAX(refcount) <= 0")
+    return [r[0] for r in cur.fetchall()]
+
+
+def blob_drop_segment(segment: str) -> int:
+    with _write_lock:
+        con = _writer()
+        with con:
+            return con.execute("DELETE FROM frame_blobs WHERE segment=?", (segment,)).rowcount
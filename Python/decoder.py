@@ -0,0 +1,238 @@
+"""
+Stream decoders for the capture readers.
+
+open_stream(url, decode_width) returns an object with the cv2.VideoCapture
+calls the readers use (isOpened / read / set / release), backed by:
+
+- "opencv": cv2.VideoCapture(CAP_FFMPEG), optionally with CAP_PROP_HW_ACCELERATION.
+            Downscaling happens after the decode (cv2.resize).
+- "pyav":   PyAV (pip install av). Keyframe-only decoding (skip_frame=NONKEY),
+            scaling folded into the one swscale pass to BGR, hwaccel on PyAV >= 14.
+- "ffmpeg": an ffmpeg subprocess writing raw BGR frames to a pipe
+            (-skip_frame nokey, -vf scale, -hwaccel); needs ffmpeg/ffprobe on PATH.
+
+With keyframes only the decoder skips every P/B frame, so a 4K stream costs
+one decode per GOP (typically 1-2 s) instead of 25-30 per second; the reader
+still always holds the newest decodable frame. If the configured backend is
+missing or cannot open the stream, open_stream() falls back to "opencv".
+"""
+
+import shutil
+import subprocess
+import threading
+from typing import Any, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import (
+    CAPTURE_BACKEND, CAPTURE_KEYFRAMES_ONLY, CAPTURE_HWACCEL, CAPTURE_HWACCEL_DEVICE
+)
+from log import get_logger
+
+_log = get_logger("decode")
+
+_CV_ACCEL = {
+    "auto": "VIDEO_ACCELERATION_ANY",
+    "vaapi": "VIDEO_ACCELERATION_VAAPI",
+    "qsv": "VIDEO_ACCELERATION_MFX",
+    "d3d11va": "VIDEO_ACCELERATION_D3D11",
+}
+_AV_AUTO = ("vaapi", "qsv", "cuda", "d3d11va", "videotoolbox")
+
+_warned: set = set()
+_warned_lock = threading.Lock()
+
+
+def _warn_once(key: str, msg: str) -> None:
+    with _warned_lock:
+        if key in _warned:
+            return
+        _warned.add(key)
+    _log.warn(msg)
+
+
+def _scaled_size(w: int, h: int, width: int) -> Tuple[int, int]:
+    """Target size for decode_width (even height, never upscaled)."""
+    if width <= 0 or width >= w:
+        return w, h
+    return int(width), max(2, int(round(h * width / float(w) / 2.0)) * 2)
+
+
+def is_usable(frame: Optional[np.ndarray]) -> bool:
+    """Not empty and not all black, judged on a strided thumbnail (no copy)."""
+    if frame is None or frame.size == 0:
+        return False
+    h, w = frame.shape[:2]
+    step = max(1, min(h, w) // 64)
+    thumb = frame[::step, ::step]
+    return thumb.mean() > 1.0 or thumb.var() > 1.0
+
+
+# ------------------ opencv ------------------
+
+class _OpenCVStream:
+    def __init__(self, url: str, decode_width: int, hwaccel: str) -> None:
+        params = []
+        accel = _CV_ACCEL.get(hwaccel)
+        if accel and hasattr(cv2, accel):
+            params = [cv2.CAP_PROP_HW_ACCELERATION, getattr(cv2, accel)]
+        self._cap = cv2.VideoCapture(url, cv2.CAP_FFMPEG, params) if params else \
+            cv2.VideoCapture(url, cv2.CAP_FFMPEG)
+        self._width = decode_width
+        self.backend = "opencv" + ("+hw" if params else "")
+
+    def isOpened(self) -> bool:
+        return self._cap.isOpened()
+
+    def set(self, prop: int, value: Any) -> bool:
+        return self._cap.set(prop, value)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        ret, frame = self._cap.read()
+        if ret and frame is not None and self._width:
+            w, h = _scaled_size(frame.shape[1], frame.shape[0], self._width)
+            if w != frame.shape[1]:
+                frame = cv2.resize(frame, (w, h), interpolation=cv2.INTER_AREA)
+        return ret, frame
+
+    def release(self) -> None:
+        self._cap.release()
+
+
+# ------------------ PyAV ------------------
+
+class _PyAVStream:
+    def __init__(self, url: str, decode_width: int, keyframes: bool, hwaccel: str) -> None:
+        import av  # optional dependency
+
+        kwargs = {}
+        if hwaccel and hwaccel != "none":
+            try:
+                from av.codec.hwaccel import HWAccel, hwdevices_available
+                kind = hwaccel
+                if kind == "auto":
+                    avail = set(hwdevices_available())
+                    kind = next((k for k in _AV_AUTO if k in avail), None)
+                if kind:
+                    kwargs["hwaccel"] = HWAccel(device_type=kind, device=CAPTURE_HWACCEL_DEVICE or None,
+                                                allow_software_fallback=True)
+            except ImportError:
+                _warn_once("pyav-hw", "[DECODE] PyAV < 14 has no hwaccel; decoding in software")
+
+        options = {"rtsp_transport": "tcp", "fflags": "nobuffer"} if url.startswith("rtsp") else {}
+        self._container = av.open(url, options=options, timeout=(10.0, 5.0), **kwargs)
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"
+        if keyframes:
+            self._stream.codec_context.skip_frame = "NONKEY"
+        self._frames = self._container.decode(self._stream)
+        self._width = decode_width
+        self.backend = "pyav" + ("+hw" if "hwaccel" in kwargs else "") + ("+key" if keyframes else "")
+
+    def isOpened(self) -> bool:
+        return self._container is not None
+
+    def set(self, prop: int, value: Any) -> bool:
+        return False
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        try:
+            frame = next(self._frames)
+        except Exception:  # StopIteration, network / decode errors -> reader reconnects
+            return False, None
+        w, h = _scaled_size(frame.width, frame.height, self._width)
+        # scale + colour conversion in one swscale pass
+        return True, frame.to_ndarray(width=w, height=h, format="bgr24")
+
+    def release(self) -> None:
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+
+
+# ------------------ ffmpeg subprocess ------------------
+
+def _probe_size(url: str) -> Tuple[int, int]:
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-rtsp_transport", "tcp", "-select_streams", "v:0",
+         "-show_entries", "stream=width,height", "-of", "csv=p=0", url]
+        if url.startswith("rtsp") else
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "stream=width,height", "-of", "csv=p=0", url],
+        capture_output=True, text=True, timeout=15, check=True).stdout
+    w, h = (int(v) for v in out.strip().splitlines()[0].split(",")[:2])
+    return w, h
+
+
+class _FFmpegStream:
+    def __init__(self, url: str, decode_width: int, keyframes: bool, hwaccel: str) -> None:
+        if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+            raise RuntimeError("ffmpeg / ffprobe not on PATH")
+        w, h = _probe_size(url)
+        self._w, self._h = _scaled_size(w, h, decode_width)
+        cmd = ["ffmpeg", "-nostdin", "-loglevel", "error"]
+        if url.startswith("rtsp"):
+            cmd += ["-rtsp_transport", "tcp", "-timeout", "5000000"]
+        if hwaccel and hwaccel != "none":
+            cmd += ["-hwaccel", hwaccel]
+            if CAPTURE_HWACCEL_DEVICE:
+                cmd += ["-hwaccel_device", CAPTURE_HWACCEL_DEVICE]
+        if keyframes:
+            cmd += ["-skip_frame", "nokey"]
+        cmd += ["-i", url, "-an", "-vsync", "0"]
+        if (self._w, self._h) != (w, h):
+            cmd += ["-vf", f"scale={self._w}:{self._h}"]
+        cmd += ["-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        self._proc: Optional[subprocess.Popen] = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0)
+        self._size = self._w * self._h * 3
+        self.backend = "ffmpeg" + ("+hw" if hwaccel and hwaccel != "none" else "") + ("+key" if keyframes else "")
+
+    def isOpened(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def set(self, prop: int, value: Any) -> bool:
+        return False
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._proc is None:
+            return False, None
+        buf = bytearray(self._size)
+        view, got = memoryview(buf), 0
+        while got < self._size:
+            n = self._proc.stdout.readinto(view[got:])
+            if not n:
+                return False, None  # ffmpeg exited: stream lost
+            got += n
+        return True, np.frombuffer(buf, dtype=np.uint8).reshape(self._h, self._w, 3)
+
+    def release(self) -> None:
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.wait()
+            self._proc.stdout.close()
+            self._proc = None
+
+
+# ------------------ factory ------------------
+
+def open_stream(url: str, decode_width: int = 0, backend: Optional[str] = None,
+                keyframes: Optional[bool] = None, hwaccel: Optional[str] = None):
+    """Open `url` with the configured backend (or the given one); falls back to opencv."""
+    backend = (backend or CAPTURE_BACKEND or "opencv").lower()
+    keyframes = CAPTURE_KEYFRAMES_ONLY if keyframes is None else keyframes
+    hwaccel = (hwaccel or CAPTURE_HWACCEL or "none").lower()
+    if backend in ("pyav", "ffmpeg"):
+        try:
+            cls = _PyAVStream if backend == "pyav" else _FFmpegStream
+            stream = cls(url, decode_width, keyframes, hwaccel)
+            if stream.isOpened():
+                return stream
+            stream.release()
+        except Exception as e:
+            _warn_once(f"{backend}:{e.__class__.__name__}",
+                       f"[DECODE] {backend} backend unavailable ({e}); falling back to opencv")
+    elif backend != "opencv":
+        _warn_once(backend, f"[DECODE] unknown CAPTURE_BACKEND {backend!r}; using opencv")
+    return _OpenCVStream(url, decode_width, hwaccel)
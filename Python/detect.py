@@ -4,8 +4,15 @@ YOLOv11 detection + tracking, with dynamic target classes fetched from your API.
 - Reads TEST_FRAME_PATH (local image) or grabs one RTSP frame.
 - Fetches target class names from REMOTE_TARGETS_URL (cached TTL).
 - Maps class names -> YOLO class IDs (e.g., "person" -> 0).
-- Runs model.track(classes=[...]) using those IDs.
-- Saves RAW and (if any detections) ANNOTATED frames.
+- Skips inference for frames the per-camera motion gate says are unchanged.
+- Runs model.predict(classes=[...]) using those IDs (on the whole frame, or on
+  the camera's ROI / tile crops, see tiling.py), then a per-camera tracker.
+- Cameras with a detection substream ("rtsp_sub") are inferred on it; for
+  positive detections the evidence frame comes from the main stream, boxes
+  rescaled (evidence_frame).
+- Encodes RAW (unless gated) and (if any detections) ANNOTATED jpgs once;
+  frame_output.py uploads them from memory and appends them to the
+  content-addressed frame store (frame_store.py) in the background.
 - Returns (count, raw_path, annotated_path, meta).
 """
 
@@ -16,22 +23,210 @@ from typing import Any, Dict, Tuple, Optional, List
 import json
 import cv2
 import numpy as np
-import requests
 from ultralytics import YOLO
 
 from config import (
-    FRAME_ROOT, FRAME_WIDTH, FRAME_HEIGHT, MODEL_NAME, TEST_FRAME_PATH,
-    REMOTE_TARGETS_URL, REMOTE_TARGETS_TTL_SEC, REQUESTS_VERIFY_TLS
+    FRAME_WIDTH, FRAME_HEIGHT, MODEL_NAME, TEST_FRAME_PATH,
+    REMOTE_TARGETS_URL, REMOTE_TARGETS_TTL_SEC,
+    CAPTURE_POOL_ENABLED, DETECT_BATCH_SIZE,
+    FRAME_MAX_WIDTH, FRAME_ANNOTATED_ONLY, FRAME_PHASH_FOLD,
+    INFER_BACKEND, INFER_IMGSZ, INFER_THREADS, SUBSTREAM_EVIDENCE_MODE, CAPTURE_DECODE_WIDTH
 )
+from capture import detect_url, evidence_url, get_pool
+from decoder import is_usable, open_stream
+from detections import NO_TRACK, Detections
+from frame_output import encode_jpg, get_output
+from frame_store import blob_ref, dhash
+from http_client import get as http_get
+from log import get_logger
+from metrics import counter, histogram
+from motion import get_gate, is_gated
+from tiling import merge as merge_tiles, plan as plan_crops
+from tracking import get_registry
+
+_log = get_logger("detect")
+
+# hot-path timings (metrics.py, served on /metrics)
+_GRAB_SECONDS = histogram(
+    "edge_grab_seconds", "Frame grab latency; result=ok|fail (RTSP gave no frame)|synthetic", ["result"])
+_PREDICT_SECONDS = histogram("edge_predict_seconds", "model.predict wall time per call (one batch)")
+_TRACK_SECONDS = histogram("edge_track_seconds", "Tracker update per frame")
+_SAVE_SECONDS = histogram("edge_save_seconds", "save_frames: jpg encode + hand-off to the frame writer")
+_FRAMES = counter("edge_infer_frames_total", "Frames through inference; gated = reused previous result",
+                  ["gated"])
+_EVIDENCE = counter("edge_evidence_frames_total",
+                    "Evidence frames of substream cameras; source=main|substream (main stream had no frame)",
+                    ["source"])
 
 # ------------------ model (lazy) ------------------
-_MODEL: YOLO | None = None
+# INFER_BACKEND picks the runtime:
+#   "torch"    -> ultralytics YOLO(MODEL_NAME) as before
+#   "onnx"     -> ONNX Runtime on CPU
+#   "openvino" -> OpenVINO on CPU
+# For onnx/openvino a .pt MODEL_NAME is exported once and cached next to the
+# weights (keyed by file hash + INFER_IMGSZ); MODEL_NAME may also point at an
+# already exported .onnx file / *_openvino_model dir. Any failure -> torch.
+_MODEL: Any = None
+
+
+def _letterbox(img: np.ndarray, size: int) -> Tuple[np.ndarray, float, int, int]:
+    """Resize keeping aspect ratio and pad to size x size (same as ultralytics)."""
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    nh, nw = int(round(h * r)), int(round(w * r))
+    top, left = (size - nh) // 2, (size - nw) // 2
+    out = np.full((size, size, 3), 114, dtype=np.uint8)
+    out[top:top + nh, left:left + nw] = cv2.resize(
+        img, (nw, nh), interpolation=cv2.INTER_LINEAR)
+    return out, r, left, top
+
+
+class _ExportedModel:
+    """
+    Runs an exported YOLO detect model (ONNX / OpenVINO) and returns ultralytics
+    Results, so tracking and _extract_dets see the same shape as with torch.
+    Only the predict() arguments detect.py uses are supported.
+    """
 
+    def __init__(self, kind: str, path: str, names: Dict[int, str], imgsz: int, threads: int) -> None:
+        self.kind = kind
+        self.names = names
+        self.imgsz = imgsz
+        if kind == "onnx":
+            import onnxruntime as ort
+            so = ort.SessionOptions()
+            if threads > 0:
+                so.intra_op_num_threads = threads
+            self._session = ort.InferenceSession(
+                path, so, providers=["CPUExecutionProvider"])
+            self._input = self._session.get_inputs()[0].name
+        else:
+            import openvino as ov
+            core = ov.Core()
+            if threads > 0:
+                core.set_property("CPU", {"INFERENCE_NUM_THREADS": threads})
+            xml = path if path.endswith(".xml") else next(
+                os.path.join(path, f) for f in os.listdir(path) if f.endswith(".xml"))
+            self._compiled = core.compile_model(core.read_model(xml), "CPU")
+
+    def _run(self, blob: np.ndarray) -> np.ndarray:
+        if self.kind == "onnx":
+            return self._session.run(None, {self._input: blob})[0]
+        return self._compiled(blob)[self._compiled.output(0)]
+
+    def predict(self, source, classes: Optional[List[int]] = None, conf: float = 0.25,
+                iou: float = 0.7, max_det: int = 300, verbose: bool = False, **_):
+        import torch
+        from ultralytics.engine.results import Results
+
+        frames = source if isinstance(source, list) else [source]
+        boxes_in = [_letterbox(f, self.imgsz) for f in frames]
+        blob = np.stack([b[0][..., ::-1].transpose(2, 0, 1) for b in boxes_in])
+        blob = np.ascontiguousarray(blob, dtype=np.float32) / 255.0
+        preds = self._run(blob)  # (B, 4 + nc, N): cx, cy, w, h, class scores
+
+        results = []
+        for frame, (_, r, left, top), pred in zip(frames, boxes_in, preds):
+            pred = pred.T
+            scores = pred[:, 4:]
+            cls = scores.argmax(1)
+            confs = scores[np.arange(len(cls)), cls]
+            keep = confs >= conf
+            if classes is not None:
+                keep &= np.isin(cls, classes)
+            xywh, confs, cls = pred[keep, :4], confs[keep], cls[keep]
+
+            # NMS per class on top-left xywh in letterbox space
+            tl = xywh.copy()
+            tl[:, :2] -= tl[:, 2:] / 2
+            idx = cv2.dnn.NMSBoxesBatched(tl.tolist(), confs.tolist(), cls.tolist(),
+                                          conf, iou) if len(tl) else []
+            idx = np.array(idx, dtype=int).reshape(-1)[:max_det]
+
+            h, w = frame.shape[:2]
+            xyxy = np.concatenate([tl[idx, :2], tl[idx, :2] + tl[idx, 2:]], axis=1)
+            xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - left) / r).clip(0, w)
+            xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - top) / r).clip(0, h)
+            data = np.concatenate(
+                [xyxy, confs[idx, None], cls[idx, None].astype(np.float32)], axis=1)
+            results.append(Results(frame, path="", names=self.names,
+                                   boxes=torch.as_tensor(data, dtype=torch.float32)))
+        return results
+
+
+def _file_hash(path: str) -> str:
+    import hashlib
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def _exported_names(kind: str, path: str) -> Dict[int, str]:
+    """Class names stored by ultralytics export (onnx metadata / metadata.yaml)."""
+    import ast
+    if kind == "onnx":
+        import onnxruntime as ort
+        meta = ort.InferenceSession(path, providers=["CPUExecutionProvider"]) \
+            .get_modelmeta().custom_metadata_map
+        return ast.literal_eval(meta["names"])
+    import yaml
+    with open(os.path.join(path, "metadata.yaml"), "r", encoding="utf-8") as f:
+        return {int(k): v for k, v in yaml.safe_load(f)["names"].items()}
+
+
+def _export_cached(kind: str, yolo: YOLO) -> str:
+    """Export the .pt once; later starts reuse <weights dir>/exports/<stem>-<hash>-<imgsz>."""
+    import shutil
+    pt = str(getattr(yolo, "ckpt_path", None) or MODEL_NAME)
+    stem = os.path.splitext(os.path.basename(pt))[0]
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(pt)), "exports")
+    target = os.path.join(
+        cache_dir, f"{stem}-{_file_hash(pt)}-{INFER_IMGSZ}" + (".onnx" if kind == "onnx" else "_openvino_model"))
+    if os.path.exists(target):
+        return target
+
+    os.makedirs(cache_dir, exist_ok=True)
+    out = yolo.export(format=kind, imgsz=INFER_IMGSZ, dynamic=True, verbose=False)
+    shutil.move(str(out), target)
+    return target
+
+
+def _load_backend():
+    kind = INFER_BACKEND.lower()
+    if MODEL_NAME.endswith(".onnx"):
+        kind, path = "onnx", MODEL_NAME
+    elif MODEL_NAME.rstrip("/\\").endswith("_openvino_model"):
+        kind, path = "openvino", MODEL_NAME
+    elif kind in ("onnx", "openvino"):
+        path = None
+    else:
+        return YOLO(MODEL_NAME)  # auto-downloads on first use
 
-def _get_model() -> YOLO:
+    yolo = None
+    try:
+        if path is None:
+            yolo = YOLO(MODEL_NAME)
+            path = _export_cached(kind, yolo)
+            names = dict(yolo.names)
+        else:
+            names = _exported_names(kind, path)
+        model = _ExportedModel(kind, path, names, INFER_IMGSZ, INFER_THREADS)
+        _log.info(f"[MODEL] {kind} backend: {path}")
+        return model
+    except Exception as e:
+        _log.warn(f"[MODEL] {kind} backend unavailable ({e}); falling back to torch")
+        return yolo if yolo is not None else YOLO(MODEL_NAME)
+
+
+def _get_model():
     global _MODEL
     if _MODEL is None:
-        _MODEL = YOLO(MODEL_NAME)  # auto-downloads on first use
+        _MODEL = _load_backend()
+        if INFER_THREADS > 0 and isinstance(_MODEL, YOLO):
+            import torch
+            torch.set_num_threads(INFER_THREADS)
     return _MODEL
 
 
@@ -124,8 +319,7 @@ def _fetch_targets() -> None:
         return
 
     try:
-        r = requests.get(REMOTE_TARGETS_URL, timeout=30,
-                         verify=REQUESTS_VERIFY_TLS)
+        r = http_get(REMOTE_TARGETS_URL, timeout=30)
         if r.status_code != 200:
             _bump_expiry()
             return
@@ -187,39 +381,70 @@ def _ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
 
-def _save_jpg(dir_path: str, cam_id: str, suffix: str, img) -> str:
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
-    name = f"{cam_id}_{ts}_{suffix}.jpg"
-    path = os.path.join(dir_path, name)
-    cv2.imwrite(path, img)
-    return path
+def _fit_width(img: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Downscale to FRAME_MAX_WIDTH (if set); returns (image, scale)."""
+    h, w = img.shape[:2]
+    if not FRAME_MAX_WIDTH or w <= FRAME_MAX_WIDTH:
+        return img, 1.0
+    scale = FRAME_MAX_WIDTH / float(w)
+    return cv2.resize(img, (int(FRAME_MAX_WIDTH), max(1, int(round(h * scale)))),
+                      interpolation=cv2.INTER_AREA), scale
 
 
-def _grab_raw_frame(camera: Dict) -> np.ndarray:
-    import time
-    import cv2
-    import numpy as np
-    from config import FRAME_WIDTH, FRAME_HEIGHT
+def _grab_once(rtsp: str, decode_width: int = 0) -> Optional[np.ndarray]:
+    """Open, warm up (≤3s) and release — used when the capture pool is off."""
+    cap = open_stream(rtsp, decode_width)
+    if cap.isOpened():
+        try:
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        except Exception:
+            pass
 
-    rtsp = (camera or {}).get("rtsp")
+        t0 = time.time()
+        while time.time() - t0 < 3.0:  # warm up ≤3s
+            ret, frame = cap.read()
+            if ret and is_usable(frame):  # all black (decoder / pipeline) is unusable
+                cap.release()
+                return frame
+            time.sleep(0.02)
+    cap.release()
+    return None
+
+
+_test_frame: Dict[str, Any] = {}
+
+
+def _load_test_frame() -> Optional[np.ndarray]:
+    """TEST_FRAME_PATH decoded once (None if unset or unreadable)."""
+    if not TEST_FRAME_PATH:
+        return None
+    if TEST_FRAME_PATH not in _test_frame:
+        img = cv2.imread(TEST_FRAME_PATH) if os.path.isfile(TEST_FRAME_PATH) else None
+        if img is None:
+            _log.warn(f"[GRAB] TEST_FRAME_PATH not readable: {TEST_FRAME_PATH}")
+        _test_frame[TEST_FRAME_PATH] = img
+    return _test_frame[TEST_FRAME_PATH]
+
+
+def _grab_raw_frame(camera: Dict) -> np.ndarray:
+    rtsp = detect_url(camera or {})
+    frame = None
+    t0 = time.perf_counter()
     if rtsp:
-        cap = cv2.VideoCapture(rtsp, cv2.CAP_FFMPEG)
-        if cap.isOpened():
-            try:
-                cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            except Exception:
-                pass
-
-            t0 = time.time()
-            while time.time() - t0 < 3.0:  # warm up ≤3s
-                ret, frame = cap.read()
-                if ret and frame is not None and frame.size:
-                    # treat “all black” (decoder/pipeline) as unusable
-                    if frame.mean() > 1.0 or frame.var() > 1.0:
-                        cap.release()
-                        return frame
-                time.sleep(0.02)
-        cap.release()
+        if CAPTURE_POOL_ENABLED:
+            frame = get_pool().get_frame(camera)  # newest frame from the reader thread
+        else:
+            frame = _grab_once(rtsp, CAPTURE_DECODE_WIDTH)
+    result = "ok" if frame is not None else ("fail" if rtsp else "synthetic")
+    _GRAB_SECONDS.labels(result).observe(time.perf_counter() - t0)
+    if frame is not None:
+        return frame
+
+    # camera without a stream: the test image, if configured
+    if not rtsp:
+        test = _load_test_frame()
+        if test is not None:
+            return test.copy()
 
     # synthetic fallback (keeps pipeline alive)
     img = np.zeros((int(FRAME_HEIGHT), int(FRAME_WIDTH), 3), dtype=np.uint8)
@@ -227,13 +452,18 @@ def _grab_raw_frame(camera: Dict) -> np.ndarray:
     return img
 
 
-def _draw_anno(img: np.ndarray, dets: List[Dict]) -> np.ndarray:
+def _draw_anno(img: np.ndarray, dets: Detections, scale: float = 1.0) -> np.ndarray:
     out = img.copy()
-    for d in dets:
-        x1, y1, x2, y2 = map(int, d["bbox_xyxy"])
-        color = (0, 220, 255)
+    dets = Detections.coerce(dets)
+    if not dets:
+        return out
+    color = (0, 220, 255)
+    boxes = (dets.xyxy() * scale).astype(int).tolist()  # truncates like int(v * scale)
+    tids = [None if t == NO_TRACK else t for t in dets.data["track_id"].tolist()]
+    for (x1, y1, x2, y2), tid, name, conf in zip(boxes, tids, dets.class_names(),
+                                                 dets.data["confidence"].tolist()):
         cv2.rectangle(out, (x1, y1), (x2, y2), color, 2)
-        label = f'id{d["track_id"]} {d["class_name"]} {d["confidence"]:.2f}'
+        label = f'id{tid} {name} {conf:.2f}'
         (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)
         top = max(0, y1 - th - 6)
         cv2.rectangle(out, (x1, top), (x1 + tw + 2, y1), color, -1)
@@ -242,119 +472,278 @@ def _draw_anno(img: np.ndarray, dets: List[Dict]) -> np.ndarray:
     return out
 
 
-def _to_meta(cam_id: str, w: int, h: int, dets: List[Dict], inf_ms: float, targets: List[str]) -> Dict:
-    conf_avg = round(sum(d["confidence"]
-                     for d in dets) / len(dets), 3) if dets else 0.0
+def _to_meta(cam_id: str, w: int, h: int, dets: Detections, inf_ms: float, targets: List[str]) -> Dict:
     return {
         "timestamp_utc": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
         "camera_id": cam_id,
         "image": {"width": int(w), "height": int(h)},
         "compute": {"inference_ms": float(inf_ms), "model": MODEL_NAME},
         "targets": targets,                      # <--- include what we attempted to detect
-        "detections": dets,
-        "people": {"count": len([d for d in dets if d.get("class_name") == "person"]),
-                   "confidence_avg": conf_avg}
+        "detections": dets,                      # Detections; dicts when serialised
+        "people": {"count": dets.count_of("person"),
+                   "confidence_avg": round(dets.conf_avg(), 3)}
     }
 
 
-def _extract_dets(result, names: Dict[int, str], allowed_ids: Optional[set]) -> List[Dict]:
-    dets: List[Dict] = []
+def _extract_dets(result, names: Dict[int, str], allowed_ids: Optional[set]) -> Detections:
+    """
+    Result boxes -> Detections: one device->host copy of boxes.data
+    (x1 y1 x2 y2 [track id] conf cls), columns sliced out, class filter vectorised.
+    """
     boxes = getattr(result, "boxes", None)
-    if boxes is None:
-        return dets
+    data = getattr(boxes, "data", None)
+    if data is None:
+        return Detections(names=names)
+    data = data.cpu().numpy() if hasattr(data, "cpu") else np.asarray(data)
+    ids = data[:, 4] if data.shape[1] == 7 else None  # tracked results carry the id column
+    return Detections.from_arrays(data[:, :4], data[:, -2], data[:, -1], ids, names, allowed_ids)
 
-    xyxy = boxes.xyxy.cpu().numpy() if hasattr(boxes, "xyxy") else None
-    conf = boxes.conf.cpu().numpy() if hasattr(boxes, "conf") else None
-    cls = boxes.cls.cpu().numpy() if hasattr(boxes, "cls") else None
+# ------------------ stages ------------------
+# detect_one() runs these back to back; pipeline.py runs them on separate
+# workers (grab on an I/O pool, infer on the single thread owning the model).
 
-    ids = None
-    if hasattr(boxes, "id") and boxes.id is not None:
-        try:
-            ids = boxes.id.cpu().numpy()
-        except Exception:
-            ids = None
 
-    if xyxy is None or conf is None or cls is None:
-        return dets
+def grab_frame(camera: Dict) -> np.ndarray:
+    """Stage 1: fetch the newest frame for this camera (RTSP or synthetic)."""
+    return _grab_raw_frame(camera)
 
-    for i in range(len(xyxy)):
-        class_id = int(cls[i])
-        if allowed_ids is not None and class_id not in allowed_ids:
-            continue
-        class_name = names.get(class_id, str(class_id))
-        dets.append({
-            "class_id": class_id,
-            "class_name": class_name,
-            "confidence": float(conf[i]),
-            "bbox_xyxy": [float(x) for x in xyxy[i].tolist()],
-            "track_id": int(ids[i]) if ids is not None and i < len(ids) and ids[i] is not None else None
-        })
-    return dets
 
-# ------------------ main entry ------------------
+def _model_names(model) -> Dict[int, str]:
+    # YOLO name dict: id -> name
+    return model.model.names if hasattr(model, "model") and hasattr(
+        model.model, "names") else model.names
 
 
-def detect_one(camera: Dict) -> Tuple[int, Optional[str], Optional[str], Dict]:
+def _classes_param(targets: List[str], names: Dict[int, str]) -> Optional[List[int]]:
+    """Target names -> sorted YOLO class IDs, or None for 'detect everything'."""
+    # 1) If "All" (or "*") is present -> no class filter (detect everything)
+    if any(str(t).lower() in ("all", "*") for t in targets):
+        return None  # YOLO will detect every class it knows
+    # 2) Map target names -> class IDs (case-insensitive)
+    name_to_id = {str(v).lower(): k for k, v in names.items()}
+    wanted_ids = {int(name_to_id[str(t).lower()])
+                  for t in targets if str(t).lower() in name_to_id}
+    # None => all (fallback)
+    return sorted(wanted_ids) if wanted_ids else None
+
+
+def infer_frame(camera: Dict, raw: np.ndarray) -> Tuple[Detections, Dict]:
     """
-    Returns (count, raw_path, annotated_path, meta).
-    'count' = number of detections (after filtering to targets).
+    Stage 2: run detection + tracking on one frame.
+    Returns (dets, meta). Must be called from the thread that owns the model.
     """
     t0 = time.time()
     cam_key = camera["key"]
     cam_id = camera["id"]
-
-    # Folder per day
-    day = datetime.utcnow().strftime("%Y-%m-%d")
-    day_dir = os.path.join(FRAME_ROOT, day)
-    os.makedirs(day_dir, exist_ok=True)
-
-    # RAW frame
-    raw = _grab_raw_frame(camera)
     h, w = raw.shape[:2]
-    raw_path = _save_jpg(day_dir, cam_id, "raw", raw)
+
+    # Unchanged scene -> reuse the previous result, no inference
+    gate = get_gate()
+    gated, score = gate.check(cam_key, raw)
+    if gated:
+        _FRAMES.labels("true").inc()
+        return gate.gated_meta(cam_key, cam_id, score)
 
     # Targets from API (names -> IDs)
     targets = _get_targets_for_camera(cam_key)  # e.g., ["person","dog"]
     model = _get_model()
-    # YOLO name dict: id -> name
-    names = model.model.names if hasattr(model, "model") and hasattr(
-        model.model, "names") else model.names
+    names = _model_names(model)
+    classes_param = _classes_param(targets, names)
 
-    # 1) If "All" (or "*") is present -> no class filter (detect everything)
-    detect_all = any(str(t).lower() in ("all", "*") for t in targets)
-    if detect_all:
-        classes_param = None  # YOLO will detect every class it knows
-    else:
-        # 2) Map target names -> class IDs (case-insensitive)
-        name_to_id = {str(v).lower(): k for k, v in names.items()}
-        wanted_ids = {int(name_to_id[str(t).lower()])
-                      for t in targets if str(t).lower() in name_to_id}
-        # None => all (fallback)
-        classes_param = sorted(wanted_ids) if wanted_ids else None
-
-    # Inference & tracking
+    # Inference (whole frame or ROI / tile crops), then this camera's own tracker
     t1 = time.time()
-    results = model.track(
-        source=raw,
-        tracker="bytetrack.yaml",
-        persist=True,
-        classes=classes_param,  # ← filter to targets
-        conf=0.20,
-        verbose=False
-    )
+    crops = plan_crops(camera, w, h)
+    results = _predict(model, [raw], [crops], classes_param, names)  # ← filter to targets
     inf_ms = (time.time() - t1) * 1000.0
+    _FRAMES.labels("false").inc()
 
-    res = results[0]
+    t2 = time.perf_counter()
+    res = get_registry().apply(cam_key, results[0])
+    _TRACK_SECONDS.observe(time.perf_counter() - t2)
     dets = _extract_dets(res, names, set(classes_param)
                          if classes_param is not None else None)
 
+    meta = _to_meta(cam_id, w, h, dets, inf_ms if inf_ms >
+                    0 else (time.time() - t0) * 1000.0, targets)
+    meta["gate"] = {"gated": False, "score": round(score, 5)}
+    if crops is not None:
+        meta["crops"] = len(crops)
+    gate.remember(cam_key, dets, meta)
+    return dets, meta
+
+
+# ------------------ batched inference ------------------
+# One forward pass for many cameras. Frames are grouped by their class filter
+# (YOLO takes one `classes` list per call), run through model.predict() as a
+# batch, then each result goes through that camera's own tracker (tracking.py).
+# Cameras with ROIs / tiles contribute their crops to the same batches.
+
+
+def _predict(model, frames: List[np.ndarray], crops: List[Optional[List[Tuple[int, int, int, int]]]],
+             classes: Optional[List[int]], names: Dict[int, str]) -> List[Any]:
+    """
+    model.predict() over whole frames and/or their crops, DETECT_BATCH_SIZE
+    images per call. Returns one result per frame; crop results are mapped
+    back to frame coordinates and merged (tiling.merge).
+    """
+    units = []  # (frame index, image)
+    for f, (raw, rects) in enumerate(zip(frames, crops)):
+        if rects is None:
+            units.append((f, raw))
+        else:
+            units.extend((f, raw[y1:y2, x1:x2]) for x1, y1, x2, y2 in rects)
+
+    parts: List[List[Any]] = [[] for _ in frames]
+    for start in range(0, len(units), DETECT_BATCH_SIZE):
+        chunk = units[start:start + DETECT_BATCH_SIZE]
+        t1 = time.time()
+        results = model.predict(
+            source=[img for _, img in chunk],
+            classes=classes,
+            conf=0.20,
+            verbose=False
+        )
+        _PREDICT_SECONDS.observe(time.time() - t1)
+        for (f, _), res in zip(chunk, results):
+            parts[f].append(res)
+
+    return [p[0] if rects is None else merge_tiles(p, rects, raw, names)
+            for p, raw, rects in zip(parts, frames, crops)]
+
+
+def detect_batch(items: List[Tuple[Dict, np.ndarray]]) -> List[Tuple[Detections, Dict]]:
+    """
+    Batched version of infer_frame() for frames from many cameras.
+    `items` is [(camera, raw), ...]; returns [(dets, meta), ...] in the same order.
+    Must be called from the thread that owns the model.
+    """
+    if not items:
+        return []
+    model = _get_model()
+    names = _model_names(model)
+    gate = get_gate()
+    out: List[Any] = [None] * len(items)
+
+    # group by class filter: classes tuple (or None) -> [(index, camera, raw, targets), ...]
+    # gated (unchanged) frames are answered from the previous result right away
+    groups: Dict[Optional[Tuple[int, ...]], List[Tuple[int, Dict, np.ndarray, List[str]]]] = {}
+    scores: Dict[int, float] = {}
+    for i, (camera, raw) in enumerate(items):
+        gated, scores[i] = gate.check(camera["key"], raw)
+        if gated:
+            _FRAMES.labels("true").inc()
+            out[i] = gate.gated_meta(camera["key"], camera["id"], scores[i])
+            continue
+        targets = _get_targets_for_camera(camera["key"])
+        cp = _classes_param(targets, names)
+        key = tuple(cp) if cp is not None else None
+        groups.setdefault(key, []).append((i, camera, raw, targets))
+
+    for cp, members in groups.items():
+        allowed = set(cp) if cp is not None else None
+        crops = [plan_crops(camera, raw.shape[1], raw.shape[0]) for _, camera, raw, _ in members]
+        t1 = time.time()
+        results = _predict(model, [raw for _, _, raw, _ in members], crops,
+                           list(cp) if cp is not None else None, names)
+        _FRAMES.labels("false").inc(len(members))
+        # amortised per frame, so meta stays comparable with infer_frame()
+        inf_ms = (time.time() - t1) * 1000.0 / len(members)
+
+        for (i, camera, raw, targets), res, rects in zip(members, results, crops):
+            t2 = time.perf_counter()
+            res = get_registry().apply(camera["key"], res)
+            _TRACK_SECONDS.observe(time.perf_counter() - t2)
+            dets = _extract_dets(res, names, allowed)
+            h, w = raw.shape[:2]
+            meta = _to_meta(camera["id"], w, h, dets, inf_ms, targets)
+            meta["gate"] = {"gated": False, "score": round(scores[i], 5)}
+            if rects is not None:
+                meta["crops"] = len(rects)
+            gate.remember(camera["key"], dets, meta)
+            out[i] = (dets, meta)
+    return out
+
+
+def evidence_frame(camera: Dict, raw: np.ndarray, dets: Detections,
+                   meta: Dict) -> Tuple[np.ndarray, Detections, Dict]:
+    """
+    For a camera inferred on its substream: the main-stream frame to save as
+    evidence, with dets and meta rescaled to it. Returns the inputs unchanged
+    for cameras without a substream, for empty or gated results, and when the
+    main stream has no frame. Never mutates dets / meta (the motion gate keeps them).
+    """
+    main_url = evidence_url(camera)
+    if not main_url or not dets or is_gated(meta):
+        return raw, dets, meta
+    if CAPTURE_POOL_ENABLED and SUBSTREAM_EVIDENCE_MODE != "oneshot":
+        main = get_pool().get_frame(camera, main=True)
+    else:
+        main = _grab_once(main_url)
+    if main is None:
+        _EVIDENCE.labels("substream").inc()
+        return raw, dets, meta
+    _EVIDENCE.labels("main").inc()
+
+    h, w = raw.shape[:2]
+    mh, mw = main.shape[:2]
+    sx, sy = mw / float(w), mh / float(h)  # per axis: substreams are not always the same aspect
+    scaled = Detections.coerce(dets).scaled(sx, sy)
+    meta = dict(meta, detections=scaled, image={"width": int(mw), "height": int(mh)},
+                detect_image=meta.get("image"))
+    return main, scaled, meta
+
+
+def save_frames(camera: Dict, raw: np.ndarray, dets: Detections,
+                write_raw: bool = True) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Stage 3: encode RAW (unless write_raw=False, e.g. gated frames) and
+    (if any detections) ANNOTATED jpgs, once each. The bytes go to the frame
+    output cache for sync and into the day's frame store segment in the background.
+    With FRAME_ANNOTATED_ONLY the raw jpg is dropped when there is an annotated one.
+    Returns (raw_ref, annotated_ref) - "blob:<day>/<sha1>" refs.
+    """
+    t0 = time.perf_counter()
+    cam_id = camera["id"]
+
+    # Segment per day
+    day = datetime.utcnow().strftime("%Y-%m-%d")
+
+    out = get_output()
+    img, scale = _fit_width(raw)
+
     # Annotated only if there are detections
-    annotated_path = None
+    annotated_ref = None
     if dets:
-        ann = _draw_anno(raw, dets)
-        annotated_path = _save_jpg(day_dir, cam_id, "annotated", ann)
+        data = encode_jpg(_draw_anno(img, dets, scale))
+        annotated_ref = out.put(blob_ref(day, data), data)
+
+    raw_ref = None
+    if write_raw and not (FRAME_ANNOTATED_ONLY and annotated_ref):
+        # near-duplicate raw frames of a camera share one blob (annotated
+        # frames are never folded: their boxes are the evidence)
+        h = dhash(img) if FRAME_PHASH_FOLD else None
+        folded = out.store.fold(cam_id, "raw", day, h) if h is not None else None
+        if folded:
+            raw_ref = out.put(folded, None)
+        else:
+            data = encode_jpg(img)
+            raw_ref = out.put(blob_ref(day, data), data)
+            if h is not None:
+                out.store.remember(cam_id, "raw", h, raw_ref)
 
-    meta = _to_meta(cam_id, w, h, dets, inf_ms if inf_ms >
-                    0 else (time.time() - t0) * 1000.0, targets)
+    _SAVE_SECONDS.observe(time.perf_counter() - t0)
+    return raw_ref, annotated_ref
+
+# ------------------ main entry ------------------
 
+
+def detect_one(camera: Dict) -> Tuple[int, Optional[str], Optional[str], Dict]:
+    """
+    Returns (count, raw_ref, annotated_ref, meta).
+    'count' = number of detections (after filtering to targets).
+    """
+    raw = grab_frame(camera)
+    dets, meta = infer_frame(camera, raw)
+    raw, dets, meta = evidence_frame(camera, raw, dets, meta)
+    raw_path, annotated_path = save_frames(camera, raw, dets, write_raw=not is_gated(meta))
     return len(dets), raw_path, annotated_path, meta
@@ -0,0 +1,170 @@
+"""
+Detections of one frame as a structured NumPy array.
+
+detect._extract_dets() builds a Detections straight from the model's box
+tensors (class filter = a class-id lookup table). Meta building, rescaling, drawing, the db
+insert and the rollup counts all work on the columns; per-box dicts are made
+only where something is serialised (iteration, to_dicts()).
+
+Iterating yields the same dicts the code used to pass around
+({"class_id", "class_name", "confidence", "bbox_xyxy", "track_id"}), so readers
+of meta["detections"] that expect a list of dicts keep working.
+Detections.coerce() accepts either form.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DTYPE = np.dtype([
+    ("class_id", np.int32),
+    ("confidence", np.float64),
+    ("x1", np.float64), ("y1", np.float64), ("x2", np.float64), ("y2", np.float64),
+    ("track_id", np.int64),
+])
+NO_TRACK = -1
+_XYXY = ["x1", "y1", "x2", "y2"]
+
+
+class Detections:
+    __slots__ = ("data", "names")
+
+    def __init__(self, data: Optional[np.ndarray] = None, names: Optional[Dict[int, str]] = None) -> None:
+        self.data = data if data is not None else np.zeros(0, dtype=DTYPE)
+        self.names = names if names is not None else {}
+
+    # ------------------ construction ------------------
+
+    @classmethod
+    def from_arrays(cls, xyxy: np.ndarray, conf: np.ndarray, class_ids: np.ndarray,
+                    track_ids: Optional[np.ndarray] = None, names: Optional[Dict[int, str]] = None,
+                    allowed: Optional[Iterable[int]] = None) -> "Detections":
+        data = np.empty(len(conf), dtype=DTYPE)
+        data["class_id"] = class_ids
+        data["confidence"] = conf
+        for i, col in enumerate(_XYXY):
+            data[col] = xyxy[:, i]
+        data["track_id"] = track_ids if track_ids is not None else NO_TRACK
+        out = cls(data, names)
+        return out.only(allowed) if allowed is not None else out
+
+    @classmethod
+    def from_dicts(cls, dets: Iterable[Dict[str, Any]]) -> "Detections":
+        dets = list(dets)
+        data = np.empty(len(dets), dtype=DTYPE)
+        names: Dict[int, str] = {}
+        for i, d in enumerate(dets):
+            x1, y1, x2, y2 = d["bbox_xyxy"]
+            tid = d.get("track_id")
+            data[i] = (int(d["class_id"]), float(d["confidence"]), x1, y1, x2, y2,
+                       NO_TRACK if tid is None else int(tid))
+            names.setdefault(int(d["class_id"]), d.get("class_name"))
+        return cls(data, names)
+
+    @classmethod
+    def coerce(cls, dets: Any) -> "Detections":
+        """Detections as is; a list of detection dicts (or None) converted."""
+        return dets if isinstance(dets, Detections) else cls.from_dicts(dets or [])
+
+    # ------------------ vectorised views ------------------
+
+    def only(self, class_ids: Iterable[int]) -> "Detections":
+        """Boxes whose class is in class_ids (np.isin as a lookup table indexed by class id)."""
+        ids = self.data["class_id"]
+        keep = np.fromiter(class_ids, dtype=np.int64)
+        if not len(ids) or not len(keep):
+            return Detections(self.data[:0], self.names)
+        lut = np.zeros(max(int(ids.max()), int(keep.max())) + 1, dtype=bool)
+        lut[keep] = True
+        return Detections(self.data[lut[ids]], self.names)
+
+    def scaled(self, sx: float, sy: float) -> "Detections":
+        data = self.data.copy()
+        data["x1"] *= sx
+        data["x2"] *= sx
+        data["y1"] *= sy
+        data["y2"] *= sy
+        return Detections(data, self.names)
+
+    def xyxy(self) -> np.ndarray:
+        return np.stack([self.data[c] for c in _XYXY], axis=1) if len(self.data) else np.zeros((0, 4))
+
+    def _name(self, class_id: int) -> str:
+        return self.names.get(class_id, str(class_id))
+
+    def class_names(self) -> List[str]:
+        names = self.names
+        return [names.get(c, str(c)) for c in self.data["class_id"].tolist()]
+
+    def _per_class(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(class ids present, boxes per class) via np.bincount."""
+        ids = self.data["class_id"]
+        if not len(ids):
+            return ids, np.zeros(0, dtype=np.int64)
+        n = np.bincount(ids)
+        present = np.flatnonzero(n)
+        return present, n[present]
+
+    def class_map(self) -> Dict[str, str]:
+        """{str(class_id): class_name} of the classes present."""
+        return {str(c): self._name(c) for c in self._per_class()[0].tolist()}
+
+    def counts(self) -> Dict[str, int]:
+        present, n = self._per_class()
+        return {self._name(c): k for c, k in zip(present.tolist(), n.tolist())}
+
+    def per_class(self) -> Dict[str, Tuple[int, float]]:
+        """{class name: (boxes, summed confidence)} - the rollups' counts and average numerators."""
+        present, n = self._per_class()
+        if not len(present):
+            return {}
+        sums = np.bincount(self.data["class_id"], weights=self.data["confidence"])[present]
+        return {self._name(c): (k, s) for c, k, s in zip(present.tolist(), n.tolist(), sums.tolist())}
+
+    def count_of(self, name: str) -> int:
+        ids = self.data["class_id"]
+        return sum(int(np.count_nonzero(ids == c)) for c, n in self.names.items() if n == name)
+
+    def conf_avg(self) -> float:
+        return float(self.data["confidence"].mean()) if len(self.data) else 0.0
+
+    def track_ids(self) -> frozenset:
+        t = self.data["track_id"]
+        return frozenset(t[t != NO_TRACK].tolist())
+
+    # ------------------ serialisation ------------------
+
+    def rows(self) -> List[Tuple[int, float, float, float, float, float, Optional[int]]]:
+        """(class_id, confidence, x1, y1, x2, y2, track_id or None) per box, for the db."""
+        d = self.data
+        tids = [None if t == NO_TRACK else t for t in d["track_id"].tolist()]
+        return list(zip(d["class_id"].tolist(), d["confidence"].tolist(), d["x1"].tolist(),
+                        d["y1"].tolist(), d["x2"].tolist(), d["y2"].tolist(), tids))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        names = self.class_names()
+        return [{"class_id": cid, "class_name": name, "confidence": conf,
+                 "bbox_xyxy": [x1, y1, x2, y2], "track_id": tid}
+                for (cid, conf, x1, y1, x2, y2, tid), name in zip(self.rows(), names)]
+
+    # ------------------ sequence protocol ------------------
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __bool__(self) -> bool:
+        return len(self.data) > 0
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.to_dicts())
+
+    def __getitem__(self, idx):
+        if isinstance(idx, (int, np.integer)):
+            return Detections(self.data[idx:idx + 1 or None], self.names).to_dicts()[0]
+        return Detections(self.data[idx], self.names)
+
+    def __deepcopy__(self, memo) -> "Detections":
+        return Detections(self.data.copy(), dict(self.names))
+
+    def __repr__(self) -> str:
+        return f"Detections({len(self.data)} boxes: {self.counts()})"
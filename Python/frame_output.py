@@ -0,0 +1,194 @@
+"""
+Frame output stage: encode once, upload from memory, persist in the background.
+
+- encode_jpg() runs cv2.imencode once per frame (FRAME_JPEG_QUALITY).
+- FrameOutput.put(ref, data) keeps the bytes in an in-memory cache and queues
+  the append to the frame store (frame_store.py) on one writer thread, so
+  appends and refcount changes apply in submit order.
+- sync reads frames with read(); bytes come from the cache when present and
+  from the store (or a legacy jpg path) otherwise. Entries whose write is
+  still pending are never evicted.
+- release(refs) after a successful sync; delete(ref) drops a reference
+  (queued behind any pending write of the same ref).
+"""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+import cv2
+import numpy as np
+
+from config import FRAME_JPEG_QUALITY, FRAME_CACHE_MB
+from frame_store import FrameStore, get_store, is_blob
+from log import get_logger
+from metrics import counter, histogram
+
+_WRITE_SECONDS = histogram("edge_frame_write_seconds", "Frame store append / incref per jpg (writer thread)")
+_WRITE_BYTES = counter("edge_frame_bytes_written_total", "New jpg bytes appended to frame segments")
+
+_log = get_logger("frames")
+
+
+def encode_jpg(img: np.ndarray, quality: Optional[int] = None) -> bytes:
+    q = FRAME_JPEG_QUALITY if quality is None else quality
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, int(q)])
+    if not ok:
+        raise RuntimeError("JPEG encode failed")
+    return buf.tobytes()
+
+
+class FrameOutput:
+    def __init__(self, store: Optional[FrameStore] = None,
+                 cache_bytes: int = FRAME_CACHE_MB * 1024 * 1024) -> None:
+        self.store = store or get_store()
+        # a single writer: segment appends are sequential anyway, and an unref
+        # must never overtake the put it belongs to
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-write")
+        self._cache_bytes = cache_bytes
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._cached = 0
+        self._pending: Counter = Counter()    # ref -> queued puts
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = {
+            "frames": 0, "bytes_written": 0, "deduped": 0, "write_errors": 0, "write_ms": 0.0,
+        }
+
+    # ---------- write path ----------
+    def put(self, ref: str, data: Optional[bytes]) -> str:
+        """Queue one reference to `ref`; data=None for a folded near-duplicate."""
+        with self._lock:
+            self._pending[ref] += 1  # before _store() so it can't be evicted
+            if data is not None:
+                self._store(ref, data)
+        self._pool.submit(self._write, ref, data)
+        return ref
+
+    def _store(self, ref: str, data: bytes) -> None:
+        old = self._cache.pop(ref, None)
+        if old is not None:
+            self._cached -= len(old)
+        self._cache[ref] = data
+        self._cached += len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        if self._cached <= self._cache_bytes:
+            return
+        for key in list(self._cache):
+            if self._cached <= self._cache_bytes:
+                break
+            if self._pending[key] > 0:
+                continue
+            self._cached -= len(self._cache.pop(key))
+
+    def _write(self, ref: str, data: Optional[bytes]) -> None:
+        t0 = time.perf_counter()
+        try:
+            before = self.store.size(ref) if data is not None else 0
+            self.store.put(ref, data)
+            with self._lock:
+                self._counters["frames"] += 1
+                if data is None or before:
+                    self._counters["deduped"] += 1
+                else:
+                    self._counters["bytes_written"] += len(data)
+                    _WRITE_BYTES.inc(len(data))
+                self._counters["write_ms"] += (time.perf_counter() - t0) * 1000.0
+            _WRITE_SECONDS.observe(time.perf_counter() - t0)
+        except Exception as e:
+            with self._lock:
+                self._counters["write_errors"] += 1
+            _log.err(f"[FRAMES] write failed {ref}: {e}")
+        finally:
+            with self._lock:
+                self._pending[ref] -= 1
+                if self._pending[ref] <= 0:
+                    del self._pending[ref]
+                self._evict()
+
+    # ---------- read path (sync) ----------
+    def read(self, ref: Optional[str]) -> Optional[bytes]:
+        if not ref:
+            return None
+        with self._lock:
+            data = self._cache.get(ref)
+        if data is not None:
+            return data
+        if is_blob(ref):
+            return self.store.read(ref)
+        try:  # legacy per-file frame
+            with open(ref, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def size(self, ref: Optional[str]) -> int:
+        if not ref:
+            return 0
+        with self._lock:
+            data = self._cache.get(ref)
+        if data is not None:
+            return len(data)
+        if is_blob(ref):
+            return self.store.size(ref)
+        try:
+            return os.path.getsize(ref)
+        except OSError:
+            return 0
+
+    def release(self, refs: Iterable[Optional[str]]) -> None:
+        """Drop synced frames from memory (the stored copy stays)."""
+        with self._lock:
+            for ref in refs:
+                if ref and self._pending[ref] <= 0 and ref in self._cache:
+                    self._cached -= len(self._cache.pop(ref))
+
+    def delete(self, ref: Optional[str]) -> None:
+        """Drop one reference (blob) or remove the file (legacy path)."""
+        if not ref:
+            return
+        if is_blob(ref):
+            self._pool.submit(self.store.unref, ref)
+            return
+        try:
+            if os.path.isfile(ref):
+                os.remove(ref)
+        except Exception:
+            pass
+
+    # ---------- lifecycle ----------
+    def close(self) -> None:
+        """Finish pending writes (call on shutdown)."""
+        self._pool.shutdown(wait=True)
+        self.store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self._counters)
+            n = c["frames"] or 1
+            return {
+                "frames_written": int(c["frames"]),
+                "bytes_written": int(c["bytes_written"]),
+                "deduped": int(c["deduped"]),
+                "write_errors": int(c["write_errors"]),
+                "write_ms_avg": round(c["write_ms"] / n, 2),
+                "pending": sum(self._pending.values()),
+                "cache_mb": round(self._cached / (1024 * 1024), 1),
+            }
+
+
+# ------------------ shared output (lazy) ------------------
+_OUTPUT: FrameOutput | None = None
+_OUTPUT_LOCK = threading.Lock()
+
+
+def get_output() -> FrameOutput:
+    global _OUTPUT
+    with _OUTPUT_LOCK:
+        if _OUTPUT is None:
+            _OUTPUT = FrameOutput()
+        return _OUTPUT
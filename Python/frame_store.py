@@ -0,0 +1,191 @@
+"""
+Content-addressed frame store.
+
+One jpg per capture meant thousands of small files a day (inodes on small
+flash) and a per-row os.remove on cleanup. Here every jpg is a blob:
+
+- ref  = "<day>/<sha1 of the bytes>"; rows store "blob:<ref>" in their frame
+  columns. Identical bytes on the same day are stored once (refcount + 1).
+- blobs are appended to per-day segments FRAME_ROOT/<day>/seg-NNNN.pack,
+  rolled at FRAME_SEGMENT_MB; the index (segment, offset, length, refcount)
+  lives in the frame_blobs table (db.py).
+- FRAME_PHASH_FOLD: a frame whose 64-bit dHash is within FRAME_PHASH_MAX_DIST
+  bits of the camera's previous frame (same kind, same day) reuses its blob.
+- drop_dead_segments() deletes segments with no referenced blobs, so
+  retention removes whole files instead of unlinking each frame.
+
+Appends and refcount changes must come from one thread (frame_output's writer).
+"""
+
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import FRAME_ROOT, FRAME_SEGMENT_MB, FRAME_PHASH_MAX_DIST
+from db import (
+    BLOB_REF_PREFIX, blob_lookup, blob_insert, blob_incref, blob_unref_many,
+    blob_dead_segments, blob_drop_segment
+)
+from log import get_logger
+
+_log = get_logger("frames")
+
+
+def is_blob(ref: Optional[str]) -> bool:
+    return bool(ref) and ref.startswith(BLOB_REF_PREFIX)
+
+
+def blob_ref(day: str, data: bytes) -> str:
+    return f"{BLOB_REF_PREFIX}{day}/{hashlib.sha1(data).hexdigest()}"
+
+
+def dhash(img: np.ndarray) -> int:
+    """64-bit difference hash of a BGR or grey image."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class FrameStore:
+    def __init__(self, root: str = FRAME_ROOT,
+                 segment_bytes: int = FRAME_SEGMENT_MB * 1024 * 1024) -> None:
+        self.root = root
+        self.segment_bytes = segment_bytes
+        self._lock = threading.Lock()
+        self._active: Dict[str, Tuple[str, Any]] = {}   # day -> (segment rel path, file)
+        self._last_hash: Dict[Tuple[str, str], Tuple[int, str]] = {}  # (cam, kind) -> (dhash, ref)
+
+    # ---------- segments ----------
+    def _open_segment(self, day: str) -> Tuple[str, Any]:
+        day_dir = os.path.join(self.root, day)
+        os.makedirs(day_dir, exist_ok=True)
+        # never append to a segment from an earlier run (its tail may be torn)
+        n = 0
+        for name in os.listdir(day_dir):
+            if name.startswith("seg-") and name.endswith(".pack"):
+                try:
+                    n = max(n, int(name[4:-5]) + 1)
+                except ValueError:
+                    pass
+        rel = os.path.join(day, f"seg-{n:04d}.pack")
+        return rel, open(os.path.join(self.root, rel), "ab")
+
+    def _segment_for(self, day: str, size: int) -> Tuple[str, Any]:
+        seg = self._active.get(day)
+        if seg is not None and seg[1].tell() + size > self.segment_bytes and seg[1].tell() > 0:
+            seg[1].close()
+            seg = None
+        if seg is None:
+            for old_day in [d for d in self._active if d != day]:  # day rolled over
+                self._active.pop(old_day)[1].close()
+            seg = self._active[day] = self._open_segment(day)
+        return seg
+
+    # ---------- writer side ----------
+    def put(self, ref: str, data: Optional[bytes]) -> None:
+        """Add one reference to `ref`, appending `data` if the blob is new."""
+        key = ref[len(BLOB_REF_PREFIX):]
+        with self._lock:
+            if blob_incref(key):
+                return
+            if data is None:
+                _log.warn(f"[FRAMES] folded ref {ref} is gone; frame not stored")
+                return
+            day = key.split("/", 1)[0]
+            rel, f = self._segment_for(day, len(data))
+            offset = f.tell()
+            f.write(data)
+            f.flush()  # readers open the segment separately
+            blob_insert(key, rel, offset, len(data))
+
+    def unref(self, ref: str) -> None:
+        if is_blob(ref):
+            blob_unref_many([ref[len(BLOB_REF_PREFIX):]])
+
+    # ---------- near-duplicate folding ----------
+    def fold(self, cam_id: str, kind: str, day: str, h: int) -> Optional[str]:
+        """Ref of the camera's previous frame if its dHash is close enough, else None."""
+        with self._lock:  # store workers and retention share _last_hash
+            prev = self._last_hash.get((cam_id, kind))
+        if prev is None:
+            return None
+        prev_h, prev_ref = prev
+        if not prev_ref.startswith(f"{BLOB_REF_PREFIX}{day}/"):
+            return None  # never fold across days: retention works per segment
+        return prev_ref if bin(prev_h ^ h).count("1") <= FRAME_PHASH_MAX_DIST else None
+
+    def remember(self, cam_id: str, kind: str, h: int, ref: str) -> None:
+        with self._lock:
+            self._last_hash[(cam_id, kind)] = (h, ref)
+
+    # ---------- read side ----------
+    def read(self, ref: str) -> Optional[bytes]:
+        loc = blob_lookup(ref[len(BLOB_REF_PREFIX):])
+        if loc is None:
+            return None
+        rel, offset, length = loc
+        try:
+            with open(os.path.join(self.root, rel), "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+            return data if len(data) == length else None
+        except OSError:
+            return None
+
+    def size(self, ref: str) -> int:
+        loc = blob_lookup(ref[len(BLOB_REF_PREFIX):])
+        return int(loc[2]) if loc else 0
+
+    # ---------- retention ----------
+    def drop_dead_segments(self) -> int:
+        """Delete every segment with no referenced blobs; returns bytes freed."""
+        freed = 0
+        with self._lock:
+            active = {rel for rel, _ in self._active.values()}
+            for rel in blob_dead_segments():
+                if rel in active:
+                    continue
+                path = os.path.join(self.root, rel)
+                try:
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+                except OSError:
+                    pass
+                blob_drop_segment(rel)
+                day_dir = os.path.dirname(path)
+                try:
+                    if not os.listdir(day_dir):
+                        os.rmdir(day_dir)
+                except OSError:
+                    pass
+            # pruned in place under the lock, like fold()/remember() read and write it
+            for k in [k for k, (_, ref) in self._last_hash.items()
+                      if blob_lookup(ref[len(BLOB_REF_PREFIX):]) is None]:
+                del self._last_hash[k]
+        if freed:
+            _log.info(f"[FRAMES] dropped dead segments, freed {freed / (1024 * 1024):.1f} MB")
+        return freed
+
+    def close(self) -> None:
+        with self._lock:
+            for _, f in self._active.values():
+                f.close()
+            self._active.clear()
+
+
+# ------------------ shared store (lazy) ------------------
+_STORE: FrameStore | None = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> FrameStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = FrameStore()
+        return _STORE
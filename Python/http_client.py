@@ -0,0 +1,152 @@
+"""
+Shared HTTP client for the edge agent.
+
+- One requests.Session with a pooled, keep-alive adapter, so the sync path and
+  the camera/target refreshes reuse TCP+TLS connections instead of
+  handshaking on every call.
+- post_multipart() / post_json() can gzip the whole body (HTTP_GZIP_REQUESTS); the API
+  decompresses it with UseRequestDecompression().
+- Retry/backoff state is tracked per endpoint name (see get_backoff()).
+"""
+
+import gzip
+import json
+import random
+import threading
+import time
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    REQUESTS_VERIFY_TLS, HTTP_POOL_SIZE, HTTP_GZIP_REQUESTS,
+    BACKOFF_START, BACKOFF_MAX, BACKOFF_JITTER, CIRCUIT_OPEN_AFTER
+)
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.verify = REQUESTS_VERIFY_TLS
+            _session = s
+        return _session
+
+
+def get(url: str, timeout: float = 30, **kwargs) -> requests.Response:
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def post_multipart(url: str, files: Any, timeout: float = 30) -> requests.Response:
+    """POST multipart/form-data, gzip-compressing the body when enabled."""
+    session = get_session()
+    if not HTTP_GZIP_REQUESTS:
+        return session.post(url, files=files, timeout=timeout)
+
+    prepared = session.prepare_request(requests.Request("POST", url, files=files))
+    body = prepared.body if isinstance(prepared.body, bytes) else prepared.body.encode()
+    prepared.body = gzip.compress(body, compresslevel=5)
+    prepared.headers["Content-Encoding"] = "gzip"
+    prepared.headers["Content-Length"] = str(len(prepared.body))
+    return session.send(prepared, timeout=timeout)
+
+
+def post_json(url: str, payload: Any, timeout: float = 30) -> requests.Response:
+    """POST a compact JSON body, gzip-compressed when enabled."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if HTTP_GZIP_REQUESTS:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return get_session().post(url, data=body, headers=headers, timeout=timeout)
+
+
+# ------------------ per-endpoint backoff ------------------
+
+class Backoff:
+    """
+    Deadline-based retry state for one endpoint.
+
+    - failure(): capped exponential delay with jitter; sets next_attempt_at
+    - ready():   True once the deadline has passed (never sleeps)
+    - circuit:   closed -> open after CIRCUIT_OPEN_AFTER consecutive failures;
+                 open -> half_open when the deadline passes (one trial);
+                 success closes it, a failed trial re-opens it.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.failures = 0
+        self.current = BACKOFF_START      # delay used for the last failure
+        self.next_attempt_at = 0.0
+        self.state = "closed"
+        self.last_error: str | None = None
+        self._lock = threading.Lock()
+
+    def ready(self, now: float | None = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            if now < self.next_attempt_at:
+                return False
+            if self.state == "open":
+                self.state = "half_open"
+            return True
+
+    def success(self) -> bool:
+        """Returns True if this closed a failing endpoint."""
+        with self._lock:
+            changed = self.failures > 0
+            self.failures = 0
+            self.current = BACKOFF_START
+            self.next_attempt_at = 0.0
+            self.state = "closed"
+            self.last_error = None
+            return changed
+
+    def failure(self, error: str | None = None) -> float:
+        """Record a failure; returns seconds until the next attempt is allowed."""
+        with self._lock:
+            self.failures += 1
+            base = min(BACKOFF_START * (2 ** (self.failures - 1)), BACKOFF_MAX)
+            delay = min(base * random.uniform(1.0 - BACKOFF_JITTER, 1.0 + BACKOFF_JITTER), BACKOFF_MAX)
+            self.current = round(delay, 1)
+            self.next_attempt_at = time.time() + delay
+            self.last_error = error
+            if self.state == "half_open" or self.failures >= CIRCUIT_OPEN_AFTER:
+                self.state = "open"
+            return delay
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "backoff_sec": self.current if self.failures else 0,
+                "retry_in_sec": round(max(0.0, self.next_attempt_at - time.time()), 1),
+                "last_error": self.last_error,
+            }
+
+
+_backoffs: Dict[str, Backoff] = {}
+_backoffs_lock = threading.Lock()
+
+
+def get_backoff(name: str) -> Backoff:
+    with _backoffs_lock:
+        b = _backoffs.get(name)
+        if b is None:
+            b = _backoffs[name] = Backoff(name)
+        return b
+
+
+def backoff_states() -> Dict[str, Dict[str, Any]]:
+    with _backoffs_lock:
+        return {name: b.snapshot() for name, b in _backoffs.items()}
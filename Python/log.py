@@ -0,0 +1,199 @@
+"""
+Logging for the edge agent: stdlib logging behind a queue.
+
+- get_logger(name) -> EdgeLogger with ok/info/warn/err/debug(msg, category=None, **fields).
+  Fields such as camera_id / row_id become keys of the JSON record.
+- setup_logging() (main.py) puts a QueueHandler on the "edge" logger and
+  starts a QueueListener, so callers only enqueue; one background thread
+  formats and writes.
+- Per-category limits run in the caller before anything is queued:
+  LOG_SAMPLE_EVERY keeps 1 in N of a chatty category (the per-row success
+  lines), LOG_RATE_PER_SEC / LOG_RATE_BURST cap every category. Dropped lines
+  are counted and reported as "suppressed" on the next line that gets through.
+- LOG_FORMAT: "json" (one object per line), "text", or "auto" (text with
+  colour on a TTY, json otherwise).
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from config import (
+    LOG_LEVEL, LOG_FORMAT, LOG_RATE_PER_SEC, LOG_RATE_BURST, LOG_SAMPLE_EVERY
+)
+
+ROOT = "edge"
+OK = logging.INFO + 1  # success lines: INFO that renders green on a TTY
+logging.addLevelName(OK, "OK")
+
+_COLORS = {OK: "\033[32m", logging.INFO: "\033[36m", logging.WARNING: "\033[33m",
+           logging.ERROR: "\033[31m", logging.DEBUG: "\033[2m"}
+_RESET = "\033[0m"
+
+
+class EdgeLogger:
+    """Thin wrapper so call sites stay one-liners: _log.warn("[SYNC] ...", row_id=3)."""
+
+    __slots__ = ("_logger", "_name")
+
+    def __init__(self, name: str) -> None:
+        self._logger = logging.getLogger(f"{ROOT}.{name}")
+        self._name = name
+
+    def _emit(self, level: int, msg: str, category: Optional[str], fields: Dict[str, Any]) -> None:
+        if not self._logger.isEnabledFor(level):
+            return
+        cat = category or f"{self._name}.{logging.getLevelName(level).lower()}"
+        self._logger.log(level, msg, extra={"category": cat, "fields": fields})
+
+    def debug(self, msg: str, category: Optional[str] = None, **fields: Any) -> None:
+        self._emit(logging.DEBUG, msg, category, fields)
+
+    def ok(self, msg: str, category: Optional[str] = None, **fields: Any) -> None:
+        self._emit(OK, msg, category, fields)
+
+    def info(self, msg: str, category: Optional[str] = None, **fields: Any) -> None:
+        self._emit(logging.INFO, msg, category, fields)
+
+    def warn(self, msg: str, category: Optional[str] = None, **fields: Any) -> None:
+        self._emit(logging.WARNING, msg, category, fields)
+
+    def err(self, msg: str, category: Optional[str] = None, **fields: Any) -> None:
+        self._emit(logging.ERROR, msg, category, fields)
+
+
+def get_logger(name: str) -> EdgeLogger:
+    return EdgeLogger(name)
+
+
+# ------------------ per-category sampling / rate limit ------------------
+
+class _Bucket:
+    __slots__ = ("tokens", "at", "seen", "suppressed")
+
+    def __init__(self) -> None:
+        self.tokens = float(LOG_RATE_BURST)
+        self.at = time.monotonic()
+        self.seen = 0
+        self.suppressed = 0
+
+
+class CategoryLimiter(logging.Filter):
+    """Runs in the logging thread's caller; errors are never dropped."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.RLock()  # main.py logs from its signal handler
+        self._buckets: Dict[str, _Bucket] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        cat = getattr(record, "category", None) or record.name
+        with self._lock:
+            b = self._buckets.get(cat)
+            if b is None:
+                b = self._buckets[cat] = _Bucket()
+            b.seen += 1
+            every = int(LOG_SAMPLE_EVERY.get(cat, 1) or 1)
+            if every > 1 and (b.seen - 1) % every:
+                b.suppressed += 1
+                return False
+            if LOG_RATE_PER_SEC > 0:
+                now = time.monotonic()
+                b.tokens = min(float(LOG_RATE_BURST), b.tokens + (now - b.at) * LOG_RATE_PER_SEC)
+                b.at = now
+                if b.tokens < 1.0:
+                    b.suppressed += 1
+                    return False
+                b.tokens -= 1.0
+            if b.suppressed:
+                record.suppressed = b.suppressed
+                b.suppressed = 0
+        return True
+
+
+# ------------------ formatters ------------------
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    out = dict(getattr(record, "fields", None) or {})
+    if getattr(record, "suppressed", 0):
+        out["suppressed"] = record.suppressed
+    return out
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "category": getattr(record, "category", None),
+            "msg": record.getMessage(),
+        }
+        doc.update(_fields(record))
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self, color: bool) -> None:
+        super().__init__()
+        self.color = color
+
+    def format(self, record: logging.LogRecord) -> str:
+        ts = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+        line = f"{ts} {record.getMessage()}"
+        extra = _fields(record)
+        if extra:
+            line += "  " + " ".join(f"{k}={v}" for k, v in extra.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        if self.color:
+            return _COLORS.get(record.levelno, "") + line + _RESET
+        return line
+
+
+# ------------------ setup ------------------
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(stream=None) -> None:
+    """Idempotent. Route "edge.*" through a queue to one writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+    stream = stream or sys.stdout
+    tty = hasattr(stream, "isatty") and stream.isatty()
+    fmt = LOG_FORMAT if LOG_FORMAT in ("json", "text") else ("text" if tty else "json")
+
+    out = logging.StreamHandler(stream)
+    out.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter(color=tty))
+
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    qh = logging.handlers.QueueHandler(q)
+    qh.addFilter(CategoryLimiter())
+
+    root = logging.getLogger(ROOT)
+    root.setLevel(getattr(logging, str(LOG_LEVEL).upper(), logging.INFO))
+    root.handlers[:] = [qh]
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records (call last, after everything else has logged)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
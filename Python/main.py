@@ -2,36 +2,45 @@
 import json
 import signal
 import time
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-import requests
-from colorama import init as colorama_init, Fore, Style
-
 from config import (
-    CAMERAS_JSON_PATH, DETECT_EVERY_SEC, SYNC_EVERY_SEC,
-    CLEANUP_EVERY_SEC, RETENTION_DAYS,
+    CAMERAS_JSON_PATH, DETECT_EVERY_SEC, DETECT_SCHEDULE, DETECT_SCHEDULE_TZ,
+    CLEANUP_EVERY_SEC,
     REMOTE_CAMERAS_URL, REMOTE_CAMERAS_TTL_SEC, REMOTE_CAMERAS_REQUIRED,
-    REQUESTS_VERIFY_TLS
+    PIPELINE_STATS_EVERY_SEC, TRACKER_SAVE_EVERY_SEC,
+    METRICS_ENABLED, METRICS_ADDR, METRICS_PORT
 )
-from db import init_db, store_local, cleanup_old_synced
-from detect import detect_one
-from sync import sync_unsent_once
-
-colorama_init(autoreset=True)
-def ok(m): print(Fore.GREEN + m + Style.RESET_ALL)
-def info(m): print(Fore.CYAN + m + Style.RESET_ALL)
-def warn(m): print(Fore.YELLOW + m + Style.RESET_ALL)
-def err(m): print(Fore.RED + m + Style.RESET_ALL)
+from cadence import get_cadence
+from capture import get_pool
+from db import init_db, close_db, unsynced_backlog
+from frame_output import get_output
+from http_client import backoff_states, get as http_get
+from log import get_logger, setup_logging, shutdown_logging
+import metrics
+from motion import get_gate
+from pipeline import Pipeline
+from retention import RetentionWorker
+from scheduler import Scheduler, next_slot
+from tiling import parse_roi, parse_tiles
+from tracking import get_registry
+from sync import SyncWorker
+
+_log = get_logger("main")
 
 
 stop_flag = False
+_sched: Optional[Scheduler] = None
 
 
 def _handle(sig, frame):
     global stop_flag
     stop_flag = True
-    warn("\n[SYS] Stop signal received. Shutting down...")
+    if _sched is not None:
+        _sched.stop()  # wake the scheduler out of its sleep
+    _log.warn("[SYS] Stop signal received. Shutting down...")
 
 
 signal.signal(signal.SIGINT, _handle)
@@ -39,13 +48,14 @@ signal.signal(signal.SIGTERM, _handle)
 
 # ---------------- remote cameras cache ----------------
 _cameras: List[Dict[str, Any]] = []
+_cam_by_id: Dict[str, Dict[str, Any]] = {}
 _cam_expires_at: float = 0.0
 
 try:
     from zoneinfo import ZoneInfo  # Python 3.9+
-    TORONTO_TZ = ZoneInfo("America/Toronto")
+    SCHEDULE_TZ = ZoneInfo(DETECT_SCHEDULE_TZ)
 except Exception:
-    TORONTO_TZ = None  # Fallback if zoneinfo isn't available
+    SCHEDULE_TZ = None  # Fallback if zoneinfo isn't available
 
 
 def _uniq_ids(cams: List[Dict[str, Any]]) -> None:
@@ -54,12 +64,48 @@ def _uniq_ids(cams: List[Dict[str, Any]]) -> None:
         raise ValueError("Duplicate camera 'id' from remote/local cameras.")
 
 
+def _parse_hhmm(v: str) -> int:
+    hh, mm = str(v).strip().split(":")
+    return (int(hh) * 60 + int(mm)) % (24 * 60)
+
+
+def _parse_schedule(windows: Any) -> Optional[List[tuple]]:
+    """[{"start": "06:00", "end": "18:00", "every_sec": 300}, ...] -> [(start_min, end_min, every_sec)]"""
+    if not isinstance(windows, list):
+        return None
+    out = []
+    for w in windows:
+        try:
+            every = int(w.get("every_sec") or w.get("everySec"))
+            if every > 0:
+                out.append((_parse_hhmm(w["start"]), _parse_hhmm(w["end"]), every))
+        except Exception:
+            _log.warn(f"[SCHED] ignoring bad schedule window: {w}")
+    return out or None
+
+
+def _positive_int(v: Any) -> Optional[int]:
+    try:
+        v = int(v)
+        return v if v > 0 else None
+    except (TypeError, ValueError):
+        return None
+
+
 def _normalize_cam(c: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "key": str(c.get("key", "")).strip(),
         "id": str(c.get("id", "")).strip(),
         "location": c.get("location"),
-        "rtsp": c.get("rtsp")
+        "rtsp": c.get("rtsp"),
+        # optional low-res stream to detect on; "rtsp" is then only read for evidence
+        "rtsp_sub": c.get("rtsp_sub") or c.get("rtspSub") or None,
+        # optional per-camera cadence (overrides DETECT_SCHEDULE)
+        "every_sec": _positive_int(c.get("every_sec") or c.get("everySec")),
+        "schedule": _parse_schedule(c.get("schedule")),
+        # optional regions of interest / tiled inference (tiling.py)
+        "roi": parse_roi(c.get("roi")),
+        "tiles": parse_tiles(c.get("tiles")),
     }
 
 
@@ -67,14 +113,13 @@ def _fetch_remote_cameras() -> List[Dict[str, Any]]:
     if not REMOTE_CAMERAS_URL:
         return []
     try:
-        r = requests.get(REMOTE_CAMERAS_URL, timeout=30,
-                         verify=REQUESTS_VERIFY_TLS)
+        r = http_get(REMOTE_CAMERAS_URL, timeout=30)
         if r.status_code != 200:
-            warn(f"[REMOTE] GET /cameras -> {r.status_code}")
+            _log.warn(f"[REMOTE] GET /cameras -> {r.status_code}")
             return []
         data = r.json()
         if not isinstance(data["result"], list):
-            warn("[REMOTE] invalid payload (expected array)")
+            _log.warn("[REMOTE] invalid payload (expected array)")
             return []
         activeCameras = [x for x in data["result"] if x.get("isActive")]
         cams = [_normalize_cam(c)
@@ -83,7 +128,7 @@ def _fetch_remote_cameras() -> List[Dict[str, Any]]:
         _uniq_ids(cams)
         return cams
     except Exception as e:
-        warn(f"[REMOTE] cameras fetch error: {e}")
+        _log.warn(f"[REMOTE] cameras fetch error: {e}")
         return []
 
 
@@ -98,12 +143,12 @@ def _load_local_cameras() -> List[Dict[str, Any]]:
         _uniq_ids(cams)
         return cams
     except Exception as e:
-        warn(f"[LOCAL] cameras.json fallback failed: {e}")
+        _log.warn(f"[LOCAL] cameras.json fallback failed: {e}")
         return []
 
 
 def _refresh_cameras(force: bool = False) -> None:
-    global _cameras, _cam_expires_at
+    global _cameras, _cam_by_id, _cam_expires_at
     now = time.time()
     if not force and now < _cam_expires_at:
         return
@@ -117,100 +162,257 @@ def _refresh_cameras(force: bool = False) -> None:
     if not cams:
         if REMOTE_CAMERAS_REQUIRED:
             raise RuntimeError("No cameras available (remote required).")
-        warn("[CAMERAS] none available; using empty list")
+        _log.warn("[CAMERAS] none available; using empty list")
         _cameras = []
+        _cam_by_id = {}
         _cam_expires_at = now + REMOTE_CAMERAS_TTL_SEC
+        get_pool().sync(_cameras)
+        get_registry().sync(_cameras)
+        get_gate().sync(_cameras)
+        get_cadence().sync(_cameras)
         return
 
     _cameras = cams
+    _cam_by_id = {c["id"]: c for c in cams}
     _cam_expires_at = now + REMOTE_CAMERAS_TTL_SEC
-    info(f"[CAMERAS] {len(_cameras)} loaded from {src}")
+    get_pool().sync(_cameras)  # drop RTSP readers of cameras that went away
+    get_registry().sync(_cameras)  # ...and their trackers
+    get_gate().sync(_cameras)      # ...and their motion background
+    get_cadence().sync(_cameras)   # ...and their adaptive cadence
+    _log.info(f"[CAMERAS] {len(_cameras)} loaded from {src}")
 
 # ------------------------------------------------------
 
 
-def _toronto_now_from_ts(ts: float) -> datetime:
+_DEFAULT_SCHEDULE = _parse_schedule(DETECT_SCHEDULE) or []
+
+
+def _local_now_from_ts(ts: float) -> datetime:
     """
-    Convert a POSIX timestamp to Toronto local time (America/Toronto).
+    Convert a POSIX timestamp to local time in DETECT_SCHEDULE_TZ.
     Falls back to system local time if zoneinfo isn't available.
     """
-    if TORONTO_TZ is not None:
-        return datetime.fromtimestamp(ts, TORONTO_TZ)
-    # Fallback: assume system local time is already Toronto time
+    if SCHEDULE_TZ is not None:
+        return datetime.fromtimestamp(ts, SCHEDULE_TZ)
+    # Fallback: assume system local time is already the schedule's time zone
     return datetime.fromtimestamp(ts)
 
 
-def _detect_interval_seconds(now_ts: float) -> int:
+def _detect_interval_seconds(now_ts: float, cam: Optional[Dict[str, Any]] = None) -> int:
     """
-    Return capture interval (in seconds) based on Toronto local time:
-    - 06:00 <= time < 18:00 -> every 5 minutes
-    - otherwise             -> every 1 hour
+    Return capture interval (in seconds) for a camera at `now_ts`:
+    camera "every_sec" > camera "schedule" > DETECT_SCHEDULE > DETECT_EVERY_SEC.
     """
-    dt = _toronto_now_from_ts(now_ts)
-    hour = dt.hour
+    if cam and cam.get("every_sec"):
+        return cam["every_sec"]
+    windows = (cam or {}).get("schedule") or _DEFAULT_SCHEDULE
+    dt = _local_now_from_ts(now_ts)
+    minute = dt.hour * 60 + dt.minute
+    for start, end, every in windows:
+        inside = start <= minute < end if start <= end else (minute >= start or minute < end)
+        if inside:
+            return every
+    return DETECT_EVERY_SEC
+
+
+# ---------------- scheduled jobs ----------------
+# Each camera is its own job. Cameras are phase-staggered: with N cameras the
+# i-th (by id) fires at offset i/N of its interval, so grabs and uploads are
+# spread evenly instead of bursting on one global tick.
+_phases: Dict[str, float] = {}
+
+
+def _camera_next_due(cam_id: str, planned: float, now: float) -> float:
+    after = max(planned, now)
+    baseline = _detect_interval_seconds(after, _cam_by_id.get(cam_id))
+    # adaptive: faster while the camera is active, stretched to the inference budget
+    interval = get_cadence().interval(cam_id, baseline)
+    return next_slot(after, interval, _phases.get(cam_id, 0.0) * interval)
+
+
+def _camera_went_active(sched: Scheduler, cam_id: str) -> None:
+    """Pull the camera's next tick in instead of waiting out its baseline interval."""
+    now = time.time()
+    sched.expedite(f"detect:{cam_id}", _camera_next_due(cam_id, now, now))
 
-    if 6 <= hour < 18:
-        # Daytime: every 5 minutes
-        return 5 * 60
-    else:
-        # Nighttime: every 1 hour
-        return 60 * 60
+
+def _detect_camera(pipe: Pipeline, cam_id: str) -> None:
+    cam = _cam_by_id.get(cam_id)
+    if cam is not None:
+        # non-blocking: grab/infer/store run on the pipeline workers
+        pipe.submit_tick([cam])
+
+
+def _schedule_cameras(sched: Scheduler, pipe: Pipeline) -> None:
+    """Reconcile one detect job per camera with the current camera list."""
+    ids = sorted(_cam_by_id)
+    _phases.clear()
+    _phases.update({cam_id: i / len(ids) for i, cam_id in enumerate(ids)})
+
+    wanted = {f"detect:{cam_id}" for cam_id in ids}
+    for name in sched.names("detect:"):
+        if name not in wanted:
+            sched.cancel(name)
+    existing = set(sched.names("detect:"))
+    for cam_id in ids:
+        name = f"detect:{cam_id}"
+        if name not in existing:
+            sched.add(name, partial(_detect_camera, pipe, cam_id),
+                      partial(_camera_next_due, cam_id))
+
+
+def _refresh_job(sched: Scheduler, pipe: Pipeline) -> None:
+    _refresh_cameras(force=True)
+    _schedule_cameras(sched, pipe)
+
+
+def _stats_job(pipe: Pipeline, syncer: SyncWorker, retention: RetentionWorker,
+               sched: Scheduler) -> None:
+    st = pipe.stats()
+    q = st["queue_depth"]
+    _log.info(
+        f"[PIPE] queues grab={q['grab']} infer={q['infer']} store={q['store']} "
+        f"in_flight={st['in_flight']} inferred={st['inferred']} gated={st['gated']} stored={st['stored']} "
+        f"skipped={st['skipped_in_flight']} last_tick={st['last_tick_sec']}"
+    )
+
+    # adaptive cadence: cameras per mode, planned load vs the inference budget
+    cs = get_cadence().stats()
+    if cs["cameras"]:
+        modes = " ".join(f"{m}={n}" for m, n in sorted(cs["modes"].items()))
+        _log.info(
+            f"[CADENCE] {modes} planned={cs['planned_infer_per_sec']}/s "
+            f"budget_factor={cs['budget_factor']} speedups={cs['speedups']}"
+        )
+
+    # motion gate hit rate per camera
+    gs = get_gate().stats()
+    if gs:
+        _log.info("[GATE] " + " ".join(
+            f"{k}={g['hits']}/{g['checks']}({g['hit_rate'] * 100:.0f}%)" for k, g in sorted(gs.items())))
+
+    fs = get_output().stats()
+    _log.info(
+        f"[FRAMES] written={fs['frames_written']} deduped={fs['deduped']} bytes={fs['bytes_written']} "
+        f"write_ms_avg={fs['write_ms_avg']} pending={fs['pending']} cache={fs['cache_mb']}MB"
+    )
+
+    rs = retention.stats()
+    _log.info(
+        f"[CLEANUP] passes={rs['passes']} rows_age={rs['rows_age']} rows_budget={rs['rows_budget']} "
+        f"files={rs['files_deleted']} freed={rs['segment_bytes_freed']} rollups={rs['rollups_deleted']} "
+        f"frame_root={rs['frame_root_bytes']} last_pass={rs['last_pass_sec']}s"
+    )
+
+    ss = syncer.stats()
+    eps = " ".join(
+        f"{name}={e['state']}/fail={e['failures']}/retry_in={e['retry_in_sec']}s"
+        for name, e in ss["endpoints"].items())
+    _log.info(
+        f"[SYNC] sent={ss['sent_total']} rollups={ss['rollups_sent']} upload_bytes={ss['upload_bytes']} "
+        f"meta_bytes={ss['meta_bytes']} meta_wire={ss['meta_wire']['format']} "
+        f"passes={ss['passes']} "
+        f"next_in={ss['next_pass_in_sec']}s {eps}"
+    )
+
+    # schedule lag (actual - planned fire time) per job; cameras summarised
+    jobs = sched.stats()
+    cams = {n: j for n, j in jobs.items() if n.startswith("detect:") and j["runs"]}
+    if cams:
+        worst = max(cams, key=lambda n: cams[n]["lag_max_ms"])
+        avg = sum(j["lag_avg_ms"] for j in cams.values()) / len(cams)
+        _log.info(
+            f"[SCHED] detect jobs={len(cams)} lag_avg={avg:.1f}ms "
+            f"worst={worst[7:]} lag_max={cams[worst]['lag_max_ms']}ms"
+        )
+    others = " ".join(
+        f"{n}={j['lag_last_ms']}/{j['lag_max_ms']}ms"
+        for n, j in jobs.items() if not n.startswith("detect:"))
+    _log.info(f"[SCHED] lag last/max {others}")
+
+
+def _register_metrics(pipe: Pipeline, sched: Scheduler) -> None:
+    """Values sampled when /metrics is scraped (the hot-path ones live in their modules)."""
+    def backlog():
+        n, oldest = unsynced_backlog()
+        return {"rows": n, "oldest_age_sec": round(time.time() - oldest, 1) if oldest else 0}
+
+    metrics.callback("edge_pipeline_queue_depth", "Items waiting per pipeline stage",
+                     lambda: pipe.stats()["queue_depth"], ["stage"])
+    metrics.callback("edge_pipeline_in_flight", "Cameras between grab and store",
+                     lambda: pipe.stats()["in_flight"])
+    metrics.callback("edge_unsynced", "Unsynced backlog: rows, and age of the oldest (sync lag)",
+                     backlog, ["what"])
+    metrics.callback("edge_sync_circuit_open", "1 while an upload endpoint's circuit is open / half-open",
+                     lambda: {n: int(e["state"] != "closed") for n, e in backoff_states().items()},
+                     ["endpoint"])
+    metrics.callback("edge_capture_reconnects_total", "RTSP reconnects per camera reader",
+                     lambda: {k: r["reconnects"] for k, r in get_pool().stats().items()},
+                     ["camera"], kind="counter")
+    metrics.callback("edge_capture_frame_age_seconds", "Age of each reader's newest frame",
+                     lambda: {k: r["frame_age_sec"] for k, r in get_pool().stats().items()
+                              if r["frame_age_sec"] is not None}, ["camera"])
+    metrics.callback("edge_cadence_planned_infer_per_sec", "Planned inferences/sec after the budget",
+                     lambda: get_cadence().stats()["planned_infer_per_sec"])
+    metrics.callback("edge_sched_lag_seconds", "Last schedule lag per job",
+                     lambda: {n: j["lag_last_ms"] / 1000.0 for n, j in sched.stats().items()}, ["job"])
 
 
 def main():
-    info("[SYS] Initializing DB...")
+    global _sched
+    setup_logging()
+    _log.info("[SYS] Initializing DB...")
     init_db()
 
     # First load (required before loop)
     _refresh_cameras(force=True)
 
-    info("[SYS] Running. Press Ctrl+C to stop.")
-    last_detect = 0.0
-    last_sync = 0.0
-    last_cleanup = 0.0
-    last_cam_refresh = 0.0
-
-    while not stop_flag:
-        now = time.time()
-
-        # refresh camera list by TTL
-        if now - last_cam_refresh >= 1.0:  # check TTL every second
-            _refresh_cameras()
-            last_cam_refresh = now
-
-        # detect cadence
-        detect_interval = _detect_interval_seconds(now)
-        if now - last_detect >= detect_interval:
-            if not _cameras:
-                warn("[DETECT] skipped: no cameras configured")
-            else:
-                for cam in _cameras:
-                    cam_id = cam["key"]
-                    count, raw_path, ann_path, meta = detect_one(cam)
-                    meta_json = json.dumps(meta, ensure_ascii=False)
-                    store_local(cam_id, count, meta_json, raw_path, ann_path)
-                    ok(
-                        f"[DETECT] camera={cam_id} count={count} saved "
-                        f"(raw={bool(raw_path)} ann={bool(ann_path)})"
-                    )
-            last_detect = now
-
-        # sync cadence (backoff is handled inside)
-        if now - last_sync >= SYNC_EVERY_SEC:
-            sync_unsent_once()
-            last_sync = now
-
-        # cleanup cadence
-        if now - last_cleanup >= CLEANUP_EVERY_SEC:
-            deleted = cleanup_old_synced(RETENTION_DAYS)
-            if deleted > 0:
-                warn(
-                    f"[CLEANUP] Deleted {deleted} old synced rows (> {RETENTION_DAYS} days)")
-            last_cleanup = now
-
-        time.sleep(0.2)
-
-    info("[SYS] Exiting.")
+    pipe = Pipeline()
+    pipe.start()
+
+    # uploads + retries run on their own thread; a dead API never delays detection
+    syncer = SyncWorker()
+    syncer.start()
+
+    # retention runs in short chunks on its own thread (files on another)
+    retention = RetentionWorker(every_sec=CLEANUP_EVERY_SEC)
+    retention.start()
+
+    now = time.time()
+    sched = Scheduler()
+    get_cadence().on_active = partial(_camera_went_active, sched)
+    _schedule_cameras(sched, pipe)
+    sched.every("refresh", partial(_refresh_job, sched, pipe),
+                REMOTE_CAMERAS_TTL_SEC, first_at=now + REMOTE_CAMERAS_TTL_SEC)
+    sched.every("stats", partial(_stats_job, pipe, syncer, retention, sched),
+                PIPELINE_STATS_EVERY_SEC, first_at=now + PIPELINE_STATS_EVERY_SEC)
+    sched.every("tracker_save", lambda: get_registry().save(),
+                TRACKER_SAVE_EVERY_SEC, first_at=now + TRACKER_SAVE_EVERY_SEC)
+    _sched = sched
+
+    if METRICS_ENABLED:
+        _register_metrics(pipe, sched)
+        try:
+            metrics.start_server(METRICS_ADDR, METRICS_PORT)
+            _log.info(f"[SYS] Metrics on http://{METRICS_ADDR}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            _log.warn(f"[SYS] metrics endpoint not started: {e}")
+
+    _log.info("[SYS] Running. Press Ctrl+C to stop.")
+    if not stop_flag:
+        sched.run()  # sleeps until the next due job; returns on stop()
+
+    _log.info("[SYS] Draining pipeline...")
+    metrics.stop_server()
+    pipe.stop()
+    syncer.stop()
+    retention.stop()
+    get_output().close()  # finish background frame writes
+    get_registry().save()
+    get_pool().close()
+    close_db()
+    _log.info("[SYS] Exiting.")
+    shutdown_logging()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,285 @@
+"""
+Compact wire format for event meta on the sync uplink.
+
+detect._to_meta() JSON repeats the model, targets, image size and class names
+on every event and carries bboxes as full-precision floats. The compact form
+("application/vnd.edge-meta.v1+<codec>", see content_types()) sends:
+
+  event   = {"t": epoch ms, "c": camera_id, "x": context id, "ms": inference ms,
+             "d": [[class_id, conf * 1000, x1, y1, x2, y2, track_id], ...],
+             "g": gate (if any), "o": {any other meta keys, verbatim}}
+  context = {"model": ..., "targets": [...], "image": {...}, "names": {class_id: name}}
+
+- bbox coordinates are rounded to META_BBOX_QUANT pixels, confidence to 1/1000
+- people.count / confidence_avg are not sent; expand() derives them from "d"
+- a context is content-addressed and sent inline only until the API has
+  accepted it once in this session (WireFormat.pending_contexts())
+- body: msgpack / cbor / json (first one installed and accepted by the API),
+  then gzip (or zstd, META_WIRE_COMPRESS); compression is a content-type
+  parameter ("; enc=gzip")
+
+Negotiation: the API answers 415 (listing what it takes in "Accept") or, if it
+predates this format, 400 to the first compact request; WireFormat then moves
+on to a (codec, enc) pair from the Accept list it can produce, and finally
+back to plain JSON.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import (
+    META_WIRE_FORMAT, META_WIRE_CODECS, META_WIRE_COMPRESS, META_BBOX_QUANT
+)
+
+try:  # optional codecs / compressors
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the box
+    msgpack = None
+try:
+    import cbor2
+except ImportError:  # pragma: no cover
+    cbor2 = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+MEDIA_TYPE = "application/vnd.edge-meta.v1"
+_CONTEXT_KEYS = ("model", "targets", "image")
+_DERIVED_KEYS = ("timestamp_utc", "camera_id", "image", "compute", "targets", "detections", "people", "gate")
+
+
+def available_codecs() -> List[str]:
+    return [c for c in META_WIRE_CODECS
+            if c == "json" or (c == "msgpack" and msgpack) or (c == "cbor" and cbor2)]
+
+
+def _compression() -> str:
+    if META_WIRE_COMPRESS == "zstd" and zstandard is None:
+        return "gzip"
+    return META_WIRE_COMPRESS if META_WIRE_COMPRESS in ("zstd", "gzip") else "none"
+
+
+def _can_compress(enc: str) -> bool:
+    return enc in ("none", "gzip") or (enc == "zstd" and zstandard is not None)
+
+
+def content_type(codec: str, enc: str) -> str:
+    return f"{MEDIA_TYPE}+{codec}" + (f"; enc={enc}" if enc != "none" else "")
+
+
+def content_types() -> List[str]:
+    """Compact content types this box can produce, most preferred first."""
+    enc = _compression()
+    return [content_type(c, enc) for c in available_codecs()]
+
+
+def _parse_ct(ct: str) -> Tuple[str, str]:
+    base, _, params = ct.partition(";")
+    enc = "none"
+    for p in params.split(";"):
+        k, _, v = p.strip().partition("=")
+        if k == "enc" and v:
+            enc = v
+    return base.strip().rsplit("+", 1)[-1], enc
+
+
+# ------------------ encode / decode ------------------
+
+def dumps(obj: Any, ct: str) -> bytes:
+    codec, enc = _parse_ct(ct)
+    if codec == "msgpack":
+        data = msgpack.packb(obj, use_bin_type=True)
+    elif codec == "cbor":
+        data = cbor2.dumps(obj)
+    else:
+        data = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if enc == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if enc == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def loads(data: bytes, ct: str) -> Any:
+    codec, enc = _parse_ct(ct)
+    if enc == "zstd":
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif enc == "gzip":
+        data = gzip.decompress(data)
+    if codec == "msgpack":
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+    if codec == "cbor":
+        return cbor2.loads(data)
+    return json.loads(data)
+
+
+def _q(v: float) -> Any:
+    q = round(float(v) / META_BBOX_QUANT) * META_BBOX_QUANT
+    return int(q) if float(q).is_integer() else round(q, 3)
+
+
+def _epoch_ms(ts: str) -> int:
+    dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(round(dt.timestamp() * 1000))
+
+
+def _context_id(ctx: Dict[str, Any]) -> str:
+    raw = json.dumps(ctx, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def compact(meta: Dict[str, Any], names: Dict[str, str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    meta -> (event, context). `names` is the camera's class dictionary so far
+    and is updated in place, so a context only changes when a new class shows up.
+    """
+    dets = list(meta.get("detections") or [])  # Detections -> dicts, once
+    for d in dets:
+        names.setdefault(str(d["class_id"]), d.get("class_name"))
+    ctx = {k: meta.get(k) for k in _CONTEXT_KEYS}
+    ctx["model"] = (meta.get("compute") or {}).get("model")
+    ctx["names"] = dict(sorted(names.items()))
+
+    ev: Dict[str, Any] = {
+        "t": _epoch_ms(meta["timestamp_utc"]),
+        "c": meta.get("camera_id"),
+        "x": _context_id(ctx),
+        "ms": round(float((meta.get("compute") or {}).get("inference_ms") or 0.0), 1),
+        "d": [[int(d["class_id"]), int(round(float(d["confidence"]) * 1000)),
+               *(_q(v) for v in d["bbox_xyxy"]), d.get("track_id")] for d in dets],
+    }
+    if meta.get("gate") is not None:
+        ev["g"] = meta["gate"]
+    other = {k: v for k, v in meta.items() if k not in _DERIVED_KEYS}
+    if other:
+        ev["o"] = other
+    return ev, ctx
+
+
+def expand(ev: Dict[str, Any], ctx: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact event + its context -> the detect._to_meta() dict (what the API rebuilds)."""
+    names = ctx.get("names") or {}
+    dets = [{
+        "class_id": cid,
+        "class_name": names.get(str(cid), str(cid)),
+        "confidence": conf / 1000.0,
+        "bbox_xyxy": [float(x1), float(y1), float(x2), float(y2)],
+        "track_id": tid,
+    } for cid, conf, x1, y1, x2, y2, tid in ev.get("d") or []]
+    conf_avg = round(sum(d["confidence"] for d in dets) / len(dets), 3) if dets else 0.0
+    ts = datetime.fromtimestamp(ev["t"] / 1000.0, tz=timezone.utc)
+    meta: Dict[str, Any] = {
+        "timestamp_utc": ts.strftime("%Y-%m-%dT%H:%M:%S.") + f"{ts.microsecond // 1000:03d}Z",
+        "camera_id": ev.get("c"),
+        "image": ctx.get("image"),
+        "compute": {"inference_ms": ev.get("ms", 0.0), "model": ctx.get("model")},
+        "targets": ctx.get("targets"),
+        "detections": dets,
+        "people": {"count": len([d for d in dets if d["class_name"] == "person"]),
+                   "confidence_avg": conf_avg},
+    }
+    if "g" in ev:
+        meta["gate"] = ev["g"]
+    meta.update(ev.get("o") or {})
+    return meta
+
+
+# ------------------ negotiation / session state ------------------
+
+class WireFormat:
+    """
+    Which meta encoding the API takes, and which contexts it already has.
+
+    - content_type(): compact type to try, or None for plain JSON
+    - rejected(accept): the API refused it (415 / 400 before any success)
+    - accepted(ids): a compact request went through; its contexts are known
+    - forget_contexts(): the API lost them (409, e.g. after a restart)
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._candidates = content_types() if META_WIRE_FORMAT == "compact" else []
+        self._confirmed = False
+        self._refused: set = set()                     # (codec, enc) pairs the API turned down
+        self._names: Dict[str, Dict[str, str]] = {}   # camera -> class dictionary
+        self._known: set = set()                       # context ids the API has
+        self.fallbacks = 0
+
+    def content_type(self) -> Optional[str]:
+        with self._lock:
+            return self._candidates[0] if self._candidates else None
+
+    @property
+    def confirmed(self) -> bool:
+        return self._confirmed
+
+    def rejected(self, accept: Optional[str] = None) -> Optional[str]:
+        """
+        Drop the current type; returns the next one to try (None = JSON).
+        With the API's Accept list the next candidates are exactly the offered
+        (codec, enc) pairs this box can produce, in our codec order: a codec
+        the API reads with another compression is retried with that one.
+        """
+        with self._lock:
+            if not self._candidates:
+                return None
+            self.fallbacks += 1
+            self._refused.add(_parse_ct(self._candidates[0]))
+            offered = [_parse_ct(a.strip().lower()) for a in (accept or "").split(",")
+                       if a.strip().lower().startswith(MEDIA_TYPE)]
+            if accept is not None and accept.strip():
+                codecs = available_codecs()
+                self._candidates = [content_type(c, e) for c in codecs for oc, e in offered
+                                    if oc == c and (c, e) not in self._refused and _can_compress(e)]
+            else:
+                self._candidates = self._candidates[1:]
+            return self._candidates[0] if self._candidates else None
+
+    def encode(self, metas: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """metas -> (events, contexts the API has not accepted yet)."""
+        events, ctxs = [], {}
+        with self._lock:
+            for meta in metas:
+                names = self._names.setdefault(str(meta.get("camera_id")), {})
+                ev, ctx = compact(meta, names)
+                events.append(ev)
+                if ev["x"] not in self._known:
+                    ctxs[ev["x"]] = ctx
+        return events, ctxs
+
+    def accepted(self, context_ids) -> None:
+        with self._lock:
+            self._confirmed = True
+            self._known.update(context_ids)
+
+    def forget_contexts(self) -> None:
+        with self._lock:
+            self._known.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "format": self._candidates[0] if self._candidates else "application/json",
+                "confirmed": self._confirmed,
+                "contexts": len(self._known),
+                "fallbacks": self.fallbacks,
+            }
+
+
+_wire: WireFormat | None = None
+_wire_lock = threading.Lock()
+
+
+def get_wire() -> WireFormat:
+    global _wire
+    with _wire_lock:
+        if _wire is None:
+            _wire = WireFormat()
+        return _wire
@@ -0,0 +1,243 @@
+"""
+Process metrics in the Prometheus text format, served on a local /metrics.
+
+- counter() / gauge() / histogram() register a metric family (idempotent, so
+  modules declare theirs at import time); .labels(*values) returns the child
+  with inc() / set() / observe(). Unlabelled families take those directly.
+- timed(child): perf_counter around a block, observed into a histogram.
+- callback(): a value sampled when /metrics is scraped (queue depths, the
+  unsynced backlog), so the hot path pays nothing for it.
+- start_server() / stop_server(): ThreadingHTTPServer on a daemon thread.
+
+An update is a dict lookup plus a short locked add, so this stays on in production.
+"""
+
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# seconds; covers a 1 ms db write up to a 30 s RTSP connect
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                                      0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _escape(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Child:
+    __slots__ = ("_family", "_key")
+
+    def __init__(self, family: "_Family", key: Tuple[str, ...]) -> None:
+        self._family = family
+        self._key = key
+
+    def inc(self, n: float = 1.0) -> None:
+        self._family._add(self._key, n)
+
+    def set(self, v: float) -> None:
+        self._family._set(self._key, v)
+
+    def observe(self, v: float) -> None:
+        self._family._observe(self._key, v)
+
+
+class _Family:
+    def __init__(self, kind: str, name: str, help_text: str,
+                 labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._children: Dict[Tuple[str, ...], _Child] = {}
+
+    def labels(self, *values: Any) -> _Child:
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children.setdefault(key, _Child(self, key))
+        return child
+
+    # unlabelled shortcuts
+    def inc(self, n: float = 1.0) -> None:
+        self._add((), n)
+
+    def set(self, v: float) -> None:
+        self._set((), v)
+
+    def observe(self, v: float) -> None:
+        self._observe((), v)
+
+    def _add(self, key, n) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + n
+
+    def _set(self, key, v) -> None:
+        with self._lock:
+            self._values[key] = float(v)
+
+    def _observe(self, key, v) -> None:
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            h[0][i] += 1
+            h[1] += v
+            h[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2]) if self.kind == "histogram" else v)
+                     for k, v in self._values.items()]
+        for key, v in sorted(items):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(v)}")
+                continue
+            counts, total, n = v
+            cum = 0
+            for le, c in zip(self.buckets + (math.inf,), counts):
+                cum += c
+                le_label = 'le="' + _fmt(le) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le_label)} {cum}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {n}")
+        return lines
+
+
+class _Callback:
+    """Sampled at scrape: fn() returns a number, or {label value(s): number}."""
+
+    def __init__(self, kind: str, name: str, help_text: str,
+                 fn: Callable[[], Any], labelnames: Sequence[str] = ()) -> None:
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        try:
+            v = self.fn()
+        except Exception as e:
+            return [f"# {self.name} unavailable: {_escape(e)}"]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if isinstance(v, dict):
+            for key, val in sorted(v.items(), key=lambda kv: str(kv[0])):
+                key = key if isinstance(key, tuple) else (key,)
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(val)}")
+        elif v is not None:
+            lines.append(f"{self.name} {_fmt(v)}")
+        return lines
+
+
+_registry: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(kind: str, name: str, help_text: str, labelnames: Sequence[str],
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> _Family:
+    with _registry_lock:
+        fam = _registry.get(name)
+        if fam is None:
+            fam = _registry[name] = _Family(kind, name, help_text, labelnames, buckets)
+        return fam
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()) -> _Family:
+    return _register("counter", name, help_text, labelnames)
+
+
+def gauge(name: str, help_text: str, labelnames: Sequence[str] = ()) -> _Family:
+    return _register("gauge", name, help_text, labelnames)
+
+
+def histogram(name: str, help_text: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> _Family:
+    return _register("histogram", name, help_text, labelnames, buckets)
+
+
+def callback(name: str, help_text: str, fn: Callable[[], Any],
+             labelnames: Sequence[str] = (), kind: str = "gauge") -> None:
+    """Register (or replace) a value computed at scrape time."""
+    with _registry_lock:
+        _registry[name] = _Callback(kind, name, help_text, fn, labelnames)
+
+
+@contextmanager
+def timed(child: Any) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        child.observe(time.perf_counter() - t0)
+
+
+def render() -> str:
+    with _registry_lock:
+        fams = list(_registry.values())
+    lines: List[str] = []
+    for fam in fams:
+        lines.extend(fam.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------ /metrics endpoint ------------------
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_server(addr: str, port: int) -> ThreadingHTTPServer:
+    global _server
+    if _server is None:
+        _server = ThreadingHTTPServer((addr, int(port)), _Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    return _server
+
+
+def stop_server() -> None:
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,148 @@
+"""
+Per-camera motion / scene-change gate.
+
+Static scenes (empty car parks at night) used to get a full YOLO pass and a
+raw jpg on every tick. Before inference each frame is shrunk to a blurred
+grayscale thumbnail and compared with that camera's background model (a
+running average). If fewer than MOTION_GATE_THRESHOLD of the pixels changed,
+the previous detections are reused and inference + the raw write are skipped.
+
+- MotionGate.check(key, frame) -> (gated, score); always updates the background
+- remember(key, dets, meta)     stores the last real result to reuse
+- gated_meta(key, ...)          meta for a gated frame (marked with "gate")
+- stats()                       per-camera checks / hits / hit rate
+"""
+
+import copy
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import (
+    MOTION_GATE_ENABLED, MOTION_GATE_WIDTH, MOTION_GATE_PIXEL_DIFF,
+    MOTION_GATE_THRESHOLD, MOTION_GATE_BG_ALPHA, MOTION_GATE_MAX_SKIP_SEC,
+    TRACKER_IDLE_EVICT_SEC
+)
+from detections import Detections
+
+
+def _thumb(frame: np.ndarray) -> np.ndarray:
+    h, w = frame.shape[:2]
+    tw = max(8, min(int(MOTION_GATE_WIDTH), w))
+    th = max(8, int(round(h * tw / float(w))))
+    small = cv2.resize(frame, (tw, th), interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+    return cv2.GaussianBlur(gray, (5, 5), 0)
+
+
+class _CamState:
+    __slots__ = ("bg", "last_dets", "last_meta", "last_real_at", "checks", "hits", "last_score")
+
+    def __init__(self) -> None:
+        self.bg: Optional[np.ndarray] = None        # float32 running average
+        self.last_dets: Optional[Detections] = None
+        self.last_meta: Optional[Dict] = None
+        self.last_real_at = 0.0
+        self.checks = 0
+        self.hits = 0
+        self.last_score = 0.0
+
+
+class MotionGate:
+    def __init__(self, enabled: bool = MOTION_GATE_ENABLED) -> None:
+        self.enabled = enabled
+        self._cams: Dict[str, _CamState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, key: str) -> _CamState:
+        st = self._cams.get(key)
+        if st is None:
+            st = self._cams[key] = _CamState()
+        return st
+
+    def check(self, key: str, frame: np.ndarray) -> Tuple[bool, float]:
+        """
+        Returns (gated, score). score is the changed-pixel fraction vs the
+        background. Gated only if a previous real result exists and is not
+        older than MOTION_GATE_MAX_SKIP_SEC.
+        """
+        if not self.enabled or frame is None or frame.size == 0:
+            return False, 1.0
+        gray = _thumb(frame)
+        with self._lock:
+            st = self._state(key)
+            st.checks += 1
+            if st.bg is None or st.bg.shape != gray.shape:
+                st.bg = gray.astype(np.float32)
+                st.last_score = 1.0
+                return False, 1.0
+
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(st.bg))
+            score = float(np.count_nonzero(diff > MOTION_GATE_PIXEL_DIFF)) / diff.size
+            cv2.accumulateWeighted(gray, st.bg, float(MOTION_GATE_BG_ALPHA))
+            st.last_score = score
+
+            fresh = time.time() - st.last_real_at < MOTION_GATE_MAX_SKIP_SEC
+            gated = score < MOTION_GATE_THRESHOLD and st.last_meta is not None and fresh
+            if gated:
+                st.hits += 1
+            return gated, score
+
+    def remember(self, key: str, dets: Detections, meta: Dict) -> None:
+        with self._lock:
+            st = self._state(key)
+            st.last_dets = dets
+            st.last_meta = meta
+            st.last_real_at = time.time()
+
+    def gated_meta(self, key: str, cam_id: str, score: float) -> Tuple[Detections, Dict]:
+        """Previous detections + a copy of their meta, re-stamped and marked as gated."""
+        with self._lock:
+            st = self._state(key)
+            dets = copy.deepcopy(st.last_dets) if st.last_dets is not None else Detections()
+            meta = copy.deepcopy(st.last_meta or {})
+        meta["gate"] = {"gated": True, "score": round(score, 5),
+                        "reused_from": meta.get("timestamp_utc")}
+        meta["timestamp_utc"] = datetime.utcnow().isoformat(timespec="milliseconds") + "Z"
+        meta["camera_id"] = cam_id
+        meta.setdefault("compute", {})["inference_ms"] = 0.0
+        return dets, meta
+
+    def sync(self, cameras: List[Dict[str, Any]]) -> None:
+        """Drop state for cameras no longer active or unused for TRACKER_IDLE_EVICT_SEC."""
+        active = {c.get("key") for c in cameras}
+        now = time.time()
+        with self._lock:
+            for k in [k for k, st in self._cams.items()
+                      if k not in active or (st.last_real_at and now - st.last_real_at > TRACKER_IDLE_EVICT_SEC)]:
+                self._cams.pop(k, None)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                k: {"checks": st.checks, "hits": st.hits,
+                    "hit_rate": round(st.hits / st.checks, 3) if st.checks else 0.0,
+                    "last_score": round(st.last_score, 5)}
+                for k, st in self._cams.items()
+            }
+
+
+def is_gated(meta: Optional[Dict]) -> bool:
+    return bool(((meta or {}).get("gate") or {}).get("gated"))
+
+
+# ------------------ shared gate (lazy) ------------------
+_GATE: MotionGate | None = None
+_GATE_LOCK = threading.Lock()
+
+
+def get_gate() -> MotionGate:
+    global _GATE
+    with _GATE_LOCK:
+        if _GATE is None:
+            _GATE = MotionGate()
+        return _GATE
@@ -0,0 +1,311 @@
+"""
+Staged detection pipeline: grab -> infer -> store.
+
+- GRAB:  bounded pool of I/O threads, one RTSP grab per camera in parallel.
+- INFER: a single worker thread that owns the YOLO model; frames that are
+         already waiting are run together through detect.detect_batch().
+- STORE: worker(s) that fetch the main-stream evidence frame (substream
+         cameras with detections), write the jpgs and bulk-insert the rows into SQLite.
+
+Stages are joined by bounded queues, so a slow stage pushes back on the one
+before it instead of piling frames up in memory. A camera that is still in
+flight from the previous tick is skipped rather than queued twice, so one dead
+camera never delays the rest.
+
+Usage (see main.py):
+    pipe = Pipeline(); pipe.start()
+    pipe.submit_tick(cameras)     # non-blocking
+    pipe.stats()                  # queue depths / counters
+    pipe.stop()
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from config import (
+    PIPELINE_GRAB_WORKERS, PIPELINE_STORE_WORKERS, PIPELINE_QUEUE_SIZE,
+    DETECT_BATCH_SIZE, PIPELINE_BATCH_WAIT_MS
+)
+from cadence import get_cadence
+from db import store_many
+from detect import grab_frame, detect_batch, evidence_frame, save_frames
+from log import get_logger
+from motion import is_gated
+
+_log = get_logger("pipe")
+
+
+_STOP = object()  # queue sentinel
+
+
+class Pipeline:
+    def __init__(
+        self,
+        grab_workers: int = PIPELINE_GRAB_WORKERS,
+        store_workers: int = PIPELINE_STORE_WORKERS,
+        queue_size: int = PIPELINE_QUEUE_SIZE
+    ) -> None:
+        self._grab_workers = max(1, int(grab_workers))
+        self._store_workers = max(1, int(store_workers))
+
+        # cameras waiting to be grabbed / frames waiting for the model / results waiting for disk
+        self._grab_q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._infer_q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._store_q: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._in_flight: Set[str] = set()     # camera keys somewhere in the pipeline
+        self._ticks: Dict[int, Dict[str, Any]] = {}
+        self._tick_seq = 0
+
+        self._counters: Dict[str, int] = {
+            "submitted": 0, "skipped_in_flight": 0, "dropped_full": 0,
+            "grabbed": 0, "inferred": 0, "gated": 0, "stored": 0,
+            "grab_errors": 0, "infer_errors": 0, "store_errors": 0,
+        }
+        self._last_tick_sec: Optional[float] = None
+        self._running = False
+
+    # ---------------- lifecycle ----------------
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        for i in range(self._grab_workers):
+            self._spawn(self._grab_loop, f"grab-{i}")
+        self._spawn(self._infer_loop, "infer")
+        for i in range(self._store_workers):
+            self._spawn(self._store_loop, f"store-{i}")
+        _log.info(f"[PIPE] started (grab={self._grab_workers} store={self._store_workers} "
+              f"queue={self._grab_q.maxsize})")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Drain what is already queued, then stop all stages in order."""
+        if not self._running:
+            return
+        self._running = False
+        for _ in range(self._grab_workers):
+            self._grab_q.put(_STOP)
+        self._join("grab", timeout)
+        self._infer_q.put(_STOP)
+        self._join("infer", timeout)
+        for _ in range(self._store_workers):
+            self._store_q.put(_STOP)
+        self._join("store", timeout)
+        self._threads = []
+
+    def _spawn(self, target, name: str) -> None:
+        t = threading.Thread(target=target, name=f"pipe-{name}", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _join(self, prefix: str, timeout: float) -> None:
+        deadline = time.time() + timeout
+        for t in self._threads:
+            if t.name.startswith(f"pipe-{prefix}"):
+                t.join(max(0.0, deadline - time.time()))
+
+    # ---------------- producer ----------------
+
+    def submit_tick(self, cameras: List[Dict[str, Any]]) -> int:
+        """
+        Queue one capture for every camera. Never blocks: cameras still in
+        flight from an earlier tick are skipped, and if the grab queue is full
+        the remaining cameras are dropped for this tick.
+        Returns the number of cameras queued.
+        """
+        with self._lock:
+            self._tick_seq += 1
+            tick_id = self._tick_seq
+            self._ticks[tick_id] = {"started": time.time(), "pending": 0}
+
+        cadence = get_cadence()
+        queued = 0
+        for cam in cameras:
+            key = cam["key"]
+            with self._lock:
+                if key in self._in_flight:
+                    self._counters["skipped_in_flight"] += 1
+                    continue
+                self._in_flight.add(key)
+                self._ticks[tick_id]["pending"] += 1
+            try:
+                # the cadence decision that scheduled this tick (the scheduler
+                # replaces it with the next tick's once this job returns)
+                self._grab_q.put_nowait((tick_id, cam, cadence.decision(cam["id"])))
+                queued += 1
+            except queue.Full:
+                with self._lock:
+                    self._in_flight.discard(key)
+                    self._ticks[tick_id]["pending"] -= 1
+                    self._counters["dropped_full"] += 1
+
+        with self._lock:
+            self._counters["submitted"] += queued
+            if self._ticks[tick_id]["pending"] == 0:
+                self._ticks.pop(tick_id, None)
+
+        if queued < len(cameras):
+            _log.warn(f"[PIPE] tick={tick_id} queued {queued}/{len(cameras)} cameras "
+                  f"(rest still in flight or queue full)")
+        return queued
+
+    # ---------------- stages ----------------
+
+    def _grab_loop(self) -> None:
+        while True:
+            item = self._grab_q.get()
+            if item is _STOP:
+                return
+            tick_id, cam, decision = item
+            try:
+                raw = grab_frame(cam)
+            except Exception as e:
+                self._count("grab_errors")
+                _log.err(f"[PIPE] grab failed camera={cam['key']}: {e}", camera_id=cam["key"])
+                self._finish(tick_id, cam["key"])
+                continue
+            self._count("grabbed")
+            self._infer_q.put((tick_id, cam, raw, decision))  # blocks when infer is behind
+
+    def _infer_loop(self) -> None:
+        while True:
+            item = self._infer_q.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop_after = False
+            # gather up to DETECT_BATCH_SIZE frames, waiting briefly for stragglers
+            deadline = time.time() + PIPELINE_BATCH_WAIT_MS / 1000.0
+            while len(batch) < DETECT_BATCH_SIZE:
+                try:
+                    nxt = self._infer_q.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop_after = True
+                    break
+                batch.append(nxt)
+
+            self._infer_batch(batch)
+            if stop_after:
+                return
+
+    def _infer_batch(self, batch: List[Any]) -> None:
+        try:
+            # always the batched path, so every camera keeps its own tracker
+            outputs = detect_batch([(cam, raw) for _, cam, raw, _ in batch])
+        except Exception as e:
+            for tick_id, cam, _, _ in batch:
+                self._count("infer_errors")
+                _log.err(f"[PIPE] inference failed camera={cam['key']}: {e}", camera_id=cam["key"])
+                self._finish(tick_id, cam["key"])
+            return
+        cadence = get_cadence()
+        for (tick_id, cam, raw, decision), (dets, meta) in zip(batch, outputs):
+            self._count("gated" if is_gated(meta) else "inferred")
+            # the decision that scheduled this tick, then feed the result back;
+            # a cadence error must not take the single infer thread down with it
+            try:
+                meta["cadence"] = decision
+                cadence.observe(cam["id"], dets, meta)
+            except Exception as e:
+                self._count("infer_errors")
+                _log.err(f"[PIPE] cadence update failed camera={cam['key']}: {e}", camera_id=cam["key"])
+                self._finish(tick_id, cam["key"])
+                continue
+            self._store_q.put((tick_id, cam, raw, dets, meta))
+
+    def _store_loop(self) -> None:
+        while True:
+            item = self._store_q.get()
+            if item is _STOP:
+                return
+            # take whatever else is already waiting so the tick lands in one transaction
+            batch = [item]
+            stop_after = False
+            while len(batch) < self._store_q.maxsize:
+                try:
+                    nxt = self._store_q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stop_after = True
+                    break
+                batch.append(nxt)
+
+            self._store_batch(batch)
+            if stop_after:
+                return
+
+    def _store_batch(self, batch: List[Any]) -> None:
+        rows = []
+        saved = []
+        for tick_id, cam, raw, dets, meta in batch:
+            cam_id = cam["key"]
+            try:
+                # substream cameras: main-stream frame + rescaled boxes for positives
+                raw, dets, meta = evidence_frame(cam, raw, dets, meta)
+                raw_path, ann_path = save_frames(cam, raw, dets, write_raw=not is_gated(meta))
+                # meta dict: detections are stored columnar, meta_json is built at sync
+                rows.append((cam_id, len(dets), meta, raw_path, ann_path))
+                saved.append((tick_id, cam_id))
+            except Exception as e:
+                self._count("store_errors")
+                _log.err(f"[PIPE] store failed camera={cam_id}: {e}", camera_id=cam_id)
+                self._finish(tick_id, cam_id)
+
+        try:
+            store_many(rows)
+            for (_, cam_id), (_, cnt, _, raw_path, ann_path) in zip(saved, rows):
+                self._count("stored")
+                _log.ok(
+                    f"[DETECT] camera={cam_id} count={cnt} saved "
+                    f"(raw={bool(raw_path)} ann={bool(ann_path)})",
+                    category="pipe.stored", camera_id=cam_id, count=cnt
+                )
+        except Exception as e:
+            for _, cam_id in saved:
+                self._count("store_errors")
+            _log.err(f"[PIPE] DB insert failed for {len(rows)} row(s): {e}")
+        finally:
+            for tick_id, cam_id in saved:
+                self._finish(tick_id, cam_id)
+
+    # ---------------- bookkeeping ----------------
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def _finish(self, tick_id: int, cam_key: str) -> None:
+        done_sec = None
+        with self._lock:
+            self._in_flight.discard(cam_key)
+            tick = self._ticks.get(tick_id)
+            if tick is not None:
+                tick["pending"] -= 1
+                if tick["pending"] <= 0:
+                    done_sec = time.time() - tick["started"]
+                    self._last_tick_sec = done_sec
+                    self._ticks.pop(tick_id, None)
+        if done_sec is not None:
+            _log.info(f"[PIPE] tick={tick_id} done in {done_sec:.2f}s", category="pipe.tick")
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depths, in-flight cameras and per-stage counters."""
+        with self._lock:
+            return {
+                "queue_depth": {
+                    "grab": self._grab_q.qsize(),
+                    "infer": self._infer_q.qsize(),
+                    "store": self._store_q.qsize(),
+                },
+                "in_flight": len(self._in_flight),
+                "last_tick_sec": self._last_tick_sec,
+                **dict(self._counters),
+            }
@@ -0,0 +1,159 @@
+"""
+Background retention for the local DB and FRAME_ROOT.
+
+- Age: db.cleanup_old_synced() deletes synced rows older than RETENTION_DAYS
+  in short rowid-range chunks, yielding between chunks.
+- Disk budget: while FRAME_ROOT is larger than FRAME_DISK_BUDGET_GB, the
+  oldest synced rows are deleted chunk by chunk (unsynced data is never
+  touched; if it alone is over budget a warning is printed).
+- Frame segments nobody references any more are dropped (frame_store.py).
+- Pushed rollup buckets older than ROLLUP_RETENTION_DAYS are deleted.
+- Legacy per-file jpgs are unlinked on a separate file-deletion thread.
+"""
+
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List
+
+from config import (
+    FRAME_ROOT, CLEANUP_EVERY_SEC, RETENTION_DAYS,
+    RETENTION_CHUNK_ROWS, RETENTION_CHUNK_PAUSE_SEC, FRAME_DISK_BUDGET_GB
+)
+from db import cleanup_old_synced, cleanup_rollups, delete_synced_range, synced_id_bounds
+from frame_output import get_output
+from log import get_logger
+
+_log = get_logger("cleanup")
+
+
+_STOP = object()
+
+
+def dir_bytes(root: str) -> int:
+    total = 0
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            stack.append(e.path)
+                        elif e.is_file(follow_symlinks=False):
+                            total += e.stat(follow_symlinks=False).st_size
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return total
+
+
+class RetentionWorker:
+    def __init__(self, every_sec: float = CLEANUP_EVERY_SEC,
+                 retention_days: int = RETENTION_DAYS,
+                 budget_gb: float = FRAME_DISK_BUDGET_GB) -> None:
+        self.every_sec = float(every_sec)
+        self.retention_days = retention_days
+        self.budget_bytes = int(budget_gb * 1024 ** 3) if budget_gb and budget_gb > 0 else 0
+        self._stop = threading.Event()
+        self._files: "queue.Queue[Any]" = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "passes": 0, "rows_age": 0, "rows_budget": 0, "files_deleted": 0,
+            "segment_bytes_freed": 0, "rollups_deleted": 0, "frame_root_bytes": 0,
+            "last_pass_sec": None,
+        }
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for target, name in ((self._run, "retention"), (self._file_loop, "retention-files")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stops between chunks; queued file deletions are finished first."""
+        self._stop.set()
+        self._files.put(_STOP)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    # ---------- workers ----------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                _log.err(f"[CLEANUP] pass failed: {e}")
+            self._stop.wait(self.every_sec)
+
+    def _file_loop(self) -> None:
+        while True:
+            path = self._files.get()
+            try:
+                if path is _STOP:
+                    return
+                try:
+                    if os.path.isfile(path):
+                        os.remove(path)
+                        self._bump("files_deleted")
+                except Exception:
+                    pass
+            finally:
+                self._files.task_done()
+
+    def _queue_files(self, paths: List[str]) -> None:
+        for p in paths:
+            self._files.put(p)
+
+    def _bump(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    # ---------- passes ----------
+    def run_once(self) -> None:
+        t0 = time.time()
+        deleted = cleanup_old_synced(self.retention_days, on_files=self._queue_files,
+                                     should_stop=self._stop.is_set)
+        self._bump("rows_age", deleted)
+        if deleted > 0:
+            _log.warn(f"[CLEANUP] Deleted {deleted} old synced rows (> {self.retention_days} days)")
+        self._bump("segment_bytes_freed", get_output().store.drop_dead_segments())
+        self._bump("rollups_deleted", cleanup_rollups())
+        self._enforce_budget()
+        with self._lock:
+            self._stats["passes"] += 1
+            self._stats["last_pass_sec"] = round(time.time() - t0, 2)
+
+    def _enforce_budget(self) -> None:
+        usage = dir_bytes(FRAME_ROOT)
+        deleted = 0
+        while self.budget_bytes and usage > self.budget_bytes and not self._stop.is_set():
+            lo, hi = synced_id_bounds()
+            if lo is None:
+                _log.warn(f"[CLEANUP] {FRAME_ROOT} is {usage / 1024 ** 3:.2f} GB, over budget, "
+                      f"but only unsynced data is left")
+                break
+            n, files = delete_synced_range(lo - 1, min(lo - 1 + RETENTION_CHUNK_ROWS, hi))
+            deleted += n
+            self._queue_files(files)
+            self._files.join()  # so the next measurement sees them gone
+            self._bump("segment_bytes_freed", get_output().store.drop_dead_segments())
+            usage = dir_bytes(FRAME_ROOT)
+            time.sleep(RETENTION_CHUNK_PAUSE_SEC)
+        if deleted:
+            self._bump("rows_budget", deleted)
+            _log.warn(f"[CLEANUP] disk budget: deleted {deleted} oldest synced rows, "
+                  f"{FRAME_ROOT} now {usage / 1024 ** 3:.2f} GB")
+        with self._lock:
+            self._stats["frame_root_bytes"] = usage
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, files_queued=self._files.qsize())
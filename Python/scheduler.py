@@ -0,0 +1,168 @@
+"""
+Heap-based job scheduler for the main loop.
+
+- run() sleeps until the earliest job is due instead of polling; add(),
+  expedite(), cancel() and stop() wake it early.
+- Each job has a `next_due(planned, now)` callable, so cadences can depend on
+  time of day or per-camera settings. every() covers the fixed-interval case.
+- Schedule lag (actual minus planned fire time) is tracked per job.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from log import get_logger
+
+_log = get_logger("sched")
+
+
+def next_slot(after: float, interval: float, phase: float = 0.0) -> float:
+    """
+    First time strictly after `after` of the form k*interval + phase.
+    Slots are aligned to the epoch, so a job keeps its phase across restarts
+    and cadence changes, and a late job skips missed slots instead of bursting.
+    """
+    interval = max(1e-3, float(interval))
+    k = math.floor((after - phase) / interval) + 1
+    return k * interval + phase
+
+
+class _Job:
+    __slots__ = ("name", "fn", "next_due", "planned", "cancelled",
+                 "runs", "errors", "lag_last", "lag_max", "lag_sum")
+
+    def __init__(self, name: str, fn: Callable[[], Any],
+                 next_due: Callable[[float, float], float]) -> None:
+        self.name = name
+        self.fn = fn
+        self.next_due = next_due
+        self.planned = 0.0
+        self.cancelled = False
+        self.runs = 0
+        self.errors = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_sum = 0.0
+
+
+class Scheduler:
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, int, _Job]] = []
+        self._jobs: Dict[str, _Job] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+
+    # ---------- jobs ----------
+    def add(self, name: str, fn: Callable[[], Any],
+            next_due: Callable[[float, float], float],
+            first_at: Optional[float] = None) -> None:
+        """Add (or replace) a job. First fire at `first_at`, else next_due(now, now)."""
+        now = time.time()
+        job = _Job(name, fn, next_due)
+        job.planned = next_due(now, now) if first_at is None else first_at
+        with self._lock:
+            old = self._jobs.get(name)
+            if old is not None:
+                old.cancelled = True
+            self._jobs[name] = job
+            heapq.heappush(self._heap, (job.planned, next(self._seq), job))
+            self._wake.set()
+
+    def every(self, name: str, fn: Callable[[], Any], interval: float,
+              first_at: Optional[float] = None) -> None:
+        self.add(name, fn, lambda planned, now: max(planned + interval, now), first_at)
+
+    def expedite(self, name: str, at: float) -> bool:
+        """Move a job's next fire up to `at` (never later). Thread-safe."""
+        with self._lock:
+            job = self._jobs.get(name)
+            if job is None or job.planned <= at:
+                return False
+            new = _Job(job.name, job.fn, job.next_due)
+            for attr in ("runs", "errors", "lag_last", "lag_max", "lag_sum"):
+                setattr(new, attr, getattr(job, attr))
+            new.planned = at
+            job.cancelled = True
+            self._jobs[name] = new
+            heapq.heappush(self._heap, (new.planned, next(self._seq), new))
+            self._wake.set()
+            return True
+
+    def cancel(self, name: str) -> None:
+        with self._lock:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.cancelled = True
+
+    def names(self, prefix: str = "") -> List[str]:
+        with self._lock:
+            return [n for n in self._jobs if n.startswith(prefix)]
+
+    def stop(self) -> None:
+        """Safe to call from a signal handler."""
+        self._stopped = True
+        self._wake.set()
+
+    # ---------- loop ----------
+    def run(self) -> None:
+        while not self._stopped:
+            with self._lock:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                delay = self._heap[0][0] - time.time() if self._heap else None
+                if delay is None or delay > 0:
+                    self._wake.clear()
+                else:
+                    _, _, job = heapq.heappop(self._heap)
+            if delay is None or delay > 0:
+                self._wake.wait(delay)
+                continue
+            self._fire(job)
+
+    def _fire(self, job: _Job) -> None:
+        started = time.time()
+        lag = max(0.0, started - job.planned)
+        try:
+            job.fn()
+        except Exception as e:
+            job.errors += 1
+            _log.err(f"[SCHED] job {job.name} failed: {e}")
+        job.runs += 1
+        job.lag_last = lag
+        job.lag_max = max(job.lag_max, lag)
+        job.lag_sum += lag
+
+        with self._lock:
+            if job.cancelled:
+                return
+            try:
+                job.planned = job.next_due(job.planned, time.time())
+            except Exception as e:
+                _log.err(f"[SCHED] job {job.name} next_due failed: {e}; dropped")
+                self._jobs.pop(job.name, None)
+                return
+            heapq.heappush(self._heap, (job.planned, next(self._seq), job))
+
+    # ---------- stats ----------
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per job: runs, errors, lag (ms) last/avg/max, seconds until next fire."""
+        now = time.time()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {
+            j.name: {
+                "runs": j.runs,
+                "errors": j.errors,
+                "lag_last_ms": round(j.lag_last * 1000.0, 1),
+                "lag_avg_ms": round(j.lag_sum * 1000.0 / j.runs, 1) if j.runs else 0.0,
+                "lag_max_ms": round(j.lag_max * 1000.0, 1),
+                "next_in_sec": round(j.planned - now, 1),
+            }
+            for j in jobs
+        }
@@ -1,108 +1,502 @@
 import json
-import os
+import threading
 import time
-from typing import Optional
-
-import requests
-from colorama import init as colorama_init, Fore, Style
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
 
 from config import (
-    API_URL, SYNC_BATCH_SIZE, BACKOFF_START, BACKOFF_MAX, REQUESTS_VERIFY_TLS,
-    SEND_IMAGES_ONLY_IF_COUNT_POSITIVE, DELETE_RAW_AFTER_SUCCESS_SYNC
+    API_URL, SYNC_BATCH_SIZE, SYNC_EVERY_SEC, BACKOFF_START,
+    SEND_IMAGES_ONLY_IF_COUNT_POSITIVE, DELETE_RAW_AFTER_SUCCESS_SYNC,
+    SYNC_BATCH_MODE, SYNC_BATCH_URL, SYNC_BATCH_MAX_BYTES, SYNC_CONCURRENCY,
+    SYNC_ROLLUPS, SYNC_ROLLUP_URL, SYNC_ROLLUP_BATCH, SYNC_EVENTS,
+    SYNC_REJECT_RETRY_SEC, SYNC_MAX_REJECTS
+)
+from db import (
+    get_dirty_rollups, get_unsynced_rows, mark_rejected_many, mark_rollups_clean, mark_synced_many
 )
-from db import get_unsynced_rows, mark_synced
+from frame_output import get_output
+from http_client import backoff_states, get_backoff, post_json, post_multipart
+from log import get_logger
+from meta_codec import dumps as wire_dumps, get_wire
+from metrics import counter, histogram
+
+_log = get_logger("sync")
+
+
+# retry state per endpoint: single-row ingest and batch ingest fail independently.
+# A failure only moves the endpoint's next-attempt deadline; nothing sleeps.
+_backoff_single = get_backoff("ingest")
+_backoff_batch = get_backoff("ingest_batch")
+_backoff_rollups = get_backoff("rollups")
+
+_REQUEST_SECONDS = histogram("edge_sync_request_seconds", "Upload request round-trip by endpoint and status",
+                             ["endpoint", "status"])
+_ROWS = counter("edge_sync_rows_total", "Rows offered to the API; result=ok|fail|dead", ["result"])
+_BYTES = counter("edge_sync_bytes_total", "Bytes handed to the API; kind=frame|meta", ["kind"])
+
+
+def _timed_post(endpoint: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    status = "error"
+    try:
+        r = fn(*args, **kwargs)
+        status = str(r.status_code)
+        return r
+    finally:
+        _REQUEST_SECONDS.labels(endpoint, status).observe(time.perf_counter() - t0)
 
-colorama_init(autoreset=True)
-def _ok(m): print(Fore.GREEN + m + Style.RESET_ALL)
-def _info(m): print(Fore.CYAN + m + Style.RESET_ALL)
-def _warn(m): print(Fore.YELLOW + m + Style.RESET_ALL)
-def _err(m): print(Fore.RED + m + Style.RESET_ALL)
 
+def _on_success(backoff) -> None:
+    if backoff.success():
+        _log.info(f"[BACKOFF] {backoff.name} recovered, circuit closed (start {BACKOFF_START}s)")
 
-_current_backoff = BACKOFF_START
 
+def _on_failure(backoff, error: str) -> float:
+    delay = backoff.failure(error)
+    _log.warn(f"[BACKOFF] {backoff.name} {error}; circuit={backoff.state}, "
+          f"next attempt in {backoff.current}s")
+    return delay
 
-def _reset_backoff():
-    global _current_backoff
-    _current_backoff = BACKOFF_START
-    _info(f"[BACKOFF] reset to {BACKOFF_START}s")
 
+_upload_bytes = 0  # frame bytes handed to the API (stats)
+_meta_bytes = 0    # meta bytes handed to the API, in whatever wire format (stats)
+_upload_lock = threading.Lock()
 
-def _increase_backoff():
-    global _current_backoff
-    _current_backoff *= 2
-    if _current_backoff >= BACKOFF_MAX:
-        _warn("[BACKOFF] reached max; resetting to start")
-        _reset_backoff()
-    else:
-        _warn(f"[BACKOFF] increased to {_current_backoff}s")
+
+def _count_upload(n: int, meta: bool = False) -> None:
+    global _upload_bytes, _meta_bytes
+    with _upload_lock:
+        if meta:
+            _meta_bytes += n
+        else:
+            _upload_bytes += n
+    _BYTES.labels("meta" if meta else "frame").inc(n)
+
+
+def _post_meta(url: str, metas: List[str], ids: Optional[List[str]], plain: tuple,
+               files: list, timeout: float):
+    """
+    POST frames plus meta in the negotiated wire format (meta_codec.py).
+
+    metas: meta JSON per row; ids: batch item ids (None = single-row Ingest);
+    plain: the (field, JSON) part used while the API only takes JSON.
+    415 (or 400 before any compact request succeeded) moves to the next
+    format and resends; 409 means the API lost our contexts, resend them.
+    """
+    wire = get_wire()
+    ct = wire.content_type()
+    resent_ctx = False
+    while True:
+        ctxs: Dict[str, Any] = {}
+        if ct is not None:
+            try:
+                events, ctxs = wire.encode([json.loads(m) for m in metas])
+            except (ValueError, KeyError, TypeError):
+                ct = None  # an odd legacy meta: this request goes as JSON
+        if ct is None:
+            part = (plain[0], (None, plain[1], "application/json"))
+            _count_upload(len(plain[1].encode("utf-8")), meta=True)
+        else:
+            if ids is None:
+                payload = {"ctx": ctxs, "e": events[0]}
+            else:
+                payload = {"ctx": ctxs, "items": [{"id": i, "e": e} for i, e in zip(ids, events)]}
+            body = wire_dumps(payload, ct)
+            part = ("meta_c" if ids is None else "items_c", ("meta.bin", body, ct))
+            _count_upload(len(body), meta=True)
+
+        r = _timed_post("ingest" if ids is None else "ingest_batch",
+                        post_multipart, url, [part] + files, timeout=timeout)
+        if ct is None:
+            return r
+        if r.status_code == 409 and not resent_ctx:
+            wire.forget_contexts()
+            resent_ctx = True
+            continue
+        if r.status_code == 415 or (r.status_code == 400 and not wire.confirmed):
+            ct = wire.rejected(r.headers.get("Accept"))
+            _log.warn(f"[SYNC] API refused compact meta ({r.status_code}); now {ct or 'application/json'}")
+            continue
+        if r.status_code == 200:
+            wire.accepted(ctxs)
+        return r
 
 
 def _send(meta_json: str, raw_path: Optional[str], ann_path: Optional[str]) -> bool:
-    # Build multipart. Only include frames if provided.
-    files = {"meta": (None, meta_json, "application/json")}
-    if raw_path:
-        try:
-            files["frame_raw"] = ("raw.jpg", open(
-                raw_path, "rb"), "image/jpeg")
-        except Exception as e:
-            _warn(f"[SYNC] cannot open raw: {e}")
-    if ann_path:
-        try:
-            files["frame_annotated"] = (
-                "annotated.jpg", open(ann_path, "rb"), "image/jpeg")
-        except Exception as e:
-            _warn(f"[SYNC] cannot open annotated: {e}")
+    # Build multipart. Only include frames if provided (bytes come from the
+    # frame output cache, or disk for older rows).
+    files = []
+    out = get_output()
+    for field, name, path in (("frame_raw", "raw.jpg", raw_path),
+                              ("frame_annotated", "annotated.jpg", ann_path)):
+        if not path:
+            continue
+        data = out.read(path)
+        if data is None:
+            _log.warn(f"[SYNC] cannot open {field}: {path}")
+            continue
+        files.append((field, (name, data, "image/jpeg")))
+        _count_upload(len(data))
 
     try:
-        r = requests.post(API_URL, files=files, timeout=30,
-                          verify=REQUESTS_VERIFY_TLS)
-        _info(f"[SYNC] server status: {r.status_code}")
-        if r.text:
-            print(r.text[:400])
+        r = _post_meta(API_URL, [meta_json], None, ("meta", meta_json), files, timeout=30)
+        _log.info(f"[SYNC] server status: {r.status_code}", category="sync.status", status=r.status_code)
+        if r.status_code != 200 and r.text:
+            _log.warn(f"[SYNC] server said: {r.text[:400]}", category="sync.response")
         return r.status_code == 200
     except Exception as e:
-        _err(f"[SYNC] HTTP error: {e}")
+        _log.err(f"[SYNC] HTTP error: {e}")
         return False
-    finally:
-        for k in ("frame_raw", "frame_annotated"):
-            if k in files and hasattr(files[k][1], "close"):
-                try:
-                    files[k][1].close()
-                except Exception:
-                    pass
 
 
-def sync_unsent_once() -> None:
-    rows = get_unsynced_rows(SYNC_BATCH_SIZE)
-    if not rows:
-        return
+# ------------------ batch mode ------------------
+# POST SYNC_BATCH_URL (EdgeDataController.IngestBatch) with
+#   items = [{"id": "<row id>", "meta": {...}}, ...]
+#   frame_raw_<id> / frame_annotated_<id> files
+# and get back one {id, success, errors} per item.
+_batch_supported = True  # set False if the server has no batch action
+
+
+def _row_meta(ts: str, cam: str, cnt: int, meta_json: Optional[str]) -> str:
+    # Fallback minimal meta if older rows
+    if not meta_json:
+        return json.dumps({"timestamp_utc": ts, "camera_id": cam, "people": {"count": cnt}})
+    return meta_json
+
 
+def _pack(rows) -> List[list]:
+    """Split rows into requests of at most SYNC_BATCH_MAX_BYTES (a single big row still goes alone)."""
+    out = get_output()
+    batches: List[list] = []
+    cur: list = []
+    cur_bytes = 0
+    for row in rows:
+        size = len(row[4] or "") + out.size(row[5]) + out.size(row[6])
+        if cur and cur_bytes + size > SYNC_BATCH_MAX_BYTES:
+            batches.append(cur)
+            cur, cur_bytes = [], 0
+        cur.append(row)
+        cur_bytes += size
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def _send_batch(rows) -> Optional[Dict[int, bool]]:
+    """Returns {row_id: accepted} or None if the request itself failed."""
+    global _batch_supported
+    items = []
+    metas = []
+    files = []
+    out = get_output()
+    for row_id, ts, cam, cnt, meta_json, raw_path, ann_path in rows:
+        meta = _row_meta(ts, cam, cnt, meta_json)
+        metas.append(meta)
+        try:
+            items.append({"id": str(row_id), "meta": json.loads(meta)})
+        except ValueError:
+            items.append({"id": str(row_id), "meta": meta})
+        for field, name, path in (("frame_raw", "raw.jpg", raw_path),
+                                  ("frame_annotated", "annotated.jpg", ann_path)):
+            if not path:
+                continue
+            data = out.read(path)
+            if data is None:
+                _log.warn(f"[SYNC] cannot open {field} id={row_id}: {path}", row_id=row_id)
+                continue
+            files.append((f"{field}_{row_id}", (name, data, "image/jpeg")))
+            _count_upload(len(data))
+    plain = ("items", json.dumps(items, ensure_ascii=False))
+
+    try:
+        r = _post_meta(SYNC_BATCH_URL, metas, [str(row[0]) for row in rows], plain, files, timeout=60)
+        _log.info(f"[SYNC] batch of {len(rows)} -> {r.status_code}", category="sync.status",
+                  status=r.status_code, rows=len(rows))
+        if r.status_code in (404, 405):
+            _log.warn("[SYNC] server has no batch endpoint; using single-row sync")
+            _batch_supported = False
+            return None
+        if r.status_code != 200:
+            return None
+        result = (r.json() or {}).get("result") or []
+        accepted = {}
+        for item in result:
+            try:
+                accepted[int(item.get("id"))] = bool(item.get("success"))
+                if not item.get("success"):
+                    _log.warn(f"[SYNC] rejected id={item.get('id')}: {item.get('errors')}",
+                                  category="sync.rejected", row_id=item.get("id"))
+            except (TypeError, ValueError):
+                continue
+        return accepted
+    except Exception as e:
+        _log.err(f"[SYNC] HTTP error: {e}")
+        return None
+
+
+def _sync_batched(rows, done) -> tuple:
+    """
+    Send rows in size-capped batches.
+    Returns (rows left for single-row mode, True if the endpoint failed).
+    """
+    batches = _pack(rows)
+    for i, batch in enumerate(batches):
+        accepted = _send_batch(batch)
+        if accepted is None:
+            if not _batch_supported:
+                return [row for b in batches[i:] for row in b], False
+            _on_failure(_backoff_batch, f"batch of {len(batch)} rows failed")
+            _ROWS.labels("fail").inc(len(batch))
+            return [], True  # stop this lane on first failure
+        for row in batch:
+            if accepted.get(row[0]):
+                done.append((row[0], row[5], row[6]))
+        n_ok = sum(1 for row in batch if accepted.get(row[0]))
+        _ROWS.labels("ok").inc(n_ok)
+        _ROWS.labels("fail").inc(len(batch) - n_ok)
+        _log.ok(f"[SYNC] batch OK {n_ok}/{len(batch)}", category="sync.ok", rows=n_ok)
+        # rejected items are held back (and dead-lettered eventually), so they
+        # don't take the head of every pass and block the rows behind them
+        rejected = [row[0] for row in batch if accepted.get(row[0]) is False]
+        for row_id in mark_rejected_many(rejected, SYNC_MAX_REJECTS, SYNC_REJECT_RETRY_SEC):
+            _ROWS.labels("dead").inc()
+            _log.err(f"[SYNC] id={row_id} rejected {SYNC_MAX_REJECTS} times; dead-lettered (synced=2)",
+                     row_id=row_id)
+        if n_ok:
+            _on_success(_backoff_batch)  # an all-rejected batch is no proof of recovery
+    return [], False
+
+
+def _sync_single(rows, done) -> bool:
+    """Send rows one by one; returns True if the endpoint failed."""
     for row_id, ts, cam, cnt, meta_json, raw_path, ann_path in rows:
         # Build what we actually send under Option C
         use_raw = raw_path
         use_ann = ann_path
 
-        # Fallback minimal meta if older rows
-        if not meta_json:
-            meta_json = json.dumps(
-                {"timestamp_utc": ts, "camera_id": cam, "people": {"count": cnt}})
-
-        ok = _send(meta_json, use_raw, use_ann)
+        ok = _send(_row_meta(ts, cam, cnt, meta_json), use_raw, use_ann)
+        _ROWS.labels("ok" if ok else "fail").inc()
         if ok:
-            mark_synced(row_id)
-            _ok(f"[SYNC] OK id={row_id}")
-            _reset_backoff()
-
-            # After success, optionally delete RAW to save disk
-            if DELETE_RAW_AFTER_SUCCESS_SYNC and use_raw:
-                try:
-                    if os.path.isfile(use_raw):
-                        os.remove(use_raw)
-                except Exception:
-                    pass
+            done.append((row_id, use_raw, use_ann))
+            _log.ok(f"[SYNC] OK id={row_id}", category="sync.ok", row_id=row_id, camera_id=cam)
+            _on_success(_backoff_single)
         else:
-            _err(f"[SYNC] FAILED id={row_id}, waiting {_current_backoff}s")
-            time.sleep(_current_backoff)
-            _increase_backoff()
-            break  # stop this pass on first failure
+            _log.err(f"[SYNC] FAILED id={row_id}", row_id=row_id, camera_id=cam)
+            _on_failure(_backoff_single, f"row id={row_id} failed")
+            return True  # stop this lane on first failure
+    return False
+
+
+def _active_backoff():
+    return _backoff_batch if (SYNC_BATCH_MODE and _batch_supported) else _backoff_single
+
+
+def _sync_lane(rows, done) -> bool:
+    failed = False
+    if SYNC_BATCH_MODE and _batch_supported:
+        rows, failed = _sync_batched(rows, done)
+    if rows and not failed and _backoff_single.ready():
+        failed = _sync_single(rows, done)
+    return failed
+
+
+def _lanes(rows, n: int) -> List[list]:
+    """
+    Split rows into n lanes by camera. A camera always maps to the same lane and
+    rows keep their id order inside it, so per-camera ordering is preserved
+    while different cameras upload concurrently.
+    """
+    lanes: List[list] = [[] for _ in range(max(1, n))]
+    for row in rows:
+        lanes[zlib.crc32(str(row[2]).encode()) % len(lanes)].append(row)
+    return [lane for lane in lanes if lane]
+
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, SYNC_CONCURRENCY), thread_name_prefix="sync")
+    return _executor
+
+
+def _delete_raws(paths) -> None:
+    out = get_output()
+    for path in paths:
+        out.delete(path)
+
+
+def sync_unsent_once() -> int:
+    """
+    One sync pass. Never sleeps: if the endpoint's retry deadline has not
+    passed yet the pass is skipped. Returns the number of rows accepted.
+    """
+    backoff = _active_backoff()
+    if not backoff.ready():
+        return 0
+
+    rows = get_unsynced_rows(SYNC_BATCH_SIZE)
+    if not rows:
+        return 0
+
+    if not SYNC_EVENTS:
+        # counts already went into the rollups with the insert; nothing to upload
+        mark_synced_many(row[0] for row in rows)
+        get_output().release(p for row in rows for p in (row[5], row[6]))
+        return len(rows)
+
+    done = []  # (row_id, raw_path, ann_path) accepted by the server
+    try:
+        lanes = _lanes(rows, SYNC_CONCURRENCY)
+        if backoff.state == "half_open":
+            lanes = lanes[:1]  # one trial lane while the circuit is half-open
+        if len(lanes) == 1:
+            _sync_lane(lanes[0], done)
+        else:
+            futures = [_get_executor().submit(_sync_lane, lane, done)
+                       for lane in lanes]
+            for f in futures:
+                f.result()
+    finally:
+        # one transaction for the whole pass; a RAW released below is cleared
+        # from its row in it, so retention never drops that reference a second
+        # time (deduplicated blobs are shared with rows not yet synced)
+        mark_synced_many((row_id for row_id, _, _ in done), drop_raw=DELETE_RAW_AFTER_SUCCESS_SYNC)
+        # After success, optionally delete RAW to save disk (only once marked)
+        if DELETE_RAW_AFTER_SUCCESS_SYNC:
+            _delete_raws(raw for _, raw, _ in done)
+
+    # synced frames no longer need to stay in memory
+    get_output().release(p for _, raw, ann in done for p in (raw, ann))
+
+    return len(done)
+
+
+# ------------------ rollups ------------------
+# POST SYNC_ROLLUP_URL with only the buckets that changed since the last push:
+#   {"fields": ["camera_id", "class_name", ...], "rows": [[...], ...]}
+# A bucket is a full snapshot (not a delta), so re-sending one is harmless.
+_ROLLUP_FIELDS = ("camera_id", "class_name", "bucket_sec", "bucket_ts",
+                  "events", "min", "max", "avg", "confidence_avg")
+_rollup_supported = True  # set False if the server has no rollup action
+
+
+def sync_rollups_once() -> int:
+    """Push dirty rollup buckets; returns the number of buckets accepted."""
+    global _rollup_supported
+    if not (SYNC_ROLLUPS and _rollup_supported) or not _backoff_rollups.ready():
+        return 0
+    pushed = get_dirty_rollups(SYNC_ROLLUP_BATCH)
+    if not pushed:
+        return 0
+    payload = {"fields": list(_ROLLUP_FIELDS),
+               "rows": [[b[f] for f in _ROLLUP_FIELDS] for b, _ in pushed]}
+    try:
+        r = _timed_post("rollups", post_json, SYNC_ROLLUP_URL, payload, timeout=30)
+    except Exception as e:
+        _on_failure(_backoff_rollups, f"HTTP error: {e}")
+        return 0
+    if r.status_code in (404, 405):
+        _log.warn("[SYNC] server has no rollup endpoint; rollup sync disabled")
+        _rollup_supported = False
+        return 0
+    if r.status_code != 200:
+        _on_failure(_backoff_rollups, f"rollups -> {r.status_code}")
+        return 0
+    mark_rollups_clean(pushed)
+    _on_success(_backoff_rollups)
+    _log.ok(f"[SYNC] rollups OK {len(pushed)} buckets", category="sync.ok", buckets=len(pushed))
+    return len(pushed)
+
+
+# ------------------ scheduler ------------------
+
+class SyncWorker:
+    """
+    Runs sync passes on its own thread so uploads (and their retries) never
+    hold up the detection loop.
+
+    - normal cadence: one pass every SYNC_EVERY_SEC
+    - backlog: if a pass filled a whole page (SYNC_BATCH_SIZE), run again now
+    - failures: wake at the endpoint's next-attempt deadline, not before
+    - rollups: changed buckets are pushed after each pass (SYNC_ROLLUPS)
+    """
+
+    def __init__(self, every_sec: float = SYNC_EVERY_SEC) -> None:
+        self.every_sec = float(every_sec)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._passes = 0
+        self._sent_total = 0
+        self._last_pass_at = 0.0
+        self._last_sent = 0
+        self._next_pass_at = 0.0
+        self._rollups_total = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop after the current pass (an in-flight request may take up to its timeout)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _next_wait(self, sent: int) -> float:
+        now = time.time()
+        backoff = _active_backoff()
+        if backoff.next_attempt_at > now:
+            return backoff.next_attempt_at - now
+        if sent >= SYNC_BATCH_SIZE:
+            return 0.0
+        return self.every_sec
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            sent = 0
+            try:
+                sent = sync_unsent_once()
+            except Exception as e:
+                _log.err(f"[SYNC] pass error: {e}")
+            rolled = 0
+            try:
+                rolled = sync_rollups_once()
+            except Exception as e:
+                _log.err(f"[SYNC] rollup pass error: {e}")
+            wait = self._next_wait(sent)
+            with self._lock:
+                self._passes += 1
+                self._sent_total += sent
+                self._rollups_total += rolled
+                self._last_sent = sent
+                self._last_pass_at = time.time()
+                self._next_pass_at = self._last_pass_at + wait
+            if wait > 0:
+                self._stop.wait(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "passes": self._passes,
+                "sent_total": self._sent_total,
+                "last_sent": self._last_sent,
+                "last_pass_at": self._last_pass_at,
+                "next_pass_in_sec": round(max(0.0, self._next_pass_at - time.time()), 1),
+                "batch_supported": _batch_supported,
+                "upload_bytes": _upload_bytes,
+                "meta_bytes": _meta_bytes,
+                "meta_wire": get_wire().stats(),
+                "rollups_sent": self._rollups_total,
+                "rollup_supported": _rollup_supported,
+                "endpoints": backoff_states(),
+            }
@@ -0,0 +1,103 @@
+"""
+Compact meta negotiation against the API's EdgeMetaCodec (C#):
+Supported = ["...+json; enc=gzip", "...+json"], anything else -> 415 + Accept.
+
+Run from the Python/ folder: python -m pytest -q tests
+"""
+import json
+import os
+import sys
+import types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pytest  # noqa: E402
+
+import meta_codec  # noqa: E402
+import sync  # noqa: E402
+
+MEDIA = meta_codec.MEDIA_TYPE
+SUPPORTED = [MEDIA + "+json; enc=gzip", MEDIA + "+json"]
+
+
+def _is_supported(ct):
+    """EdgeMetaCodec.IsSupported: +json, enc absent / gzip / none."""
+    parts = [p.strip() for p in (ct or "").split(";") if p.strip()]
+    if not parts or parts[0].lower() != MEDIA + "+json":
+        return False
+    for p in parts[1:]:
+        k, _, v = p.partition("=")
+        if k.strip().lower() == "enc" and v.strip().lower() not in ("gzip", "none"):
+            return False
+    return True
+
+
+class _Resp:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Stub IngestBatch: records each meta part's content type, 415 for unsupported ones."""
+    seen = []
+
+    def post_multipart(url, parts, timeout=None):
+        _, (_, body, ct) = parts[0]
+        seen.append(ct)
+        if ct == "application/json":
+            return _Resp(200)
+        if not _is_supported(ct):
+            return _Resp(415, {"Accept": ", ".join(SUPPORTED)})
+        payload = meta_codec.loads(body, ct)
+        assert payload["items"][0]["e"]["c"] == "CAM1"
+        return _Resp(200)
+
+    monkeypatch.setattr(sync, "post_multipart", post_multipart)
+    monkeypatch.setattr(meta_codec, "META_WIRE_FORMAT", "compact")
+    monkeypatch.setattr(meta_codec, "META_WIRE_CODECS", ("json",))
+    return seen
+
+
+def _post(wire, monkeypatch):
+    monkeypatch.setattr(sync, "get_wire", lambda: wire)
+    meta = json.dumps({"timestamp_utc": "2025-01-01T00:00:00.000Z", "camera_id": "CAM1",
+                       "image": {"width": 640, "height": 360}, "targets": ["person"],
+                       "compute": {"inference_ms": 5.0, "model": "m"},
+                       "detections": [{"class_id": 0, "class_name": "person", "confidence": 0.9,
+                                       "bbox_xyxy": [1.0, 2.0, 3.0, 4.0], "track_id": 1}]})
+    return sync._post_meta("http://api/batch", [meta], ["1"], ("items", "[]"), [], timeout=5)
+
+
+def test_default_compression_is_accepted_first_time(api, monkeypatch):
+    wire = meta_codec.WireFormat()
+    assert _post(wire, monkeypatch).status_code == 200
+    assert api == [MEDIA + "+json; enc=gzip"]
+    assert wire.confirmed
+
+
+def test_415_moves_to_an_offered_encoding_and_is_accepted(api, monkeypatch):
+    fake_zstd = types.SimpleNamespace(
+        ZstdCompressor=lambda level=3: types.SimpleNamespace(compress=lambda d: b"zstd" + d))
+    monkeypatch.setattr(meta_codec, "zstandard", fake_zstd)
+    monkeypatch.setattr(meta_codec, "META_WIRE_COMPRESS", "zstd")
+    wire = meta_codec.WireFormat()
+
+    assert _post(wire, monkeypatch).status_code == 200
+    # zstd refused -> same codec with the gzip the API offers, not plain JSON
+    assert api == [MEDIA + "+json; enc=zstd", MEDIA + "+json; enc=gzip"]
+    assert wire.confirmed and wire.content_type() == MEDIA + "+json; enc=gzip"
+
+    api.clear()
+    assert _post(wire, monkeypatch).status_code == 200
+    assert api == [MEDIA + "+json; enc=gzip"]
+
+
+def test_nothing_offered_falls_back_to_json(api, monkeypatch):
+    monkeypatch.setattr(meta_codec, "META_WIRE_CODECS", ("msgpack",))
+    monkeypatch.setattr(meta_codec, "msgpack", types.SimpleNamespace(packb=lambda o, use_bin_type: b"m"))
+    wire = meta_codec.WireFormat()
+    assert _post(wire, monkeypatch).status_code == 200
+    assert api == [MEDIA + "+msgpack; enc=gzip", "application/json"]
+    assert wire.content_type() is None
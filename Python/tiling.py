@@ -0,0 +1,189 @@
+"""
+Per-camera regions of interest and SAHI-style tiled inference.
+
+A 4K frame handed to the model whole is shrunk to INFER_IMGSZ, so a person at
+the far end of a gate is a few pixels tall, and sky / walls cost as much as
+the driveway. A camera can instead list regions of interest and/or ask for
+tiles; only those crops are inferred, batched with every other camera's crops,
+and the boxes are mapped back to frame coordinates and merged.
+
+Camera fields (API / cameras.json, parsed by main._normalize_cam):
+    "roi":   [[x1, y1, x2, y2], ...]   fractions of the frame (0..1), so they
+                                       hold for any stream resolution
+    "tiles": true | false | <tile px> | {"size": 640, "overlap": 0.2, "full_frame": true}
+
+- plan(camera, w, h) -> crop rects (x1, y1, x2, y2) in pixels, or None for the whole frame
+- merge(parts, rects, frame, names) -> one ultralytics Results in frame coordinates
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import (
+    TILE_ENABLED, TILE_SIZE, TILE_OVERLAP, TILE_FULL_FRAME, TILE_MAX_CROPS, TILE_MERGE_IOS
+)
+from log import get_logger
+
+_log = get_logger("tiling")
+
+Rect = Tuple[int, int, int, int]
+
+
+# ------------------ camera config ------------------
+
+def parse_roi(value: Any) -> Optional[List[Tuple[float, float, float, float]]]:
+    """[[x1, y1, x2, y2], ...] (or one rect) as fractions -> list of rects; None if absent/invalid."""
+    if not value:
+        return None
+    if isinstance(value, (list, tuple)) and value and not isinstance(value[0], (list, tuple)):
+        value = [value]
+    out = []
+    for r in value:
+        try:
+            x1, y1, x2, y2 = (min(1.0, max(0.0, float(v))) for v in r)
+        except (TypeError, ValueError):
+            _log.warn(f"[ROI] ignoring bad region: {r}")
+            continue
+        if x2 > x1 and y2 > y1:
+            out.append((x1, y1, x2, y2))
+        else:
+            _log.warn(f"[ROI] ignoring empty region: {r}")
+    return out or None
+
+
+def parse_tiles(value: Any) -> Optional[Dict[str, Any]]:
+    """Camera "tiles" -> {"size", "overlap", "full_frame"}; {} = off, None = TILE_ENABLED decides."""
+    if value is None:
+        return None
+    if value is False:
+        return {}
+    spec: Dict[str, Any] = {"size": TILE_SIZE, "overlap": TILE_OVERLAP, "full_frame": TILE_FULL_FRAME}
+    if isinstance(value, dict):
+        spec.update({k: value[k] for k in ("size", "overlap", "full_frame") if k in value})
+    elif value is not True:
+        try:
+            spec["size"] = int(value)
+        except (TypeError, ValueError):
+            _log.warn(f"[TILE] ignoring bad tiles setting: {value}")
+            return None
+    try:
+        spec["size"] = max(64, int(spec["size"]))
+        spec["overlap"] = min(0.9, max(0.0, float(spec["overlap"])))
+        spec["full_frame"] = bool(spec["full_frame"])
+    except (TypeError, ValueError):
+        _log.warn(f"[TILE] ignoring bad tiles setting: {value}")
+        return None
+    return spec
+
+
+def _tiles_for(camera: Dict[str, Any]) -> Dict[str, Any]:
+    spec = camera.get("tiles")
+    if spec is None:
+        return parse_tiles(True) if TILE_ENABLED else {}
+    return spec
+
+
+# ------------------ planning ------------------
+
+def _starts(lo: int, hi: int, size: int, overlap: float) -> List[int]:
+    """Evenly spaced tile origins covering [lo, hi) with at least `overlap` between neighbours."""
+    length = hi - lo
+    if length <= size:
+        return [lo]
+    n = math.ceil((length - size) / (size * (1.0 - overlap))) + 1
+    return [lo + int(round(i * (length - size) / (n - 1))) for i in range(n)]
+
+
+def _grid(region: Rect, size: int, overlap: float) -> List[Rect]:
+    x1, y1, x2, y2 = region
+    return [(x, y, min(x + size, x2), min(y + size, y2))
+            for y in _starts(y1, y2, size, overlap)
+            for x in _starts(x1, x2, size, overlap)]
+
+
+def plan(camera: Dict[str, Any], w: int, h: int) -> Optional[List[Rect]]:
+    """
+    Crop rects for one frame: each ROI (or the whole frame), split into tiles
+    when tiling is on and the region is larger than one tile, plus the region
+    itself when "full_frame" is set (large objects that no tile holds whole).
+    More than TILE_MAX_CROPS crops -> the tile size grows until it fits.
+    None = no ROI and no tiling: infer the frame as it is.
+    """
+    roi = camera.get("roi")
+    tiles = _tiles_for(camera)
+    if not roi and not tiles:
+        return None
+
+    regions: List[Rect] = []
+    for fx1, fy1, fx2, fy2 in roi or [(0.0, 0.0, 1.0, 1.0)]:
+        r = (int(fx1 * w), int(fy1 * h), int(math.ceil(fx2 * w)), int(math.ceil(fy2 * h)))
+        if r[2] - r[0] >= 8 and r[3] - r[1] >= 8:
+            regions.append(r)
+    if not regions:
+        return None
+    if not tiles:
+        return regions
+
+    size = int(tiles["size"])
+    while True:
+        rects: List[Rect] = []
+        for r in regions:
+            grid = _grid(r, size, tiles["overlap"])
+            rects.extend(grid)
+            if tiles["full_frame"] and len(grid) > 1:
+                rects.append(r)
+        if len(rects) <= max(1, TILE_MAX_CROPS) or size >= max(w, h):
+            return rects
+        size = int(size * 1.25)
+
+
+# ------------------ merging ------------------
+
+def _nms_ios(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, thresh: float) -> np.ndarray:
+    """
+    Greedy class-aware NMS on intersection over the smaller box: a person cut
+    in half by a tile edge overlaps the whole-person box from the next tile
+    (or the full-frame pass) by IoS ~1 even though their IoU is low.
+    """
+    order = np.argsort(-conf, kind="stable")
+    area = (xyxy[:, 2] - xyxy[:, 0]).clip(0) * (xyxy[:, 3] - xyxy[:, 1]).clip(0)
+    keep: List[int] = []
+    suppressed = np.zeros(len(order), dtype=bool)
+    for pos, i in enumerate(order):
+        if suppressed[pos]:
+            continue
+        keep.append(i)
+        rest = order[pos + 1:]
+        if not len(rest):
+            break
+        ix1 = np.maximum(xyxy[i, 0], xyxy[rest, 0])
+        iy1 = np.maximum(xyxy[i, 1], xyxy[rest, 1])
+        ix2 = np.minimum(xyxy[i, 2], xyxy[rest, 2])
+        iy2 = np.minimum(xyxy[i, 3], xyxy[rest, 3])
+        inter = (ix2 - ix1).clip(0) * (iy2 - iy1).clip(0)
+        ios = inter / np.maximum(np.minimum(area[i], area[rest]), 1e-6)
+        suppressed[pos + 1:] |= (ios > thresh) & (cls[rest] == cls[i])
+    return np.array(keep, dtype=int)
+
+
+def merge(parts: List[Any], rects: List[Rect], frame: np.ndarray, names: Dict[int, str]):
+    """Per-crop predict() results -> one Results over `frame` (what the tracker expects)."""
+    import torch
+    from ultralytics.engine.results import Results
+
+    rows = []
+    for res, (x1, y1, _, _) in zip(parts, rects):
+        boxes = getattr(res, "boxes", None)
+        if boxes is None or not len(boxes):
+            continue
+        data = boxes.data.cpu().numpy()[:, :6].astype(np.float32)  # x1 y1 x2 y2 conf cls
+        data[:, [0, 2]] += x1
+        data[:, [1, 3]] += y1
+        rows.append(data)
+
+    data = np.concatenate(rows) if rows else np.zeros((0, 6), dtype=np.float32)
+    if len(data) > 1 and len(rects) > 1:
+        data = data[_nms_ios(data[:, :4], data[:, 4], data[:, 5], TILE_MERGE_IOS)]
+    return Results(frame, path="", names=names, boxes=torch.as_tensor(data, dtype=torch.float32))
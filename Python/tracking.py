@@ -0,0 +1,137 @@
+"""
+Per-camera ByteTrack state.
+
+model.track(persist=True) keeps ONE tracker on the shared model, so frames
+from different cameras were associated with each other. Here every camera
+`key` gets its own BYTETracker, fed from plain model.predict() output.
+
+- TrackerRegistry.apply(key, result) -> result with per-camera track ids
+- sync(cameras)  drops trackers of cameras that went inactive
+- save()/load()  pickle the trackers so ids survive a restart
+"""
+
+import os
+import pickle
+import threading
+import time
+from typing import Any, Dict, List
+
+from config import TRACKER_STATE_PATH, TRACKER_IDLE_EVICT_SEC
+from log import get_logger
+
+_log = get_logger("track")
+
+
+_STATE_VERSION = 1
+
+
+def _tracker_args():
+    from ultralytics.utils import IterableSimpleNamespace
+    from ultralytics.utils.checks import check_yaml
+    try:
+        from ultralytics.utils import YAML
+        cfg = YAML.load(check_yaml("bytetrack.yaml"))
+    except ImportError:  # older ultralytics
+        from ultralytics.utils import yaml_load
+        cfg = yaml_load(check_yaml("bytetrack.yaml"))
+    return IterableSimpleNamespace(**cfg)
+
+
+class TrackerRegistry:
+    def __init__(self, state_path: str | None = TRACKER_STATE_PATH) -> None:
+        self._state_path = state_path
+        self._trackers: Dict[str, Any] = {}     # camera key -> BYTETracker
+        self._last_used: Dict[str, float] = {}
+        self._args = None
+        self._lock = threading.Lock()
+
+    def _new_tracker(self):
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        if self._args is None:
+            self._args = _tracker_args()
+        return BYTETracker(self._args)
+
+    def apply(self, cam_key: str, result):
+        """Run this camera's tracker on one predict() result; returns the result with track ids."""
+        import torch
+
+        with self._lock:
+            tracker = self._trackers.get(cam_key)
+            if tracker is None:
+                tracker = self._new_tracker()
+                self._trackers[cam_key] = tracker
+            self._last_used[cam_key] = time.time()
+
+            tracks = tracker.update(result.boxes.cpu().numpy(), result.orig_img)
+            # same post-processing ultralytics does for model.track()
+            # (trackers/track.py on_predict_postprocess_end): no tracks ->
+            # hide the frame only while new tracks await confirmation
+            pending = len(tracks) == 0 and any(not t.is_activated for t in tracker.tracked_stracks)
+        if len(tracks) == 0:
+            return result[:0] if pending else result
+        device = result.boxes.data.device
+        result = result[tracks[:, -1].astype(int)]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1], device=device))
+        return result
+
+    def sync(self, cameras: List[Dict[str, Any]]) -> None:
+        """Drop trackers for cameras no longer active or unused for TRACKER_IDLE_EVICT_SEC."""
+        active = {c.get("key") for c in cameras}
+        now = time.time()
+        with self._lock:
+            gone = [k for k in self._trackers
+                    if k not in active or now - self._last_used.get(k, now) > TRACKER_IDLE_EVICT_SEC]
+            for k in gone:
+                self._trackers.pop(k, None)
+                self._last_used.pop(k, None)
+        if gone:
+            _log.info(f"[TRACK] evicted {len(gone)} tracker(s): {', '.join(gone)}")
+
+    def save(self) -> None:
+        if not self._state_path:
+            return
+        with self._lock:
+            state = {"version": _STATE_VERSION, "saved_at": time.time(),
+                     "trackers": self._trackers, "last_used": self._last_used}
+            try:
+                blob = pickle.dumps(state)
+            except Exception as e:
+                _log.warn(f"[TRACK] cannot serialise tracker state: {e}")
+                return
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self._state_path)  # atomic: never leave a half-written file
+
+    def load(self) -> None:
+        if not self._state_path or not os.path.isfile(self._state_path):
+            return
+        try:
+            with open(self._state_path, "rb") as f:
+                state = pickle.load(f)
+            if state.get("version") != _STATE_VERSION:
+                raise ValueError(f"unsupported version {state.get('version')}")
+        except Exception as e:
+            _log.warn(f"[TRACK] ignoring saved tracker state: {e}")
+            return
+        with self._lock:
+            self._trackers = dict(state.get("trackers") or {})
+            self._last_used = dict(state.get("last_used") or {})
+        _log.info(f"[TRACK] restored {len(self._trackers)} tracker(s) from {self._state_path}")
+
+    def __len__(self) -> int:
+        return len(self._trackers)
+
+
+# ------------------ shared registry (lazy) ------------------
+_REGISTRY: TrackerRegistry | None = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_registry() -> TrackerRegistry:
+    global _REGISTRY
+    with _REGISTRY_LOCK:
+        if _REGISTRY is None:
+            _REGISTRY = TrackerRegistry()
+            _REGISTRY.load()
+        return _REGISTRY